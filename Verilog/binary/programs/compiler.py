@@ -1,10 +1,33 @@
 import argparse
+import os
+import sys
+from array import array
+
+# The shared assembler core lives at the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+import assembler
+import assembly_cache
+import batch_assembler
+import program_image
+import toolchain
 
 class InstructionParser:
-    def __init__(self):
-        # Program memory to store instructions (256 16-bit words)
-        self.program_memory = [0] * 256
+    def __init__(self, capacity=None, parameters=None):
+        # Program memory to store instructions (16-bit words), grown to fit each program
+        self.program_memory = array('I')
         self.instruction_count = 0
+
+        # Largest program accepted: None for what the Verilog machine in parameters.vh can hold,
+        # 0 for no limit
+        self.capacity = capacity
+
+        # Machine parameters the instructions are encoded for (parameters.vh by default), and the
+        # field positions and operand ranges that follow from them
+        self.parameters = toolchain.read_parameters("binary") if parameters is None else dict(parameters)
+        self.layout = toolchain.instruction_layout("binary", self.parameters)
+
+        # Label addresses from the last assembled program
+        self.symbols = {}
         
         # Instruction opcodes
         self.instructions = {
@@ -29,14 +52,37 @@ class InstructionParser:
             'HALT':  0b11010  # 26
         }
 
+        # Instruction formats: operand fields as (operand kind, bit position), and the parse method
+        # that decodes operands in unusual spellings and reports invalid ones
+        dest, src = self.layout["dest_shift"], self.layout["src_shift"]
+        self.formats = {
+            'H': ((), None),
+            'R': ((('register', dest), ('register', src)), self.parse_registers),
+            'I': ((('register', dest), ('immediate', 0)), self.parse_register_immediate),
+            'B': ((('register', dest), ('branch_immediate', 0)), self.parse_register_neg_immediate),
+            'M': ((('register', dest), ('register', src), ('offset', 0)), self.parse_memory_instruction),
+        }
+        self.instruction_formats = {
+            'MV': 'R', 'NOT': 'R', 'AND': 'R', 'OR': 'R', 'XOR': 'R',
+            'ADD': 'R', 'SUB': 'R', 'COMP': 'R', 'LT': 'R', 'EQ': 'R',
+            'ANDI': 'I', 'ADDI': 'I', 'LUI': 'I', 'LI': 'I',
+            'BEQ': 'B', 'BNE': 'B',
+            'LOAD': 'M', 'STORE': 'M',
+            'HALT': 'H'
+        }
+
+        # Dispatch table built on first use: mnemonic -> (opcode bits, fields, parse method)
+        self.encoders = None
+
     def parse_registers(self, reg1, reg2):
         """Parse register numbers from R format strings."""
         try:
             r1_num = int(reg1.strip()[1:])  # Remove 'R' and convert to int
             r2_num = int(reg2.strip()[1:])  # Remove 'R' and convert to int
             
-            if not (0 <= r1_num <= 7 and 0 <= r2_num <= 7):
-                raise ValueError("Register numbers must be between 0 and 7")
+            last = self.layout["registers"] - 1
+            if not (0 <= r1_num <= last and 0 <= r2_num <= last):
+                raise ValueError(f"Register numbers must be between 0 and {last}")
                 
             return r1_num, r2_num
         except:
@@ -56,10 +102,12 @@ class InstructionParser:
             else:
                 imm_val = int(imm)
                 
-            if not (0 <= r1_num <= 7):
-                raise ValueError("Register numbers must be between 0 and 7")
-            if not (0 <= imm_val <= 255):
-                raise ValueError("Immediate value must be between 0 and 255")
+            last = self.layout["registers"] - 1
+            low, high = self.layout["big_immediate"]
+            if not (0 <= r1_num <= last):
+                raise ValueError(f"Register numbers must be between 0 and {last}")
+            if not (low <= imm_val <= high):
+                raise ValueError(f"Immediate value must be between {low} and {high}")
                 
             return r1_num, imm_val
         except ValueError as e:
@@ -81,14 +129,16 @@ class InstructionParser:
             else:
                 imm_val = int(imm)
                 
-            if not (0 <= r1_num <= 7):
-                raise ValueError("Register numbers must be between 0 and 7")
-            if not (-128 <= imm_val <= 127):
-                raise ValueError("Immediate value must be between 0 and 255")
+            last = self.layout["registers"] - 1
+            low, high = self.layout["branch_immediate"]
+            if not (0 <= r1_num <= last):
+                raise ValueError(f"Register numbers must be between 0 and {last}")
+            if not (low <= imm_val <= high):
+                raise ValueError(f"Immediate value must be between {low} and {high}")
             
-            # If negative, convert to 8-bit signed by adding 2**7
+            # If negative, convert to two's complement in the width of the big immediate
             if imm_val < 0:
-                imm_val = imm_val + (1 << 8)
+                imm_val = imm_val + (1 << self.layout["big_digits"])
                 
             return r1_num, imm_val
         except ValueError as e:
@@ -103,88 +153,134 @@ class InstructionParser:
             r2_num = int(reg2.strip()[1:])  # Remove 'R' and convert to int
             offset = int(offset.strip())
             
-            if not (0 <= r1_num <= 7 and 0 <= r2_num <= 7):
-                raise ValueError("Register numbers must be between 0 and 7")
-            if not (0 <= offset <= 31):
-                raise ValueError("Offset must be between 0 and 31")
+            last = self.layout["registers"] - 1
+            low, high = self.layout["small_immediate"]
+            if not (0 <= r1_num <= last and 0 <= r2_num <= last):
+                raise ValueError(f"Register numbers must be between 0 and {last}")
+            if not (low <= offset <= high):
+                raise ValueError(f"Offset must be between {low} and {high}")
                 
             return r1_num, r2_num, offset
         except:
             raise ValueError(f"Invalid memory instruction format: {reg1}, {reg2}, {offset}")
 
     def parse_line(self, line):
-        """Parse a single line of assembly."""
-        
-        # Check if the line is 3 semicolons (end of file)
-        if line.strip() == ';;;':
-            return ";;;"
-        
-        # Remove comments (everything after semicolon)
-        line = line.split(';')[0].strip().replace(',', '')
-        
-        # Ignore lines that are empty before the semicolon
-        if not line:
+        """Parse a single line of assembly. A label in front of the instruction is ignored."""
+        try:
+            split = assembler.split_line(line)
+        except ValueError as e:
+            print(f"Error processing line '{line.strip()}': {str(e)}")
             return None
-            
-        # Split line into tokens
-        tokens = line.split()
+
+        # Check if the line is 3 semicolons (end of file)
+        if split == assembler.END_OF_PROGRAM:
+            return split
+
+        label, tokens = split
+        return self.encode(tokens)
+
+    # Operand tables are the same for every parser with the same instruction layout, so they are
+    # shared by the class
+    operand_tables = {}
+
+    def build_encoders(self):
+        """Create the operand tables and the per-instruction dispatch table."""
+        key = tuple(sorted(self.layout.items()))
+        tables = InstructionParser.operand_tables.get(key)
+        if tables is None:
+            tables = InstructionParser.operand_tables[key] = {
+                'register': assembler.OperandTable(lambda reg: self.parse_registers(reg, 'R0')[0]),
+                'immediate': assembler.OperandTable(lambda imm: self.parse_register_immediate('R0', imm)[1]),
+                'branch_immediate': assembler.OperandTable(lambda imm: self.parse_register_neg_immediate('R0', imm)[1]),
+                'offset': assembler.OperandTable(lambda offset: self.parse_memory_instruction('R0', 'R0', offset)[2]),
+            }
+
+        self.encoders = {}
+        for instruction, opcode in self.instructions.items():
+            operands, parse = self.formats[self.instruction_formats[instruction]]
+            fields = tuple((tables[kind], shift) for kind, shift in operands)
+            self.encoders[instruction] = (opcode << self.layout["opcode_shift"], fields, parse)
+
+    def encode(self, tokens, errors=None):
+        """
+        Encode a single instruction from its tokens, or return None if it is invalid. The error
+        is printed, or appended to errors if a list is given.
+        """
+        # Ignore lines with no instruction
         if not tokens:
             return None
-            
+
+        if self.encoders is None:
+            self.build_encoders()
+
         instruction = tokens[0].upper()
+        encoder = self.encoders.get(instruction)
+        if encoder is not None:
+            word = assembler.pack_fields(encoder, tokens)
+            if word is not None:
+                return word
 
         try:
-            if instruction not in self.instructions:
+            if encoder is None:
                 raise ValueError(f"Unknown instruction: {instruction}")
-                
-            opcode = self.instructions[instruction]
 
-            # Halt instruction
-            if instruction == 'HALT':
-                return (opcode << 11)
-            
-            # R-type instructions
-            if instruction in ['MV', 'NOT', 'AND', 'OR', 'XOR', 'ADD', 'SUB', 'COMP', 'LT', 'EQ']:
-                reg_a, reg_b = self.parse_registers(tokens[1], tokens[2])
-                return (opcode << 11) | (reg_a << 8) | (reg_b << 5)
-                
-            # I-type instructions
-            if instruction in ['ANDI', 'ADDI', 'SRI', 'SLI', 'LUI', 'LI']:
-                reg_a, imm = self.parse_register_immediate(tokens[1], tokens[2])
-                return (opcode << 11) | (reg_a << 8) | imm
-            
-            # Negative I-type instructions
-            if instruction in ['BEQ', 'BNE']:
-                reg_a, imm = self.parse_register_neg_immediate(tokens[1], tokens[2])
-                return (opcode << 11) | (reg_a << 8) | imm
-                
-            # M-type instructions
-            if instruction in ['LOAD', 'STORE']:
-                reg_a, reg_b, offset = self.parse_memory_instruction(tokens[1], tokens[2], tokens[3])
-                return (opcode << 11) | (reg_a << 8) | (reg_b << 5) | offset
-                
+            # Operands outside the tables go through the format's parse method
+            word, fields, parse = encoder
+            operands = [tokens[i] for i in range(1, len(fields) + 1)]
+            if parse is not None:
+                for (_, shift), value in zip(fields, parse(*operands)):
+                    word |= value << shift
+            return word
+
         except (IndexError, ValueError) as e:
+            if errors is not None:
+                errors.append(str(e))
+                return None
+            line = ' '.join(str(token) for token in tokens)
             print(f"Error processing line '{line}': {str(e)}")
             return None
-        
-        return None
 
-    def assemble(self, input_file, output_file):
-        """Assemble input file to hex output."""
+    def stream(self, lines):
+        """
+        Assemble any iterable of source lines (an open file, sys.stdin, a socket's makefile()),
+        yielding (line number, address, word) for each word in address order and an
+        assembler.Diagnostic for each invalid line. Label addresses are kept in self.symbols.
+        """
+        self.symbols = {}
+        return assembler.stream(self, lines, self.symbols)
+
+    def store_program(self, words):
+        """Replace program memory with assembled words, checking that they fit the target machine."""
+        capacity = toolchain.program_capacity("binary", self.parameters) if self.capacity is None else self.capacity
+        if capacity and len(words) > capacity:
+            raise ValueError(f"Program of {len(words)} instructions does not fit in the {capacity} words of "
+                             f"program memory (MEM_SIZE/INS_ADDR_SIZE in parameters.vh, or --capacity)")
+        self.program_memory = array('I', words)
+        self.instruction_count = len(words)
+
+    def assemble(self, input_file, output_file, cache=False, output_format="hex"):
+        """
+        Assemble input file to hex output, optionally reusing the on-disk assembly cache.
+        With output_format="image" a packed program image is written instead (see program_image.py).
+        """
         try:
             with open(input_file, 'r') as f:
-                for line in f:
-                    instruction = self.parse_line(line)
-                    if instruction == ";;;":
-                        break
-                    elif instruction is not None:
-                        self.program_memory[self.instruction_count] = instruction
-                        self.instruction_count += 1
+                if cache:
+                    assembly = assembly_cache.AssemblyCache(self)
+                    words, self.symbols, _ = assembly.assemble(f.read())
+                    assembly.save()
+                else:
+                    words, self.symbols = assembler.assemble(self, f)
+
+            self.store_program(words)
                         
-            # Write hex output
-            with open(output_file, 'w') as f:
-                for i in range(self.instruction_count):
-                    f.write(f"{self.program_memory[i]:04x}\n")
+            if output_format == "image":
+                program_image.write_image(output_file, self.program_memory[:self.instruction_count], "binary")
+            else:
+                # Write hex output
+                with open(output_file, 'w') as f:
+                    for i in range(self.instruction_count):
+                        f.write(f"{self.program_memory[i]:04x}\n")
                     
             print(f"Successfully assembled {self.instruction_count} binary instructions")
             
@@ -199,13 +295,23 @@ def main():
     parser.add_argument("--file", type=str, default="program", help="Input assembly file")
     parser.add_argument("--filepath", type=str, default=None, help="Input assembly filepath")
     parser.add_argument("--output", type=str, default="programs/bin/program.hex", help="Output hex filepath")
+    parser.add_argument("--format", type=str, default="hex", choices=["hex", "image"], help="Output as text hex or a packed program image")
+    parser.add_argument("--capacity", type=int, default=None, help="Largest program in words (default: from parameters.vh, 0 for no limit)")
+    parser.add_argument("--cache", action="store_true", help="Reuse unchanged programs and lines from the assembly cache")
+    parser.add_argument("--batch", type=str, default=None, help="Assemble a directory or glob of .asm files for both architectures")
+    parser.add_argument("--batch-output", type=str, default="programs/bin/batch", help="Output directory for --batch")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes for --batch (default: all cores)")
 
     args = parser.parse_args()
+    if args.batch is not None:
+        batch_assembler.run_batch(args.batch, args.batch_output, args.processes)
+        return
+
     if args.filepath is None:
         args.filepath = "programs/" + args.file + ".asm"
 
-    parser = InstructionParser()
-    parser.assemble(args.filepath, args.output)
+    parser = InstructionParser(capacity=args.capacity)
+    parser.assemble(args.filepath, args.output, cache=args.cache, output_format=args.format)
 
 
 if __name__ == "__main__":
@@ -2,6 +2,8 @@
 
 module system_tb;
 
+    `include "parameters.vh"
+
     // Configuration parameter
     parameter VERBOSE = 1; // Set to 0 to disable display messages, 1 to enable
 
@@ -10,8 +12,14 @@ module system_tb;
     reg reset;
     reg start;
     reg execution_done;
-    reg [15:0] prev_pc;
+    reg [WORD_SIZE-1:0] prev_pc;
     integer wait_cycles;
+
+    // Per-cycle trace written as JSON lines to the file named by +trace=<path>
+    reg [8*256:1] trace_path;
+    integer trace_file;
+    integer cycle;
+    integer last_not, last_and, last_or, last_xor;
     
     // Clock generation
     initial begin
@@ -30,14 +38,14 @@ module system_tb;
     );
     
     // Monitor CPU registers for debugging
-    wire [15:0] r0 = uut.cpu.regs.regs[0];
-    wire [15:0] r1 = uut.cpu.regs.regs[1];
-    wire [15:0] r2 = uut.cpu.regs.regs[2];
-    wire [15:0] r3 = uut.cpu.regs.regs[3];
-    wire [15:0] r4 = uut.cpu.regs.regs[4];
-    wire [15:0] r5 = uut.cpu.regs.regs[5];
-    wire [15:0] r6 = uut.cpu.regs.regs[6];
-    wire [15:0] r7 = uut.cpu.regs.regs[7];
+    wire [WORD_SIZE-1:0] r0 = uut.cpu.regs.regs[0];
+    wire [WORD_SIZE-1:0] r1 = uut.cpu.regs.regs[1];
+    wire [WORD_SIZE-1:0] r2 = uut.cpu.regs.regs[2];
+    wire [WORD_SIZE-1:0] r3 = uut.cpu.regs.regs[3];
+    wire [WORD_SIZE-1:0] r4 = uut.cpu.regs.regs[4];
+    wire [WORD_SIZE-1:0] r5 = uut.cpu.regs.regs[5];
+    wire [WORD_SIZE-1:0] r6 = uut.cpu.regs.regs[6];
+    wire [WORD_SIZE-1:0] r7 = uut.cpu.regs.regs[7];
     
     // Test sequence
     initial begin
@@ -66,11 +74,53 @@ module system_tb;
         // Monitor system state
         wait(uut.system_state == uut.EXECUTING);
         if (VERBOSE) $display("Program Execution Started");
+
+        // Open the trace stream if one was requested
+        trace_file = 0;
+        cycle = 0;
+        last_not = counter.not_count;
+        last_and = counter.and_count;
+        last_or = counter.or_count;
+        last_xor = counter.xor_count;
+        if ($value$plusargs("trace=%s", trace_path)) begin
+            trace_file = $fopen(trace_path, "w");
+            if (trace_file == 0)
+                $display("Error: Could not open trace file %0s", trace_path);
+            else
+                $fwrite(trace_file, "{\"arch\":\"binary\",\"gates\":[\"NOT\",\"AND\",\"OR\",\"XOR\"]}\n");
+        end
         
         // Monitor execution
         while (!execution_done && uut.system_state == uut.EXECUTING) begin
             // Display register values on each clock cycle
             @(posedge clock);
+
+            // Write one trace record per cycle (raw bit patterns, decoded by trace_reader.py)
+            if (trace_file != 0) begin
+                $fwrite(trace_file, "{\"cycle\":%0d,\"pc\":%0d,\"state\":%0d,\"opcode\":%0d",
+                        cycle, uut.cpu.program_counter, uut.cpu.state, uut.cpu.opcode);
+                if (uut.cpu.state == 4)  // ALU state (STATE_ALU)
+                    $fwrite(trace_file, ",\"alu\":%0d", uut.cpu.alu_out);
+                if (uut.cpu.do_reg_store)
+                    $fwrite(trace_file, ",\"reg\":[%0d,%0d]", uut.cpu.reg_dest, uut.cpu.reg_val);
+                if (uut.cpu.mem_write)
+                    $fwrite(trace_file, ",\"mem\":[%0d,%0d]", uut.cpu.mem_address, uut.cpu.mem_write_data);
+                if (counter.not_count != last_not ||
+                    counter.and_count != last_and ||
+                    counter.or_count != last_or ||
+                    counter.xor_count != last_xor)
+                    $fwrite(trace_file, ",\"gates\":[%0d,%0d,%0d,%0d]",
+                            counter.not_count - last_not,
+                            counter.and_count - last_and,
+                            counter.or_count - last_or,
+                            counter.xor_count - last_xor);
+                $fwrite(trace_file, "}\n");
+            end
+            cycle = cycle + 1;
+            last_not = counter.not_count;
+            last_and = counter.and_count;
+            last_or = counter.or_count;
+            last_xor = counter.xor_count;
             if (VERBOSE) begin
                 $display("State=%1d, PC=%2d", uut.cpu.ctrl.state, uut.cpu.program_counter);
                 // $display("Time=%0t PC=%0d", $time, uut.cpu.program_counter);
@@ -102,7 +152,7 @@ module system_tb;
                             uut.cpu.reg_src, uut.cpu.reg_out1);
                 
                 // Display ALU operations
-                if (uut.cpu.state == 4)  // Write Back state
+                if (uut.cpu.state == 4)  // ALU state (STATE_ALU)
                     $display("ALU Result=%d", uut.cpu.alu_out);
 
                 $display("-------------------------------------------");
@@ -122,7 +172,7 @@ module system_tb;
         
         // Display final register values - always show these regardless of verbose setting
         $display("\nFinal Register Values:");
-        for (integer i = 0; i < 8; i = i + 1) begin
+        for (integer i = 0; i < REG_NUM; i = i + 1) begin
             // Display the values in decimal
             $display("R%0d=%d", i, uut.cpu.regs.regs[i]);
         end
@@ -141,9 +191,14 @@ module system_tb;
             $display("Addr=%0d Data=%b", j, uut.ram.memory[j]);
         end
 
+        // Cycles executed, read by farm.py and sweep.py
+        $display("Cycles: %0d", cycle);
+
         // Display gate counts - always show regardless of verbose setting
         counter.display_counts;
 
+        if (trace_file != 0) $fclose(trace_file);
+
         // Save gate counts to file
         counter.save_counts("programs/program_gate_counts.csv");
         
@@ -517,88 +517,84 @@ endmodule
 
 
 /*
-* ALU operations on ternary numbers of WORD_SIZE equals 9 trits (18 bits)
+* ALU operations on ternary numbers of WORD_SIZE trits (2*WORD_SIZE bits, 9 trits by default)
 */
 
-module ternary_not(
-    input [17:0] a,
-    input wire enable,
-    output [17:0] result
-);
+module ternary_not(a, enable, result);
+
+    `include "parameters.vh"
 
-    // Instantiate 9 NOT gates, one for each trit
-    ternary_negation_1bit not0(.a(a[1:0]), .enable(enable), .neg_out(result[1:0]));
-    ternary_negation_1bit not1(.a(a[3:2]), .enable(enable), .neg_out(result[3:2]));
-    ternary_negation_1bit not2(.a(a[5:4]), .enable(enable), .neg_out(result[5:4]));
-    ternary_negation_1bit not3(.a(a[7:6]), .enable(enable), .neg_out(result[7:6]));
-    ternary_negation_1bit not4(.a(a[9:8]), .enable(enable), .neg_out(result[9:8]));
-    ternary_negation_1bit not5(.a(a[11:10]), .enable(enable), .neg_out(result[11:10]));
-    ternary_negation_1bit not6(.a(a[13:12]), .enable(enable), .neg_out(result[13:12]));
-    ternary_negation_1bit not7(.a(a[15:14]), .enable(enable), .neg_out(result[15:14]));
-    ternary_negation_1bit not8(.a(a[17:16]), .enable(enable), .neg_out(result[17:16]));
+    input [2*WORD_SIZE-1:0] a;
+    input wire enable;
+    output [2*WORD_SIZE-1:0] result;
+
+    // Instantiate WORD_SIZE NOT gates, one for each trit
+    genvar i;
+    generate
+        for (i = 0; i < WORD_SIZE; i = i + 1) begin: not_loop
+            ternary_negation_1bit not_trit(.a(a[2*i+1:2*i]), .enable(enable), .neg_out(result[2*i+1:2*i]));
+        end
+    endgenerate
 
 endmodule
 
 
-module ternary_and(
-    input [17:0] a,
-    input [17:0] b,
-    input wire enable, 
-    output [17:0] result
-);
+module ternary_and(a, b, enable, result);
+
+    `include "parameters.vh"
 
-    // Instantiate 9 AND gates, one for each trit position
-    ternary_and_1bit and0(.a(a[1:0]), .b(b[1:0]), .enable(enable), .and_out(result[1:0]));
-    ternary_and_1bit and1(.a(a[3:2]), .b(b[3:2]), .enable(enable), .and_out(result[3:2]));
-    ternary_and_1bit and2(.a(a[5:4]), .b(b[5:4]), .enable(enable), .and_out(result[5:4]));
-    ternary_and_1bit and3(.a(a[7:6]), .b(b[7:6]), .enable(enable), .and_out(result[7:6]));
-    ternary_and_1bit and4(.a(a[9:8]), .b(b[9:8]), .enable(enable), .and_out(result[9:8]));
-    ternary_and_1bit and5(.a(a[11:10]), .b(b[11:10]), .enable(enable), .and_out(result[11:10]));
-    ternary_and_1bit and6(.a(a[13:12]), .b(b[13:12]), .enable(enable), .and_out(result[13:12]));
-    ternary_and_1bit and7(.a(a[15:14]), .b(b[15:14]), .enable(enable), .and_out(result[15:14]));
-    ternary_and_1bit and8(.a(a[17:16]), .b(b[17:16]), .enable(enable), .and_out(result[17:16]));
+    input [2*WORD_SIZE-1:0] a;
+    input [2*WORD_SIZE-1:0] b;
+    input wire enable;
+    output [2*WORD_SIZE-1:0] result;
+
+    // Instantiate WORD_SIZE AND gates, one for each trit position
+    genvar i;
+    generate
+        for (i = 0; i < WORD_SIZE; i = i + 1) begin: and_loop
+            ternary_and_1bit and_trit(.a(a[2*i+1:2*i]), .b(b[2*i+1:2*i]), .enable(enable), .and_out(result[2*i+1:2*i]));
+        end
+    endgenerate
 
 endmodule
 
 
-module ternary_or(
-    input [17:0] a, 
-    input [17:0] b, 
-    input wire enable,
-    output [17:0] result
-);
+module ternary_or(a, b, enable, result);
+
+    `include "parameters.vh"
+
+    input [2*WORD_SIZE-1:0] a;
+    input [2*WORD_SIZE-1:0] b;
+    input wire enable;
+    output [2*WORD_SIZE-1:0] result;
 
-    // Instantiate 9 OR gates, one for each trit position
-    ternary_or_1bit or0(.a(a[1:0]), .b(b[1:0]), .enable(enable), .or_out(result[1:0]));
-    ternary_or_1bit or1(.a(a[3:2]), .b(b[3:2]), .enable(enable), .or_out(result[3:2]));
-    ternary_or_1bit or2(.a(a[5:4]), .b(b[5:4]), .enable(enable), .or_out(result[5:4]));
-    ternary_or_1bit or3(.a(a[7:6]), .b(b[7:6]), .enable(enable), .or_out(result[7:6]));
-    ternary_or_1bit or4(.a(a[9:8]), .b(b[9:8]), .enable(enable), .or_out(result[9:8]));
-    ternary_or_1bit or5(.a(a[11:10]), .b(b[11:10]), .enable(enable), .or_out(result[11:10]));
-    ternary_or_1bit or6(.a(a[13:12]), .b(b[13:12]), .enable(enable), .or_out(result[13:12]));
-    ternary_or_1bit or7(.a(a[15:14]), .b(b[15:14]), .enable(enable), .or_out(result[15:14]));
-    ternary_or_1bit or8(.a(a[17:16]), .b(b[17:16]), .enable(enable), .or_out(result[17:16]));
+    // Instantiate WORD_SIZE OR gates, one for each trit position
+    genvar i;
+    generate
+        for (i = 0; i < WORD_SIZE; i = i + 1) begin: or_loop
+            ternary_or_1bit or_trit(.a(a[2*i+1:2*i]), .b(b[2*i+1:2*i]), .enable(enable), .or_out(result[2*i+1:2*i]));
+        end
+    endgenerate
 
 endmodule
 
 
-module ternary_xor(
-    input [17:0] a,
-    input [17:0] b,
-    input wire enable,
-    output [17:0] result
-);
+module ternary_xor(a, b, enable, result);
 
-    // Instantiate 9 XOR gates, one for each trit position
-    ternary_xor_1bit xor0(.a(a[1:0]), .b(b[1:0]), .enable(enable), .xor_out(result[1:0]));
-    ternary_xor_1bit xor1(.a(a[3:2]), .b(b[3:2]), .enable(enable), .xor_out(result[3:2]));
-    ternary_xor_1bit xor2(.a(a[5:4]), .b(b[5:4]), .enable(enable), .xor_out(result[5:4]));
-    ternary_xor_1bit xor3(.a(a[7:6]), .b(b[7:6]), .enable(enable), .xor_out(result[7:6]));
-    ternary_xor_1bit xor4(.a(a[9:8]), .b(b[9:8]), .enable(enable), .xor_out(result[9:8]));
-    ternary_xor_1bit xor5(.a(a[11:10]), .b(b[11:10]), .enable(enable), .xor_out(result[11:10]));
-    ternary_xor_1bit xor6(.a(a[13:12]), .b(b[13:12]), .enable(enable), .xor_out(result[13:12]));
-    ternary_xor_1bit xor7(.a(a[15:14]), .b(b[15:14]), .enable(enable), .xor_out(result[15:14]));
-    ternary_xor_1bit xor8(.a(a[17:16]), .b(b[17:16]), .enable(enable), .xor_out(result[17:16]));
+    `include "parameters.vh"
+
+    input [2*WORD_SIZE-1:0] a;
+    input [2*WORD_SIZE-1:0] b;
+    input wire enable;
+    output [2*WORD_SIZE-1:0] result;
+
+    // Instantiate WORD_SIZE XOR gates, one for each trit position
+    genvar i;
+    generate
+        for (i = 0; i < WORD_SIZE; i = i + 1) begin: xor_loop
+            ternary_xor_1bit xor_trit(.a(a[2*i+1:2*i]), .b(b[2*i+1:2*i]), .enable(enable), .xor_out(result[2*i+1:2*i]));
+        end
+    endgenerate
 
 endmodule
 
@@ -623,103 +619,27 @@ module ternary_less_than(input1, input2, enable, result);
     // Initially, inputs are considered equal
     assign eq_signal[WORD_SIZE] = 1'b1;
     
-    // Instantiate comparator stages from MSB to LSB
-    // Start with MSB (trit 8)
-    ternary_comparator_1trit comp8(
-        .a(input1[17:16]),
-        .b(input2[17:16]),
-        .lt_in(lt_signal[WORD_SIZE]),
-        .eq_in(eq_signal[WORD_SIZE]),
-        .enable(enable),
-        .lt_out(lt_signal[8]),
-        .eq_out(eq_signal[8])
-    );
-    
-    ternary_comparator_1trit comp7(
-        .a(input1[15:14]),
-        .b(input2[15:14]),
-        .lt_in(lt_signal[8]),
-        .eq_in(eq_signal[8]),
-        .enable(enable),
-        .lt_out(lt_signal[7]),
-        .eq_out(eq_signal[7])
-    );
-    
-    ternary_comparator_1trit comp6(
-        .a(input1[13:12]),
-        .b(input2[13:12]),
-        .lt_in(lt_signal[7]),
-        .eq_in(eq_signal[7]),
-        .enable(enable),
-        .lt_out(lt_signal[6]),
-        .eq_out(eq_signal[6])
-    );
-    
-    ternary_comparator_1trit comp5(
-        .a(input1[11:10]),
-        .b(input2[11:10]),
-        .lt_in(lt_signal[6]),
-        .eq_in(eq_signal[6]),
-        .enable(enable),
-        .lt_out(lt_signal[5]),
-        .eq_out(eq_signal[5])
-    );
-    
-    ternary_comparator_1trit comp4(
-        .a(input1[9:8]),
-        .b(input2[9:8]),
-        .lt_in(lt_signal[5]),
-        .eq_in(eq_signal[5]),
-        .enable(enable),
-        .lt_out(lt_signal[4]),
-        .eq_out(eq_signal[4])
-    );
-    
-    ternary_comparator_1trit comp3(
-        .a(input1[7:6]),
-        .b(input2[7:6]),
-        .lt_in(lt_signal[4]),
-        .eq_in(eq_signal[4]),
-        .enable(enable),
-        .lt_out(lt_signal[3]),
-        .eq_out(eq_signal[3])
-    );
-    
-    ternary_comparator_1trit comp2(
-        .a(input1[5:4]),
-        .b(input2[5:4]),
-        .lt_in(lt_signal[3]),
-        .eq_in(eq_signal[3]),
-        .enable(enable),
-        .lt_out(lt_signal[2]),
-        .eq_out(eq_signal[2])
-    );
-    
-    ternary_comparator_1trit comp1(
-        .a(input1[3:2]),
-        .b(input2[3:2]),
-        .lt_in(lt_signal[2]),
-        .eq_in(eq_signal[2]),
-        .enable(enable),
-        .lt_out(lt_signal[1]),
-        .eq_out(eq_signal[1])
-    );
-    
-    ternary_comparator_1trit comp0(
-        .a(input1[1:0]),
-        .b(input2[1:0]),
-        .lt_in(lt_signal[1]),
-        .eq_in(eq_signal[1]),
-        .enable(enable),
-        .lt_out(lt_signal[0]),
-        .eq_out(eq_signal[0])
-    );
+    // Comparator stages chained from MSB (trit WORD_SIZE-1) to LSB (trit 0)
+    genvar i;
+    generate
+        for (i = 0; i < WORD_SIZE; i = i + 1) begin: comp_loop
+            ternary_comparator_1trit comp(
+                .a(input1[2*i+1:2*i]),
+                .b(input2[2*i+1:2*i]),
+                .lt_in(lt_signal[i+1]),
+                .eq_in(eq_signal[i+1]),
+                .enable(enable),
+                .lt_out(lt_signal[i]),
+                .eq_out(eq_signal[i])
+            );
+        end
+    endgenerate
     
     // Final result
     assign result = lt_signal[0];
 endmodule
 
-// Ternary ripple carry adder - fixed for 9 trits
+// Ternary ripple carry adder over WORD_SIZE trits
 module ternary_ripple_carry_adder(input1, input2, enable, result);
 
     `include "parameters.vh"
@@ -733,87 +653,20 @@ module ternary_ripple_carry_adder(input1, input2, enable, result);
     
     assign carry[0] = `_0; // Initial carry is 0
     
-    // Explicitly instantiate all 9 adder stages
-    ternary_adder_1bit adder0(
-        .a(input1[1:0]),
-        .b(input2[1:0]),
-        .carry_in(carry[0]),
-        .enable(enable),
-        .sum(result[1:0]),
-        .carry_out(carry[1])
-    );
-    
-    ternary_adder_1bit adder1(
-        .a(input1[3:2]),
-        .b(input2[3:2]),
-        .carry_in(carry[1]),
-        .enable(enable),
-        .sum(result[3:2]),
-        .carry_out(carry[2])
-    );
-    
-    ternary_adder_1bit adder2(
-        .a(input1[5:4]),
-        .b(input2[5:4]),
-        .carry_in(carry[2]),
-        .enable(enable),
-        .sum(result[5:4]),
-        .carry_out(carry[3])
-    );
-    
-    ternary_adder_1bit adder3(
-        .a(input1[7:6]),
-        .b(input2[7:6]),
-        .carry_in(carry[3]),
-        .enable(enable),
-        .sum(result[7:6]),
-        .carry_out(carry[4])
-    );
-    
-    ternary_adder_1bit adder4(
-        .a(input1[9:8]),
-        .b(input2[9:8]),
-        .carry_in(carry[4]),
-        .enable(enable),
-        .sum(result[9:8]),
-        .carry_out(carry[5])
-    );
-    
-    ternary_adder_1bit adder5(
-        .a(input1[11:10]),
-        .b(input2[11:10]),
-        .carry_in(carry[5]),
-        .enable(enable),
-        .sum(result[11:10]),
-        .carry_out(carry[6])
-    );
-    
-    ternary_adder_1bit adder6(
-        .a(input1[13:12]),
-        .b(input2[13:12]),
-        .carry_in(carry[6]),
-        .enable(enable),
-        .sum(result[13:12]),
-        .carry_out(carry[7])
-    );
-    
-    ternary_adder_1bit adder7(
-        .a(input1[15:14]),
-        .b(input2[15:14]),
-        .carry_in(carry[7]),
-        .enable(enable),
-        .sum(result[15:14]),
-        .carry_out(carry[8])
-    );
-    
-    ternary_adder_1bit adder8(
-        .a(input1[17:16]),
-        .b(input2[17:16]),
-        .carry_in(carry[8]),
-        .enable(enable),
-        .sum(result[17:16]),
-        .carry_out(carry[9])
-    );
+    // One adder stage per trit
+    genvar i;
+    generate
+        for (i = 0; i < WORD_SIZE; i = i + 1) begin: adder_loop
+            ternary_adder_1bit adder(
+                .a(input1[2*i+1:2*i]),
+                .b(input2[2*i+1:2*i]),
+                .carry_in(carry[i]),
+                .enable(enable),
+                .sum(result[2*i+1:2*i]),
+                .carry_out(carry[i+1])
+            );
+        end
+    endgenerate
 endmodule
 
 module ternary_equality(input1, input2, enable, result);
@@ -831,99 +684,22 @@ module ternary_equality(input1, input2, enable, result);
     // Initialize - assume equal at the start
     assign eq_signal[WORD_SIZE] = 1'b1;
     
-    // Instantiate 9 comparators (one per trit) for trits 8 down to 0
+    // One comparator per trit, chained from the MSB down to trit 0
     // We'll reuse the ternary_comparator_1trit but only use the eq part
-    
-    // Start with the MSB (trit 8)
-    ternary_comparator_1trit comp8(
-        .a(input1[17:16]), 
-        .b(input2[17:16]),
-        .lt_in(1'b0),     // We don't care about lt result
-        .eq_in(eq_signal[WORD_SIZE]), 
-        .enable(enable),
-        .lt_out(),        // Unconnected
-        .eq_out(eq_signal[8])
-    );
-    
-    ternary_comparator_1trit comp7(
-        .a(input1[15:14]), 
-        .b(input2[15:14]),
-        .lt_in(1'b0),
-        .eq_in(eq_signal[8]), 
-        .enable(enable),
-        .lt_out(),
-        .eq_out(eq_signal[7])
-    );
-    
-    ternary_comparator_1trit comp6(
-        .a(input1[13:12]), 
-        .b(input2[13:12]),
-        .lt_in(1'b0),
-        .eq_in(eq_signal[7]), 
-        .enable(enable),
-        .lt_out(),
-        .eq_out(eq_signal[6])
-    );
-    
-    ternary_comparator_1trit comp5(
-        .a(input1[11:10]), 
-        .b(input2[11:10]),
-        .lt_in(1'b0),
-        .eq_in(eq_signal[6]), 
-        .enable(enable),
-        .lt_out(),
-        .eq_out(eq_signal[5])
-    );
-    
-    ternary_comparator_1trit comp4(
-        .a(input1[9:8]), 
-        .b(input2[9:8]),
-        .lt_in(1'b0),
-        .eq_in(eq_signal[5]), 
-        .enable(enable),
-        .lt_out(),
-        .eq_out(eq_signal[4])
-    );
-    
-    ternary_comparator_1trit comp3(
-        .a(input1[7:6]), 
-        .b(input2[7:6]),
-        .lt_in(1'b0),
-        .eq_in(eq_signal[4]), 
-        .enable(enable),
-        .lt_out(),
-        .eq_out(eq_signal[3])
-    );
-    
-    ternary_comparator_1trit comp2(
-        .a(input1[5:4]), 
-        .b(input2[5:4]),
-        .lt_in(1'b0),
-        .eq_in(eq_signal[3]), 
-        .enable(enable),
-        .lt_out(),
-        .eq_out(eq_signal[2])
-    );
-    
-    ternary_comparator_1trit comp1(
-        .a(input1[3:2]), 
-        .b(input2[3:2]),
-        .lt_in(1'b0),
-        .eq_in(eq_signal[2]), 
-        .enable(enable),
-        .lt_out(),
-        .eq_out(eq_signal[1])
-    );
-    
-    ternary_comparator_1trit comp0(
-        .a(input1[1:0]), 
-        .b(input2[1:0]),
-        .lt_in(1'b0),
-        .eq_in(eq_signal[1]), 
-        .enable(enable),
-        .lt_out(),
-        .eq_out(eq_signal[0])
-    );
+    genvar i;
+    generate
+        for (i = 0; i < WORD_SIZE; i = i + 1) begin: comp_loop
+            ternary_comparator_1trit comp(
+                .a(input1[2*i+1:2*i]), 
+                .b(input2[2*i+1:2*i]),
+                .lt_in(1'b0),     // We don't care about lt result
+                .eq_in(eq_signal[i+1]), 
+                .enable(enable),
+                .lt_out(),        // Unconnected
+                .eq_out(eq_signal[i])
+            );
+        end
+    endgenerate
     
     // Final result - 1 if all trits are equal
     assign result = eq_signal[0];
@@ -19,6 +19,13 @@ module program_loader (
     reg [2*WORD_SIZE-1:0] instruction;
     integer scan_file;
     integer file_complete;
+
+    // Program file, overridden at run time with +program=<path>
+    reg [8*256:1] program_file;
+    initial begin
+        if (!$value$plusargs("program=%s", program_file))
+            program_file = "programs/bin/program.hex";
+    end
     integer i;
     reg [7:0] hex_value; // For reading hex value from file
     
@@ -57,9 +64,9 @@ module program_loader (
             case (state)
                 0: begin // Wait for start signal
                     if (start_load) begin
-                        file_handle = $fopen("programs/bin/program.hex", "r");
+                        file_handle = $fopen(program_file, "r");
                         if (file_handle == 0) begin
-                            $display("Error: Could not open program.hex");
+                            $display("Error: Could not open %0s", program_file);
                             state <= 4; // Go to error state
                         end else begin
                             state <= 1;
@@ -1,93 +1,34 @@
 import argparse
+import os
+import sys
+from array import array
 
-_1 = 0b11 # -1 (2)
-_0 = 0b00 # 0
-_1_ = 0b01 # 1
+# The shared assembler core lives at the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+import assembler
+import assembly_cache
+import balanced_ternary
+import batch_assembler
+import program_image
+import toolchain
 
+class TernaryInstructionParser:
+    def __init__(self, capacity=None, parameters=None):
+        # Program memory to store instructions (18-bit words), grown to fit each program
+        self.program_memory = array('I')
+        self.instruction_count = 0
 
-# Helper function
-def int_to_balanced_ternary_to_binary(value):
-    """
-    Convert an integer to balanced ternary representation, then interpret
-    that representation as binary and convert back to an integer.
-    
-    Balanced ternary bit encoding:
-    -1 = 0b11 (_1)
-    0 = 0b00 (_0)
-    1 = 0b01 (_1_)
-    """
-    if value == 0:
-        # return {
-        #     "original_value": 0,
-        #     "balanced_ternary_trits": [0b00],
-        #     "balanced_ternary_formatted": ["_0"],
-        #     "binary_representation": "00",
-        #     "binary_value": 0
-        # }
-        return 0
-    
-    # Define the ternary digit encodings
-    trit_encodings = {
-        -1: _1, 
-        0: _0,
-        1: _1_ 
-    }
-    
-    trit_names = {
-        0b11: "_1",   # -1
-        0b00: "_0",   # 0
-        0b01: "_1_"   # 1
-    }
-    
-    # Convert to balanced ternary
-    trits = []
-    
-    # Handle negative values by taking the absolute value and negating each trit at the end
-    is_negative = value < 0
-    abs_value = abs(value)
-    
-    while abs_value > 0:
-        remainder = abs_value % 3
-        
-        if remainder == 2:
-            # In balanced ternary, 2 is represented as -1 in the next position
-            trit = -1
-            abs_value = (abs_value + 1) // 3
-        else:
-            trit = remainder
-            abs_value = abs_value // 3
-        
-        # If the original value was negative, negate the trit
-        if is_negative:
-            trit = -trit
-            
-        trits.append(trit_encodings[trit])
-    
-    # Reverse the list since we built it from least to most significant
-    trits.reverse()
-    
-    # Format the trits for display
-    formatted_trits = [trit_names[trit] for trit in trits]
-    
-    # Convert the binary representation to an integer
-    binary_string = ''.join([f"{trit:02b}" for trit in trits])
-    binary_value = int(binary_string, 2)
-    
-    # return {
-    #     "original_value": value,
-    #     "balanced_ternary_trits": trits,
-    #     "balanced_ternary_formatted": formatted_trits,
-    #     "binary_representation": binary_string,
-    #     "binary_value": binary_value
-    # }
-    return binary_value
+        # Largest program accepted: None for what the Verilog machine in parameters.vh can hold,
+        # 0 for no limit
+        self.capacity = capacity
 
+        # Machine parameters the instructions are encoded for (parameters.vh by default), and the
+        # field positions and operand ranges that follow from them
+        self.parameters = toolchain.read_parameters("ternary") if parameters is None else dict(parameters)
+        self.layout = toolchain.instruction_layout("ternary", self.parameters)
 
-class TernaryInstructionParser:
-    def __init__(self):
-        # Program memory to store instructions (256 18-bit words)
-        self.program_memory = [0] * 256
-        self.instruction_count = 0
+        # Label addresses from the last assembled program
+        self.symbols = {}
         
         # Instruction opcodes (3 trits = 6 bits)
         # Using decimal values that correspond to 3 trits
@@ -112,23 +53,43 @@ class TernaryInstructionParser:
             'STORE': 0b110111, # 23
             'HALT':  0b111111  # 26
         }
+
+        # Instruction formats: operand fields as (operand kind, bit position), and the parse method
+        # that decodes operands in unusual spellings and reports invalid ones
+        dest, src = self.layout["dest_shift"], self.layout["src_shift"]
+        self.formats = {
+            'H': ((), None),
+            'R': ((('register', dest), ('register', src)), self.parse_registers),
+            'I': ((('register', dest), ('big_immediate', 0)), self.parse_register_big_immediate),
+            'B': ((('register', dest), ('branch_immediate', 0)), self.parse_branch_instruction),
+            'M': ((('register', dest), ('register', src), ('small_immediate', 0)), self.parse_memory_instruction),
+        }
+        self.instruction_formats = {
+            'MV': 'R', 'NOT': 'R', 'AND': 'R', 'OR': 'R', 'XOR': 'R',
+            'ADD': 'R', 'SUB': 'R', 'COMP': 'R', 'LT': 'R', 'EQ': 'R',
+            'ANDI': 'I', 'ADDI': 'I', 'LUI': 'I', 'LI': 'I',
+            'BEQ': 'B', 'BNE': 'B',
+            'LOAD': 'M', 'STORE': 'M',
+            'HALT': 'H'
+        }
+
+        # Dispatch table built on first use: mnemonic -> (opcode bits, fields, parse method)
+        self.encoders = None
     
-    def decimal_to_ternary(self, decimal, num_trits):
-        """Convert decimal to ternary representation with specified number of trits."""
-        if decimal < 0:
-            # For negative numbers in balanced ternary
-            max_val = 3**num_trits // 2
-            if abs(decimal) > max_val:
-                raise ValueError(f"Value {decimal} too large for {num_trits} trits")
-            # Convert to binary representation with the specified bit width (2 bits per trit)
-            return decimal & ((1 << (num_trits * 2)) - 1)
-        else:
-            # For positive numbers
-            max_val = 3**num_trits - 1
-            if decimal > max_val:
-                raise ValueError(f"Value {decimal} too large for {num_trits} trits")
-            # Convert to binary representation with the specified bit width (2 bits per trit)
-            return decimal & ((1 << (num_trits * 2)) - 1)
+    def decimal_to_ternary(self, decimal, num_trits, name="Value"):
+        """Encode an integer as num_trits balanced trits, 2 bits per trit, from the precomputed tables."""
+        return balanced_ternary.encode(decimal, num_trits, name)
+
+    def parse_number(self, text):
+        """Read an immediate or offset written in decimal, or in hex with or without 0x."""
+        if not isinstance(text, str):
+            return int(text)
+        if text.startswith('0x') or text.startswith('-0x'):
+            return int(text, 16)
+        try:
+            return int(text)
+        except ValueError:
+            return int(text, 16)
 
     def parse_registers(self, reg1, reg2):
         """Parse register numbers from R format strings."""
@@ -136,40 +97,26 @@ class TernaryInstructionParser:
             r1_num = int(reg1.strip()[1:])  # Remove 'R' and convert to int
             r2_num = int(reg2.strip()[1:])  # Remove 'R' and convert to int
             
-            # Ternary CPU registers are 2 trits (can represent up to 9 registers)
-            if not (0 <= r1_num <= 8 and 0 <= r2_num <= 8):
-                raise ValueError("Register numbers must be between 0 and 8")
+            # Register fields are REG_ADDR_SIZE trits (2 trits can represent up to 9 registers)
+            last = self.layout["registers"] - 1
+            if not (0 <= r1_num <= last and 0 <= r2_num <= last):
+                raise ValueError(f"Register numbers must be between 0 and {last}")
                 
             return r1_num, r2_num
         except Exception as e:
             raise ValueError(f"Invalid register format: {reg1}, {reg2}: {str(e)}")
 
     def parse_register_big_immediate(self, reg1, imm):
-        """Parse register and big immediate value (4 trits = 8 bits)."""
+        """Parse register and big immediate value (BIG_IMM_SIZE trits, -40 to 40 by default)."""
         try:
             r1_num = int(reg1.strip()[1:])  # Remove 'R' and convert to int
-            
-            # Handle hex values prefixed with 0x or not
-            if isinstance(imm, str):
-                if imm.startswith('0x'):
-                    imm_val = int(imm, 16)
-                else:
-                    try:
-                        imm_val = int_to_balanced_ternary_to_binary(int(imm))
-                    except ValueError:
-                        imm_val = int(imm, 16)
-            else:
-                imm_val = int(imm)
+            imm_val = self.parse_number(imm)
                 
-            if not (0 <= r1_num <= 8):
-                raise ValueError("Register numbers must be between 0 and 8")
+            last = self.layout["registers"] - 1
+            if not (0 <= r1_num <= last):
+                raise ValueError(f"Register numbers must be between 0 and {last}")
             
-            # 4 trits can represent values 0 to 80 (3^4 - 1)
-            if not (-40 <= imm_val <= 40):
-                raise ValueError("Big immediate value must be between -40 and 40")
-                
-            # Convert to appropriate binary representation
-            imm_binary = self.decimal_to_ternary(imm_val, 4)
+            imm_binary = self.decimal_to_ternary(imm_val, self.layout["big_digits"], "Big immediate value")
                 
             return r1_num, imm_binary
         except ValueError as e:
@@ -178,31 +125,16 @@ class TernaryInstructionParser:
             raise ValueError(f"Invalid register/immediate format: {reg1}, {imm}: {str(e)}")
         
     def parse_register_small_immediate(self, reg1, imm):
-        """Parse register and small immediate value (2 trits = 4 bits)."""
+        """Parse register and small immediate value (SMALL_IMM_SIZE trits, -4 to 4 by default)."""
         try:
             r1_num = int(reg1.strip()[1:])  # Remove 'R' and convert to int
-            
-            # Handle hex values prefixed with 0x or not
-            if isinstance(imm, str):
-                if imm.startswith('0x'):
-                    imm_val = int(imm, 16)
-                else:
-                    try:
-                        imm_val = int_to_balanced_ternary_to_binary(int(imm))
-                    except ValueError:
-                        imm_val = int(imm, 16)
-            else:
-                imm_val = int(imm)
+            imm_val = self.parse_number(imm)
                 
-            if not (0 <= r1_num <= 8):
-                raise ValueError("Register numbers must be between 0 and 8")
+            last = self.layout["registers"] - 1
+            if not (0 <= r1_num <= last):
+                raise ValueError(f"Register numbers must be between 0 and {last}")
             
-            # 2 trits can represent values -4 to 4 (balanced ternary)
-            if not (-4 <= imm_val <= 4):
-                raise ValueError("Small immediate value must be between -4 and 4")
-                
-            # Convert to appropriate binary representation
-            imm_binary = self.decimal_to_ternary(imm_val, 2)
+            imm_binary = self.decimal_to_ternary(imm_val, self.layout["small_digits"], "Small immediate value")
                 
             return r1_num, imm_binary
         except ValueError as e:
@@ -215,28 +147,14 @@ class TernaryInstructionParser:
         try:
             r1_num = int(reg1.strip()[1:])  # Remove 'R' and convert to int
             r2_num = int(reg2.strip()[1:])  # Remove 'R' and convert to int
+            offset_val = self.parse_number(offset)
             
-            # Handle offset as a small immediate
-            if isinstance(offset, str):
-                if offset.startswith('0x'):
-                    offset_val = int(offset, 16)
-                else:
-                    try:
-                        offset_val = int(offset)
-                    except ValueError:
-                        offset_val = int(offset, 16)
-            else:
-                offset_val = int(offset)
-            
-            if not (0 <= r1_num <= 8 and 0 <= r2_num <= 8):
-                raise ValueError("Register numbers must be between 0 and 8")
+            last = self.layout["registers"] - 1
+            if not (0 <= r1_num <= last and 0 <= r2_num <= last):
+                raise ValueError(f"Register numbers must be between 0 and {last}")
             
-            # 2 trits can represent values -4 to 4
-            if not (-4 <= offset_val <= 4):
-                raise ValueError("Offset must be between -4 and 4")
-                
-            # Convert to appropriate binary representation
-            offset_binary = self.decimal_to_ternary(offset_val, 2)
+            # The offset is a small immediate (SMALL_IMM_SIZE trits)
+            offset_binary = self.decimal_to_ternary(offset_val, self.layout["small_digits"], "Offset")
                 
             return r1_num, r2_num, offset_binary
         except Exception as e:
@@ -247,27 +165,16 @@ class TernaryInstructionParser:
         try:
             r1_num = int(reg1.strip()[1:])  # Remove 'R' and convert to int
             
-            # Handle immediate as a big immediate
-            if isinstance(immediate, str):
-                if immediate.startswith('0x'):
-                    imm_val = int(immediate, 16)
-                else:
-                    try:
-                        imm_val = int_to_balanced_ternary_to_binary(int(immediate))
-                    except ValueError:
-                        imm_val = int(immediate, 16)
-            else:
-                imm_val = int(immediate)
+            # Offsets resolved from labels arrive as integers and are encoded like a decimal
+            # offset written by hand
+            imm_val = self.parse_number(immediate)
                 
-            if not (0 <= r1_num <= 8):
-                raise ValueError("Register numbers must be between 0 and 8")
+            last = self.layout["registers"] - 1
+            if not (0 <= r1_num <= last):
+                raise ValueError(f"Register numbers must be between 0 and {last}")
             
-            # 4 trits can represent values -40 to 40
-            if not (-40 <= imm_val <= 40):
-                raise ValueError("Branch offset must be between -40 and 40")
-                
-            # Convert to appropriate binary representation
-            imm_binary = self.decimal_to_ternary(imm_val, 4)
+            # The offset is a big immediate (BIG_IMM_SIZE trits)
+            imm_binary = self.decimal_to_ternary(imm_val, self.layout["big_digits"], "Branch offset")
                 
             return r1_num, imm_binary
         except ValueError as e:
@@ -276,78 +183,122 @@ class TernaryInstructionParser:
             raise ValueError(f"Invalid branch instruction format: {reg1}, {immediate}: {str(e)}")
 
     def parse_line(self, line):
-        """Parse a single line of assembly."""
+        """Parse a single line of assembly. A label in front of the instruction is ignored."""
+        try:
+            split = assembler.split_line(line)
+        except ValueError as e:
+            print(f"Error processing line '{line.strip()}': {str(e)}")
+            return None
 
         # Check if the line is 3 semicolons (end of file)
-        if line.strip() == ';;;':
-            return ";;;"
+        if split == assembler.END_OF_PROGRAM:
+            return split
 
-        # Remove comments (everything after semicolon)
-        line = line.split(';')[0].strip().replace(',', '')
-        
-        # Ignore lines that are empty before the semicolon
-        if not line:
-            return None
-            
-        # Split line into tokens
-        tokens = line.split()
+        label, tokens = split
+        return self.encode(tokens)
+
+    # Operand tables are the same for every parser with the same instruction layout, so they are
+    # shared by the class
+    operand_tables = {}
+
+    def build_encoders(self):
+        """Create the operand tables and the per-instruction dispatch table."""
+        key = tuple(sorted(self.layout.items()))
+        tables = TernaryInstructionParser.operand_tables.get(key)
+        if tables is None:
+            tables = TernaryInstructionParser.operand_tables[key] = {
+                'register': assembler.OperandTable(lambda reg: self.parse_registers(reg, 'R0')[0]),
+                'big_immediate': assembler.OperandTable(lambda imm: self.parse_register_big_immediate('R0', imm)[1]),
+                'branch_immediate': assembler.OperandTable(lambda imm: self.parse_branch_instruction('R0', imm)[1]),
+                'small_immediate': assembler.OperandTable(lambda offset: self.parse_memory_instruction('R0', 'R0', offset)[2]),
+            }
+
+        self.encoders = {}
+        for instruction, opcode in self.instructions.items():
+            operands, parse = self.formats[self.instruction_formats[instruction]]
+            fields = tuple((tables[kind], shift) for kind, shift in operands)
+            self.encoders[instruction] = (opcode << self.layout["opcode_shift"], fields, parse)
+
+    def encode(self, tokens, errors=None):
+        """
+        Encode a single instruction from its tokens, or return None if it is invalid. The error
+        is printed, or appended to errors if a list is given.
+        """
+        # Ignore lines with no instruction
         if not tokens:
             return None
-            
+
+        if self.encoders is None:
+            self.build_encoders()
+
         instruction = tokens[0].upper()
-        
+        encoder = self.encoders.get(instruction)
+        if encoder is not None:
+            word = assembler.pack_fields(encoder, tokens)
+            if word is not None:
+                return word
+
         try:
-            if instruction not in self.instructions:
+            if encoder is None:
                 raise ValueError(f"Unknown instruction: {instruction}")
-                
-            opcode = self.instructions[instruction]
 
-            # Halt instruction (no operands)
-            if instruction == 'HALT':
-                return (opcode << 12)  # 6 bits shifted left by 12 bits
-            
-            # R-type instructions (register-register operations)
-            if instruction in ['MV', 'NOT', 'AND', 'OR', 'XOR', 'ADD', 'SUB', 'COMP', 'LT', 'EQ']:
-                reg_a, reg_b = self.parse_registers(tokens[1], tokens[2])
-                return (opcode << 12) | (reg_a << 8) | (reg_b << 4)
-                
-            # I-type instructions with big immediate (4 trits)
-            if instruction in ['ANDI', 'ADDI', 'SRI', 'SLI', 'LUI', 'LI']:
-                reg_a, imm = self.parse_register_big_immediate(tokens[1], tokens[2])
-                return (opcode << 12) | (reg_a << 8) | imm
-            
-            # Branch instructions
-            if instruction in ['BEQ', 'BNE']:
-                reg_a, immediate = self.parse_branch_instruction(tokens[1], tokens[2])
-                return (opcode << 12) | (reg_a << 8) | immediate
-                
-            # Memory instructions
-            if instruction in ['LOAD', 'STORE']:
-                reg_a, reg_b, small_imm = self.parse_memory_instruction(tokens[1], tokens[2], tokens[3])
-                return (opcode << 12) | (reg_a << 8) | (reg_b << 4) | small_imm
-                
+            # Operands outside the tables go through the format's parse method
+            word, fields, parse = encoder
+            operands = [tokens[i] for i in range(1, len(fields) + 1)]
+            if parse is not None:
+                for (_, shift), value in zip(fields, parse(*operands)):
+                    word |= value << shift
+            return word
+
         except (IndexError, ValueError) as e:
+            if errors is not None:
+                errors.append(str(e))
+                return None
+            line = ' '.join(str(token) for token in tokens)
             print(f"Error processing line '{line}': {str(e)}")
             return None
-        
-        return None
 
-    def assemble(self, input_file, output_file):
-        """Assemble input file to hex output."""
+    def stream(self, lines):
+        """
+        Assemble any iterable of source lines (an open file, sys.stdin, a socket's makefile()),
+        yielding (line number, address, word) for each word in address order and an
+        assembler.Diagnostic for each invalid line. Label addresses are kept in self.symbols.
+        """
+        self.symbols = {}
+        return assembler.stream(self, lines, self.symbols)
+
+    def store_program(self, words):
+        """Replace program memory with assembled words, checking that they fit the target machine."""
+        capacity = toolchain.program_capacity("ternary", self.parameters) if self.capacity is None else self.capacity
+        if capacity and len(words) > capacity:
+            raise ValueError(f"Program of {len(words)} instructions does not fit in the {capacity} words of "
+                             f"program memory (MEM_SIZE/INS_ADDR_SIZE in parameters.vh, or --capacity)")
+        self.program_memory = array('I', words)
+        self.instruction_count = len(words)
+
+    def assemble(self, input_file, output_file, cache=False, output_format="hex"):
+        """
+        Assemble input file to hex output, optionally reusing the on-disk assembly cache.
+        With output_format="image" a packed program image is written instead (see program_image.py).
+        """
         try:
             with open(input_file, 'r') as f:
-                for line in f:
-                    instruction = self.parse_line(line)
-                    if instruction == ";;;":
-                        break
-                    elif instruction is not None:
-                        self.program_memory[self.instruction_count] = instruction
-                        self.instruction_count += 1
+                if cache:
+                    assembly = assembly_cache.AssemblyCache(self)
+                    words, self.symbols, _ = assembly.assemble(f.read())
+                    assembly.save()
+                else:
+                    words, self.symbols = assembler.assemble(self, f)
+
+            self.store_program(words)
                         
-            # Write hex output (18-bit word size = 5 hex digits)
-            with open(output_file, 'w') as f:
-                for i in range(self.instruction_count):
-                    f.write(f"{self.program_memory[i]:05x}\n")
+            if output_format == "image":
+                program_image.write_image(output_file, self.program_memory[:self.instruction_count], "ternary")
+            else:
+                # Write hex output (18-bit word size = 5 hex digits)
+                with open(output_file, 'w') as f:
+                    for i in range(self.instruction_count):
+                        f.write(f"{self.program_memory[i]:05x}\n")
                     
             print(f"Successfully assembled {self.instruction_count} ternary instructions")
             
@@ -363,24 +314,24 @@ def main():
     parser.add_argument("--file", type=str, default="program", help="Input assembly file")
     parser.add_argument("--filepath", type=str, default=None, help="Input assembly filepath")
     parser.add_argument("--output", type=str, default="programs/bin/program.hex", help="Output hex filepath")
+    parser.add_argument("--format", type=str, default="hex", choices=["hex", "image"], help="Output as text hex or a packed program image")
+    parser.add_argument("--capacity", type=int, default=None, help="Largest program in words (default: from parameters.vh, 0 for no limit)")
+    parser.add_argument("--cache", action="store_true", help="Reuse unchanged programs and lines from the assembly cache")
+    parser.add_argument("--batch", type=str, default=None, help="Assemble a directory or glob of .asm files for both architectures")
+    parser.add_argument("--batch-output", type=str, default="programs/bin/batch", help="Output directory for --batch")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes for --batch (default: all cores)")
 
     args = parser.parse_args()
+    if args.batch is not None:
+        batch_assembler.run_batch(args.batch, args.batch_output, args.processes)
+        return
+
     if args.filepath is None:
         args.filepath = "programs/" + args.file + ".asm"
 
-    parser = TernaryInstructionParser()
-    parser.assemble(args.filepath, args.output)
-
+    parser = TernaryInstructionParser(capacity=args.capacity)
+    parser.assemble(args.filepath, args.output, cache=args.cache, output_format=args.format)
 
-def test():
-    for test_value in [0, 10, -10, 42, -42]:
-        result = int_to_balanced_ternary_to_binary(test_value)
-        print(f"Original: {result['original_value']}")
-        print(f"Balanced ternary: {result['balanced_ternary_formatted']}")
-        print(f"Binary representation: {result['binary_representation']}")
-        print(f"Binary value: {result['binary_value']}")
-        print()
 
 if __name__ == "__main__":
     main()
-    # test()
\ No newline at end of file
@@ -7,15 +7,15 @@ IF "%1"=="" (
     SET SRC_DIR=%1
 )
 
-REM Clean up any previous simulation files
-cd %SRC_DIR%/testbenches
-del /f main.vvp
-cd ../
+cd %SRC_DIR%
 
-REM Compile the Verilog files
-iverilog -o testbenches/main.vvp -Psystem_tb.VERBOSE=0 alu.v program_counter.v registers.v fetch_instruction.v decode_instruction.v control.v memory.v cpu.v program_loader.v machine.v testbenches/system_tb.v
-REM Run the simulation
-vvp testbenches/main.vvp
+REM Compile the Verilog files, or reuse the cached build if the RTL has not changed
+SET VVP=
+FOR /F "delims=" %%V IN ('python ../../testbench_cache.py ternary -P system_tb.VERBOSE=0') DO SET VVP=%%V
+IF "%VVP%"=="" EXIT /B 1
+
+REM Run the simulation on the assembled program
+vvp "%VVP%" +program=programs/bin/program.hex
 
 @REM REM View waveforms
 @REM start gtkwave main.vcd
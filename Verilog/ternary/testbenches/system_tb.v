@@ -1,6 +1,8 @@
 `timescale 1ns/1ps
 
 module system_tb;
+    `include "parameters.vh"
+
     // Configuration parameter
     parameter VERBOSE = 1; // Set to 0 to disable display messages, 1 to enable
     
@@ -9,12 +11,18 @@ module system_tb;
     reg reset;
     reg start;
     reg execution_done;
-    reg [17:0] prev_pc;
+    reg [2*WORD_SIZE-1:0] prev_pc;
     integer wait_cycles;
 
+    // Per-cycle trace written as JSON lines to the file named by +trace=<path>
+    reg [8*256:1] trace_path;
+    integer trace_file;
+    integer cycle;
+    integer last_not, last_and, last_or, last_xor, last_any;
+
     // Define a function to convert ternary values to integer
     function integer ternary_to_integer_func;
-        input [17:0] ternary_val;
+        input [2*WORD_SIZE-1:0] ternary_val;
 
         integer i, result;
         reg [1:0] current_trit;
@@ -22,20 +30,9 @@ module system_tb;
         begin
             result = 0; // Initialize result to 0
 
-            for (i = 0; i < 18; i = i + 1) begin
-                // Extract the trit using a case statement instead of variable indexing
-                case(i)
-                    0: current_trit = ternary_val[1:0];
-                    1: current_trit = ternary_val[3:2];
-                    2: current_trit = ternary_val[5:4];
-                    3: current_trit = ternary_val[7:6];
-                    4: current_trit = ternary_val[9:8];
-                    5: current_trit = ternary_val[11:10];
-                    6: current_trit = ternary_val[13:12];
-                    7: current_trit = ternary_val[15:14];
-                    8: current_trit = ternary_val[17:16];
-                    default: current_trit = 2'b00;
-                endcase
+            for (i = 0; i < WORD_SIZE; i = i + 1) begin
+                // Extract the trit by shifting instead of variable indexing
+                current_trit = ternary_val >> (2*i);
 
                 case(current_trit)
                     `_1: result = result - (3**i);  // - contribution
@@ -66,14 +63,14 @@ module system_tb;
     );
     
     // Monitor CPU registers for debugging
-    wire [17:0] r0 = uut.cpu.regs.regs[0];
-    wire [17:0] r1 = uut.cpu.regs.regs[1];
-    wire [17:0] r2 = uut.cpu.regs.regs[2];
-    wire [17:0] r3 = uut.cpu.regs.regs[3];
-    wire [17:0] r4 = uut.cpu.regs.regs[4];
-    wire [17:0] r5 = uut.cpu.regs.regs[5];
-    wire [17:0] r6 = uut.cpu.regs.regs[6];
-    wire [17:0] r7 = uut.cpu.regs.regs[7];
+    wire [2*WORD_SIZE-1:0] r0 = uut.cpu.regs.regs[0];
+    wire [2*WORD_SIZE-1:0] r1 = uut.cpu.regs.regs[1];
+    wire [2*WORD_SIZE-1:0] r2 = uut.cpu.regs.regs[2];
+    wire [2*WORD_SIZE-1:0] r3 = uut.cpu.regs.regs[3];
+    wire [2*WORD_SIZE-1:0] r4 = uut.cpu.regs.regs[4];
+    wire [2*WORD_SIZE-1:0] r5 = uut.cpu.regs.regs[5];
+    wire [2*WORD_SIZE-1:0] r6 = uut.cpu.regs.regs[6];
+    wire [2*WORD_SIZE-1:0] r7 = uut.cpu.regs.regs[7];
     
     // Test sequence
     initial begin
@@ -102,11 +99,57 @@ module system_tb;
         // Monitor system state
         wait(uut.system_state == uut.EXECUTING);
         if (VERBOSE) $display("Program Execution Started");
+
+        // Open the trace stream if one was requested
+        trace_file = 0;
+        cycle = 0;
+        last_not = counter.not_count;
+        last_and = counter.and_count;
+        last_or = counter.or_count;
+        last_xor = counter.xor_count;
+        last_any = counter.any_count;
+        if ($value$plusargs("trace=%s", trace_path)) begin
+            trace_file = $fopen(trace_path, "w");
+            if (trace_file == 0)
+                $display("Error: Could not open trace file %0s", trace_path);
+            else
+                $fwrite(trace_file, "{\"arch\":\"ternary\",\"gates\":[\"NOT\",\"AND\",\"OR\",\"XOR\",\"ANY\"]}\n");
+        end
         
         // Monitor execution
         while (!execution_done && uut.system_state == uut.EXECUTING) begin
             // Display register values on each clock cycle
             @(posedge clock);
+
+            // Write one trace record per cycle (raw bit patterns, decoded by trace_reader.py)
+            if (trace_file != 0) begin
+                $fwrite(trace_file, "{\"cycle\":%0d,\"pc\":%0d,\"state\":%0d,\"opcode\":%0d",
+                        cycle, uut.cpu.program_counter, uut.cpu.state, uut.cpu.opcode);
+                if (uut.cpu.state == 4)  // ALU state (STATE_ALU)
+                    $fwrite(trace_file, ",\"alu\":%0d", uut.cpu.alu_out);
+                if (uut.cpu.do_reg_store)
+                    $fwrite(trace_file, ",\"reg\":[%0d,%0d]", uut.cpu.reg_dest, uut.cpu.reg_val);
+                if (uut.cpu.mem_write)
+                    $fwrite(trace_file, ",\"mem\":[%0d,%0d]", uut.cpu.mem_address, uut.cpu.mem_write_data);
+                if (counter.not_count != last_not ||
+                    counter.and_count != last_and ||
+                    counter.or_count != last_or ||
+                    counter.xor_count != last_xor ||
+                    counter.any_count != last_any)
+                    $fwrite(trace_file, ",\"gates\":[%0d,%0d,%0d,%0d,%0d]",
+                            counter.not_count - last_not,
+                            counter.and_count - last_and,
+                            counter.or_count - last_or,
+                            counter.xor_count - last_xor,
+                            counter.any_count - last_any);
+                $fwrite(trace_file, "}\n");
+            end
+            cycle = cycle + 1;
+            last_not = counter.not_count;
+            last_and = counter.and_count;
+            last_or = counter.or_count;
+            last_xor = counter.xor_count;
+            last_any = counter.any_count;
             if (VERBOSE) begin
                 $display("PC    =%0d, State=%1d", ternary_to_integer_func(uut.cpu.program_counter), uut.cpu.ctrl.state);
                 $display("Opcode=%6b", uut.cpu.opcode);
@@ -126,7 +169,7 @@ module system_tb;
                             uut.cpu.mem_address, uut.cpu.mem_write_data);
                 
                 // Display ALU operations
-                if (uut.cpu.state == 4)  // Write Back state
+                if (uut.cpu.state == 4)  // ALU state (STATE_ALU)
                     $display("ALU Result=%d", uut.cpu.alu_out);
             end
                 
@@ -144,14 +187,19 @@ module system_tb;
         
         // Display final register values - always show these regardless of verbose setting
         $display("\nFinal Register Values:");
-        for (integer i = 0; i < 8; i = i + 1) begin
+        for (integer i = 0; i < REG_NUM; i = i + 1) begin
             // Display the values in decimal
             $display("R%0d=%3d - %b", i, ternary_to_integer_func(uut.cpu.regs.regs[i]), uut.cpu.regs.regs[i]);
         end
 
+        // Cycles executed, read by farm.py and sweep.py
+        $display("Cycles: %0d", cycle);
+
         // Display gate counts - always show regardless of verbose setting
         counter.display_counts;
 
+        if (trace_file != 0) $fclose(trace_file);
+
         // Save gate counts to file
         counter.save_counts("programs/program_gate_counts.csv");
 
@@ -0,0 +1,264 @@
+"""
+Assembler Core
+--------------
+Shared front end for the binary and ternary assemblers. It strips comments, keeps a symbol table
+of labels and resolves branch targets, leaving each architecture's parser to encode a single
+instruction from its tokens (the parser's encode() method).
+
+A label is a name followed by a colon, on its own line or in front of an instruction, and stands
+for the address of the next instruction:
+
+MULT_LOOP_1:
+    EQ R0, R6, R0
+    BEQ R0, MULT_END_1
+
+A branch whose offset names a label is encoded with the offset from the branch to the label,
+exactly as if that offset had been written by hand. Branches to labels further down the program
+are backpatched when the label is reached, so the source is read once and each line encoded once.
+
+stream() yields each word with its source line and address as soon as it is final, with invalid
+lines as Diagnostic objects, so any iterable of lines (stdin, a socket) can be assembled in
+memory; assemble() collects the words and prints the diagnostics.
+"""
+
+import bisect
+import re
+
+END_OF_PROGRAM = ";;;"
+
+LABEL_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*$")
+
+# Instructions whose last operand is an offset from the instruction's own address
+BRANCH_INSTRUCTIONS = ("BEQ", "BNE")
+
+
+def split_line(line):
+    """
+    Split a source line into (label, tokens), or return END_OF_PROGRAM for ';;;'.
+    label is None if the line does not define one and tokens is empty if it has no instruction.
+    """
+    # Remove comments (everything after semicolon)
+    text = line.split(';', 1)[0]
+
+    label = None
+    if ':' in text:
+        label, _, text = text.partition(':')
+        label = label.strip()
+        if not LABEL_PATTERN.match(label):
+            raise ValueError(f"Invalid label: {label}")
+
+    tokens = text.replace(',', '').split()
+    if not tokens and label is None and line.strip() == END_OF_PROGRAM:
+        return END_OF_PROGRAM
+    return label, tokens
+
+
+def label_operand(tokens):
+    """Return the label named by a branch instruction's offset, or None."""
+    if len(tokens) > 1 and tokens[0].upper() in BRANCH_INSTRUCTIONS and LABEL_PATTERN.match(tokens[-1]):
+        return tokens[-1]
+    return None
+
+
+def with_offset(tokens, offset):
+    """Replace the offset operand of a branch instruction."""
+    return tokens[:-1] + [offset]
+
+
+class Diagnostic:
+    """An invalid source line: its 1-based line number, its text and what is wrong with it."""
+
+    def __init__(self, line, text, message):
+        self.line = line
+        self.text = text
+        self.message = message
+
+    def __str__(self):
+        return f"Error processing line '{self.text}': {self.message}"
+
+    def to_dict(self):
+        return {"line": self.line, "text": self.text, "message": self.message}
+
+
+def stream(parser, lines, symbols=None):
+    """
+    Assemble an iterable of source lines (a file, sys.stdin, a socket's makefile() or a list)
+    with an architecture parser, one line at a time. Yields (line number, address, word) for
+    each word in address order, and a Diagnostic for each invalid line, which is skipped.
+    Addresses are word indexes from 0. If a dict is given as symbols, the address of each label
+    is added to it.
+
+    Words are yielded as soon as they are encoded, except that a branch to a label further down
+    holds back itself and the words after it until the label is reached. A second definition of
+    a label is a Diagnostic and is ignored. A branch whose label is too far away to encode, or
+    is never defined (and is not an offset the parser can encode), is a Diagnostic once that is
+    known, and the held words after it move up an address. ';;;' ends the program.
+    """
+    symbols = {} if symbols is None else symbols
+    pending = {}  # Label -> [entry] of branches waiting for it
+    held = []     # [line number, address, word, tokens] entries not yet yielded, in address order
+    address = 0
+
+    for number, line in enumerate(lines, 1):
+        try:
+            split = split_line(line)
+        except ValueError as e:
+            yield Diagnostic(number, line.strip(), str(e))
+            continue
+        if split == END_OF_PROGRAM:
+            break
+        label, tokens = split
+
+        if label is not None and label in symbols:
+            yield Diagnostic(number, line.strip(), f"Duplicate label: {label}")
+        elif label is not None:
+            symbols[label] = address
+            failed = []
+            for entry in pending.pop(label, ()):
+                errors = []
+                entry[2] = _encode_branch(parser, entry[3], address - entry[1], errors)
+                if entry[2] is None:
+                    yield Diagnostic(entry[0], ' '.join(entry[3]), errors[0])
+                    failed.append(entry)
+            if failed:
+                held = _remove(parser, held, symbols, failed)
+                address -= len(failed)
+
+        if tokens:
+            errors = []
+            target = label_operand(tokens)
+            waiting = target is not None and target not in symbols
+            if target in symbols:
+                word = _encode_branch(parser, tokens, symbols[target] - address, errors)
+            else:
+                # A branch waiting for its label is checked with offset 0, so an invalid line is
+                # skipped like any other
+                word = parser.encode(with_offset(tokens, 0) if waiting else tokens, errors)
+
+            if word is None:
+                text = ' '.join(str(token) for token in tokens)
+                yield Diagnostic(number, text, errors[0] if errors else "Invalid instruction")
+                continue
+            entry = [number, address, None if waiting else word, tokens]
+            if waiting:
+                pending.setdefault(target, []).append(entry)
+            held.append(entry)
+            address += 1
+
+        # Yield everything up to the first branch still waiting for its label. A branch over a
+        # waiting branch is held as well, as its offset shrinks if that branch is skipped
+        resolved = 0
+        while resolved < len(held) and held[resolved][2] is not None:
+            entry = held[resolved]
+            target = label_operand(entry[3])
+            if target in symbols and symbols[target] > entry[1]:
+                waiting = next((later[1] for later in held[resolved:] if later[2] is None), None)
+                if waiting is not None and waiting < symbols[target]:
+                    break
+            yield entry[0], entry[1], entry[2]
+            resolved += 1
+        del held[:resolved]
+
+    # Names that never became labels may still be valid offsets for the parser (such as hex);
+    # branches to any other name are reported and skipped
+    undefined = []
+    for target, branches in pending.items():
+        for entry in branches:
+            entry[2] = parser.encode(entry[3], [])
+            if entry[2] is None:
+                undefined.append(entry)
+    for entry in sorted(undefined, key=lambda entry: entry[0]):
+        yield Diagnostic(entry[0], ' '.join(entry[3]), f"Undefined label: {label_operand(entry[3])}")
+    if undefined:
+        held = _remove(parser, held, symbols, undefined)
+
+    for number, address, word, _ in held:
+        yield number, address, word
+
+
+def assemble(parser, lines, line_numbers=None):
+    """
+    Assemble an iterable of source lines with an architecture parser.
+    Returns (words, symbols), where symbols maps each label to its instruction address.
+    If a list is given as line_numbers, the 1-based source line of each word is appended to it.
+
+    Invalid instructions, duplicate labels and branches to undefined or out of range labels are
+    reported (printed) and skipped, and ';;;' ends the program.
+    """
+    words = []
+    symbols = {}
+    for item in stream(parser, lines, symbols):
+        if isinstance(item, Diagnostic):
+            print(item)
+            continue
+        number, _, word = item
+        words.append(word)
+        if line_numbers is not None:
+            line_numbers.append(number)
+    return words, symbols
+
+
+def _encode_branch(parser, tokens, offset, errors):
+    """Encode a branch to a label at offset, or return None with the reason appended to errors."""
+    attempt = []
+    word = parser.encode(with_offset(tokens, offset), attempt)
+    if word is None:
+        if parser.encode(with_offset(tokens, 0), []) is not None:
+            attempt = [f"Branch to {tokens[-1]} is out of range (offset {offset})"]
+        errors.extend(attempt)
+    return word
+
+
+def _remove(parser, held, symbols, removed):
+    """
+    The held entries without the removed ones. The words and labels after each removed entry
+    move up an address, and their branches to labels are encoded again, as those offsets only
+    get shorter.
+    """
+    addresses = sorted(entry[1] for entry in removed)
+    for label, label_address in symbols.items():
+        symbols[label] = label_address - bisect.bisect_left(addresses, label_address)
+    removed = {id(entry) for entry in removed}
+    kept = [entry for entry in held if id(entry) not in removed]
+    for entry in kept:
+        entry[1] -= bisect.bisect_left(addresses, entry[1])
+        target = label_operand(entry[3])
+        if entry[2] is not None and target in symbols:
+            entry[2] = parser.encode(with_offset(entry[3], symbols[target] - entry[1]))
+    return kept
+
+
+class OperandTable(dict):
+    """
+    Field values of operand spellings for the table-driven encoders. Each spelling is decoded by
+    its parse method the first time it is seen and looked up directly after that. probe parses
+    a single operand and raises ValueError (or fails on the wrong type) for invalid ones, which
+    are left for the parse method to report.
+    """
+
+    def __init__(self, probe):
+        super().__init__()
+        self.probe = probe
+
+    def __missing__(self, spelling):
+        try:
+            value = self.probe(spelling)
+        except (ValueError, TypeError, AttributeError):
+            raise KeyError(spelling)
+        self[spelling] = value
+        return value
+
+
+def pack_fields(encoder, tokens):
+    """
+    Pack an instruction with one lookup per operand. encoder is (opcode bits, fields, parse)
+    where fields are (OperandTable, bit position) pairs. Returns None if an operand is missing or
+    invalid, leaving the parse method to report the error.
+    """
+    word, fields, _ = encoder
+    try:
+        for i, (values, shift) in enumerate(fields, 1):
+            word |= values[tokens[i]] << shift
+    except (KeyError, IndexError, TypeError):
+        return None
+    return word
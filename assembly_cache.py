@@ -0,0 +1,131 @@
+"""
+Assembly Cache
+--------------
+On-disk cache of assembled programs for InstructionParser and TernaryInstructionParser.
+
+Two levels are kept per assembler:
+- programs: the words and labels of a whole source file, keyed on a hash of its contents, so an
+  unchanged program is not assembled again.
+- lines: the word encoded for each instruction, keyed on its tokens (with their types, so a branch
+  offset resolved from a label is not taken for the same digits written by hand), so an edited
+  program only encodes the lines that changed.
+Both levels are bounded (MAX_PROGRAMS and MAX_LINES), dropping the least recently used entries.
+
+The cache is dropped whenever compiler.py, assembler.py, balanced_ternary.py or this file change,
+or the instruction layout set by parameters.vh does, so stale encodings are never reused after the
+assembler itself is edited.
+"""
+
+import hashlib
+import inspect
+import os
+import pickle
+
+import assembler
+import balanced_ternary
+import toolchain
+
+CACHE_DIR = os.path.join(toolchain.ROOT_DIR, ".assembly_cache")
+
+# Programs kept per assembler before the oldest are dropped
+MAX_PROGRAMS = 256
+
+# Encoded lines kept per assembler before the least recently used are dropped
+MAX_LINES = 8192
+
+
+def _file_hash(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class CachedEncoder:
+    """Wraps an assembler's encode() with the line cache."""
+
+    def __init__(self, parser, lines):
+        self.parser = parser
+        self.lines = lines
+        self.misses = 0
+
+    def encode(self, tokens, errors=None):
+        key = tuple((type(token).__name__, token) for token in tokens)
+        word = self.lines.pop(key, None)
+        if word is not None:
+            # Most recently used lines are kept last
+            self.lines[key] = word
+        else:
+            self.misses += 1
+            word = self.parser.encode(tokens, errors)
+            # Invalid lines are not cached so their errors are reported every time
+            if word is not None:
+                self.lines[key] = word
+        return word
+
+
+class AssemblyCache:
+    """The cache for one assembler, stored in <cache_dir>/<parser class>.pickle."""
+
+    def __init__(self, parser, cache_dir=CACHE_DIR):
+        self.parser = parser
+        self.path = os.path.join(cache_dir, f"{type(parser).__name__}.pickle")
+        self.version = (_file_hash(inspect.getfile(type(parser)), assembler.__file__, balanced_ternary.__file__, __file__), sorted(parser.layout.items()))
+        self.programs = {}
+        self.lines = {}
+        self.changed = False
+
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+            if data.get("version") == self.version:
+                self.programs = data["programs"]
+                self.lines = data["lines"]
+        except (OSError, EOFError, pickle.UnpicklingError, KeyError, AttributeError):
+            pass
+
+    def assemble(self, source):
+        """
+        Assemble source text, reusing cached results where possible. Invalid lines are reported
+        (printed) on every run, including when the whole program comes from the cache.
+        Returns (words, symbols, hit) where hit is True if the whole program came from the cache.
+        """
+        key = hashlib.sha256(source.encode()).hexdigest()
+        program = self.programs.get(key)
+        if program is not None:
+            # Most recently used programs are kept last
+            self.programs[key] = self.programs.pop(key)
+            for diagnostic in program["diagnostics"]:
+                print(assembler.Diagnostic(*diagnostic))
+            return list(program["words"]), dict(program["symbols"]), True
+
+        encoder = CachedEncoder(self.parser, self.lines)
+        words = []
+        symbols = {}
+        diagnostics = []
+        for item in assembler.stream(encoder, source.splitlines(), symbols):
+            if isinstance(item, assembler.Diagnostic):
+                print(item)
+                diagnostics.append((item.line, item.text, item.message))
+            else:
+                words.append(item[2])
+        self.programs[key] = {"words": words, "symbols": symbols, "diagnostics": diagnostics}
+        while len(self.programs) > MAX_PROGRAMS:
+            del self.programs[next(iter(self.programs))]
+        while len(self.lines) > MAX_LINES:
+            del self.lines[next(iter(self.lines))]
+        self.changed = True
+        return words, symbols, False
+
+    def save(self):
+        """Write the cache back to disk if anything was added."""
+        if not self.changed:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as f:
+            pickle.dump({"version": self.version, "programs": self.programs, "lines": self.lines}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, self.path)
+        self.changed = False
@@ -0,0 +1,69 @@
+"""
+Balanced Ternary Encoding
+-------------------------
+Scalar encoding of integers as the ternary machine's 2-bit-per-trit words, for the assembler and
+the simulator (ternary_codec.py does the same for whole NumPy arrays).
+
+Trit encoding (trit i of a word occupies bits 2i+1:2i):
+-1 = 0b11 (_1)
+ 0 = 0b00 (_0)
+ 1 = 0b01 (_1_)
+
+Every width in use (2-trit small immediates, 4-trit big immediates and branch offsets, 9-trit
+words) has a table of the encoding of each representable value, built once per process, so
+encoding an operand is a range check and a list lookup. Range errors name the logical range of
+the field, not the range of its bit pattern.
+"""
+
+from functools import lru_cache
+
+_1 = 0b11
+_0 = 0b00
+_1_ = 0b01
+
+TRIT_CODES = {-1: _1, 0: _0, 1: _1_}
+CODE_VALUES = {_1: -1, _0: 0, _1_: 1}
+
+WORD_TRITS = 9
+
+
+def value_range(trits):
+    """Smallest and largest integers representable in the given number of balanced trits."""
+    half = (3 ** trits - 1) // 2
+    return -half, half
+
+
+@lru_cache(maxsize=None)
+def encode_table(trits):
+    """Encoded word of every value from -half to +half, indexed by value + half."""
+    low, high = value_range(trits)
+    table = []
+    for value in range(low, high + 1):
+        word = 0
+        for i in range(trits):
+            remainder = value % 3
+            trit = -1 if remainder == 2 else remainder
+            word |= TRIT_CODES[trit] << (2 * i)
+            value = (value - trit) // 3
+        table.append(word)
+    return table
+
+
+@lru_cache(maxsize=None)
+def decode_table(trits):
+    """Value of every valid encoded word (words holding the unused code 0b10 are left out)."""
+    low, _ = value_range(trits)
+    return {word: low + index for index, word in enumerate(encode_table(trits))}
+
+
+def encode(value, trits=WORD_TRITS, name="Value"):
+    """Encode an integer in the given number of trits. Raises ValueError if it does not fit."""
+    half = (3 ** trits - 1) // 2
+    if not -half <= value <= half:
+        raise ValueError(f"{name} must be between {-half} and {half}")
+    return encode_table(trits)[value + half]
+
+
+def decode(word, trits=WORD_TRITS):
+    """Integer value of an encoded word, or None if a trit holds the unused code 0b10."""
+    return decode_table(trits).get(word)
@@ -0,0 +1,113 @@
+"""
+Batch Assembler
+---------------
+Assembles a whole corpus of .asm programs for both architectures in one run. Worker processes
+load both assemblers once and keep them for every program they are given, so a corpus costs one
+interpreter start-up and one opcode table per worker rather than one per program and target.
+
+Outputs go to <output_dir>/<arch>/<program>.hex, with a manifest.json listing every program,
+its outputs, word counts, labels and any error.
+"""
+
+import glob
+import json
+import multiprocessing
+import os
+
+import assembler
+import toolchain
+
+MANIFEST_NAME = "manifest.json"
+
+# Assemblers kept by each worker process between programs
+_parsers = {}
+
+
+def find_sources(pattern):
+    """Return the .asm files in a directory (recursively) or matching a glob pattern, sorted."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "**", "*.asm")
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+
+def output_path(output_dir, arch, source, base_dir):
+    """Path of the .hex output for a source file, mirroring its location below base_dir."""
+    relative = os.path.relpath(os.path.abspath(source), os.path.abspath(base_dir)) if base_dir else os.path.basename(source)
+    return os.path.join(output_dir, arch, os.path.splitext(relative)[0] + ".hex")
+
+
+def _init_worker(architectures):
+    for arch in architectures:
+        _parsers[arch] = toolchain.new_parser(arch)
+
+
+def _assemble_source(task):
+    source, outputs = task
+    entry = {"source": source, "targets": {}}
+    try:
+        with open(source, 'r') as f:
+            lines = f.readlines()
+    except OSError as e:
+        entry["error"] = str(e)
+        return entry
+
+    for arch, path in outputs.items():
+        target = {"output": path}
+        try:
+            words, symbols = assembler.assemble(_parsers[arch], lines)
+            # Refuses programs larger than the target's program memory
+            _parsers[arch].store_program(words)
+            toolchain.write_hex(path, words, arch)
+            target["words"] = len(words)
+            target["symbols"] = symbols
+        except (OSError, ValueError) as e:
+            target["error"] = str(e)
+        entry["targets"][arch] = target
+    return entry
+
+
+def assemble_batch(sources, output_dir, architectures=toolchain.ARCHITECTURES, processes=None, base_dir=None):
+    """
+    Assemble every source file for each architecture and write the manifest.
+    Returns the manifest entries, one per source in the order given.
+    """
+    tasks = [
+        (source, {arch: output_path(output_dir, arch, source, base_dir) for arch in architectures})
+        for source in sources
+    ]
+
+    processes = min(processes or multiprocessing.cpu_count(), max(len(tasks), 1))
+    if processes > 1:
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(architectures,)) as pool:
+            entries = pool.map(_assemble_source, tasks, chunksize=max(1, len(tasks) // (4 * processes)))
+    else:
+        _init_worker(architectures)
+        entries = list(map(_assemble_source, tasks))
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as f:
+        json.dump({"architectures": list(architectures), "programs": entries}, f, indent=2)
+    return entries
+
+
+def run_batch(pattern, output_dir, processes=None):
+    """Assemble the programs matching a directory or glob and print a summary."""
+    sources = find_sources(pattern)
+    if os.path.isdir(pattern):
+        base_dir = pattern
+    else:
+        base_dir = os.path.commonpath([os.path.dirname(os.path.abspath(source)) for source in sources]) if sources else None
+    entries = assemble_batch(sources, output_dir, processes=processes, base_dir=base_dir)
+
+    failures = 0
+    for entry in entries:
+        errors = [entry["error"]] if "error" in entry else [
+            f"{arch}: {target['error']}" for arch, target in entry["targets"].items() if "error" in target
+        ]
+        if errors:
+            failures += 1
+            print(f"Error assembling {entry['source']}: {'; '.join(errors)}")
+
+    print(f"Successfully assembled {len(entries) - failures} of {len(entries)} programs "
+          f"into {os.path.join(output_dir, MANIFEST_NAME)}")
+    return entries
@@ -0,0 +1,100 @@
+"""
+Assembler Micro-Benchmark
+-------------------------
+Measures how many source lines per second InstructionParser (16-bit binary) and
+TernaryInstructionParser (18-bit ternary) encode, on a machine-generated stress program that
+uses every instruction format.
+
+With --baseline, the compiler.py files from an earlier git revision are timed on the same lines,
+for before/after comparisons:
+
+python benchmark_assembler.py --baseline HEAD~1
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import time
+import types
+
+import toolchain
+
+# Operand spellings for each instruction, valid on both architectures
+OPERANDS = {
+    'R': lambda rng: [f"R{rng.randrange(8)}", f"R{rng.randrange(8)}"],
+    'I': lambda rng: [f"R{rng.randrange(8)}", str(rng.randrange(5))],
+    'B': lambda rng: [f"R{rng.randrange(8)}", str(rng.randrange(-4, 5))],
+    'M': lambda rng: [f"R{rng.randrange(8)}", f"R{rng.randrange(8)}", str(rng.randrange(5))],
+    'H': lambda rng: [],
+}
+
+INSTRUCTION_FORMATS = {
+    'MV': 'R', 'NOT': 'R', 'AND': 'R', 'OR': 'R', 'XOR': 'R',
+    'ADD': 'R', 'SUB': 'R', 'COMP': 'R', 'LT': 'R', 'EQ': 'R',
+    'ANDI': 'I', 'ADDI': 'I', 'LUI': 'I', 'LI': 'I',
+    'BEQ': 'B', 'BNE': 'B',
+    'LOAD': 'M', 'STORE': 'M',
+    'HALT': 'H',
+}
+
+
+def stress_program(lines, seed=0):
+    """Generate source lines drawing instructions uniformly from every format."""
+    rng = random.Random(seed)
+    mnemonics = list(INSTRUCTION_FORMATS)
+    program = []
+    for _ in range(lines):
+        mnemonic = rng.choice(mnemonics)
+        operands = OPERANDS[INSTRUCTION_FORMATS[mnemonic]](rng)
+        program.append(f"{mnemonic} {', '.join(operands)}  ; generated\n")
+    return program
+
+
+def load_revision(arch, revision):
+    """Load an architecture's compiler.py as it was at a git revision."""
+    relative = f"Verilog/{arch}/programs/compiler.py"
+    path = os.path.join(toolchain.ROOT_DIR, relative)
+    source = subprocess.check_output(["git", "show", f"{revision}:{relative}"], cwd=toolchain.ROOT_DIR, text=True)
+    module = types.ModuleType(f"{arch}_compiler_{revision}")
+    module.__file__ = path
+    exec(compile(source, path, "exec"), module.__dict__)
+    return module
+
+
+def lines_per_second(parser, lines, repeat):
+    """Best-of-repeat rate of parse_line over the given lines."""
+    parse_line = parser.parse_line
+    parse_line(lines[0])  # Build any lazily created tables outside the timing
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            parse_line(line)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark assembler encoding throughput")
+
+    parser.add_argument("--lines", type=int, default=100000, help="Lines in the generated stress program")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per assembler (best is reported)")
+    parser.add_argument("--baseline", type=str, default=None, help="Git revision to compare against")
+
+    args = parser.parse_args()
+    lines = stress_program(args.lines)
+
+    print(f"{'Assembler':<10} {'Revision':<12} {'Lines/sec':>12}")
+    for arch in toolchain.ARCHITECTURES:
+        rate = lines_per_second(toolchain.new_parser(arch), lines, args.repeat)
+        print(f"{arch:<10} {'current':<12} {rate:>12,.0f}")
+
+        if args.baseline is not None:
+            module = load_revision(arch, args.baseline)
+            baseline = lines_per_second(getattr(module, toolchain.PARSER_CLASSES[arch])(), lines, args.repeat)
+            print(f"{arch:<10} {args.baseline:<12} {baseline:>12,.0f}  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
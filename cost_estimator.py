@@ -0,0 +1,246 @@
+"""
+Static Cost Estimator
+---------------------
+Predicts the gate counts, cycles and CMOS/CNFET costs of a program from its assembly, without
+running the Verilog or the simulator. Every instruction activates a fixed ALU module (alu.v), so
+the cost of a run is the cost of each instruction times the number of times it executes, and
+the estimator only has to work out those execution counts.
+
+The program is assembled and its words decoded (with the disassembler's tables, so branch
+offsets are read exactly as the machine reads them) into a control-flow graph of basic blocks.
+Every backward branch closes a loop over the instructions from its target to the branch. Loops
+are taken to be bottom-tested, as in multiplication.asm, so a loop with a trip count of n runs
+its body n times; an instruction inside several loops executes the product of their trip counts.
+
+Trip counts are given per loop, by the label the loop branches back to or by the source line of
+its branch, and any loop without one is assumed to run default_trips times (one pass by
+default), so a bound on the trip counts gives a bound on the costs. Both arms of a forward
+branch are counted, as the condition is not evaluated. Instructions that cannot be reached
+from the start of the program cost nothing, and a program that runs off its last word is taken
+to stop there.
+
+For straight-line programs and loops with exact trip counts the estimate matches the simulator.
+Costs are totalled as in profiler.py, with binary gates built in CMOS and ternary gates in CNFET.
+
+python cost_estimator.py --filepath multiplication.asm --trips 7
+python cost_estimator.py --filepath matrix.asm --trip MULT_LOOP=6 --trip 14=3 --compare
+"""
+
+import argparse
+
+import assembler
+import disassembler
+import profiler
+import simulator
+import toolchain
+
+# Trip count of loops that are not given one
+DEFAULT_TRIPS = 1
+
+# Disassembler (and the assembler it decodes for) of each architecture, kept between estimates
+_disassemblers = {}
+
+
+def _disassembler(arch):
+    tools = _disassemblers.get(arch)
+    if tools is None:
+        tools = _disassemblers[arch] = disassembler.Disassembler(arch)
+    return tools
+
+
+def decode_program(arch, words):
+    """
+    (mnemonic, branch target index or None) of each program word. Words that are not
+    instructions have the mnemonic None.
+    """
+    tools = _disassembler(arch)
+    instructions = []
+    for index, word in enumerate(words):
+        decoded = tools.decode(word)
+        if decoded is None:
+            instructions.append((None, None))
+            continue
+        mnemonic, fields = decoded
+        target = None
+        if mnemonic in assembler.BRANCH_INSTRUCTIONS:
+            kind, _, value, width = fields[-1]
+            offset = tools.logical_value(kind, value, width)
+            target = None if offset is None else index + offset
+        instructions.append((mnemonic, target))
+    return instructions
+
+
+class ControlFlowGraph:
+    """Basic blocks of a decoded program, the edges between them and the loops of its backward branches."""
+
+    def __init__(self, instructions):
+        self.instructions = instructions
+        count = len(instructions)
+
+        # A block starts at the program start, at every branch target and after every branch or stop
+        leaders = {0}
+        for index, (mnemonic, target) in enumerate(instructions):
+            if target is not None or mnemonic in (None, "HALT"):
+                leaders.add(index + 1)
+            if target is not None and 0 <= target < count:
+                leaders.add(target)
+        starts = sorted(leader for leader in leaders if leader < count)
+
+        # Blocks as (first index, last index), and the blocks each can pass control to
+        self.blocks = [(start, end - 1) for start, end in zip(starts, starts[1:] + [count])]
+        block_of = {start: number for number, (start, _) in enumerate(self.blocks)}
+        self.successors = []
+        for start, end in self.blocks:
+            mnemonic, target = instructions[end]
+            successors = []
+            if mnemonic not in (None, "HALT") and end + 1 < count:
+                successors.append(block_of[end + 1])
+            if target is not None and target in block_of:
+                successors.append(block_of[target])
+            self.successors.append(successors)
+
+        # Loops as (first index, index of the backward branch)
+        self.loops = [(target, index) for index, (_, target) in enumerate(instructions)
+                      if target is not None and 0 <= target <= index]
+
+    def reachable(self):
+        """Indexes of the instructions that can be reached from the start of the program."""
+        if not self.blocks:
+            return set()
+        seen = {0}
+        stack = [0]
+        while stack:
+            for successor in self.successors[stack.pop()]:
+                if successor not in seen:
+                    seen.add(successor)
+                    stack.append(successor)
+        return {index for block in seen for index in range(self.blocks[block][0], self.blocks[block][1] + 1)}
+
+    def execution_counts(self, trips):
+        """Executions of each instruction, given the trip count of each loop (in the order of self.loops)."""
+        reachable = self.reachable()
+        counts = [0] * len(self.instructions)
+        for index in reachable:
+            count = 1
+            for (start, end), loop_trips in zip(self.loops, trips):
+                if start <= index <= end:
+                    count *= loop_trips
+            counts[index] = count
+        return counts
+
+
+class Estimate(profiler.Profile):
+    """A Profile whose executions are predicted from the program's control flow, with the loops it assumed."""
+
+    def __init__(self, arch, source=None, line_numbers=None, first_address=0, loops=None):
+        super().__init__(arch, source, line_numbers, first_address)
+        self.loops = loops or []
+
+    def report(self, top=None):
+        """The profile listing, preceded by the trip count used for each loop."""
+        lines = []
+        for loop in self.loops:
+            name = loop["label"] or f"line {loop['line']}"
+            origin = "given" if loop["given"] else "assumed"
+            lines.append(f"Loop {name} ({loop['start']} to {loop['end']}): {loop['trips']} trips ({origin})")
+        if lines:
+            lines.append("")
+        return "\n".join(lines + [super().report(top)])
+
+
+def estimate_words(arch, words, trips=None, default_trips=DEFAULT_TRIPS, source=None, line_numbers=None, symbols=None):
+    """
+    Estimate the cost of running assembled words. trips maps a loop's label, or the source line
+    of its backward branch (with line_numbers), to its trip count. Returns an Estimate.
+    Raises ValueError if the program does not fit in the architecture's program memory.
+    """
+    capacity = toolchain.program_capacity(arch)
+    if len(words) > capacity:
+        raise ValueError(f"Program of {len(words)} words does not fit in the {capacity} words of {arch} program memory")
+    trips = trips or {}
+    line_numbers = line_numbers or []
+    labels = {index: label for label, index in (symbols or {}).items()}
+    first = simulator.SIMULATORS[arch].FIRST_ADDRESS
+
+    instructions = decode_program(arch, words)
+    graph = ControlFlowGraph(instructions)
+
+    loops = []
+    for start, end in graph.loops:
+        label = labels.get(start)
+        line = line_numbers[end] if end < len(line_numbers) else None
+        given = trips[label] if label in trips else trips.get(line)
+        loops.append({
+            "label": label, "line": line, "start": first + start, "end": first + end,
+            "trips": default_trips if given is None else given, "given": given is not None,
+        })
+
+    profile = Estimate(arch, source, line_numbers, first, loops)
+    costs = simulator.SIMULATORS[arch].GATE_COSTS
+    for index, hits in enumerate(graph.execution_counts([loop["trips"] for loop in loops])):
+        if not hits:
+            continue
+        mnemonic = instructions[index][0]
+        cycles = simulator.INVALID_CYCLES if mnemonic is None else simulator.INSTRUCTION_CYCLES[mnemonic]
+        gates = [count * hits for count in costs.get(mnemonic, ())]
+        profile.add(first + index, mnemonic, hits, cycles * hits, gates)
+    return profile
+
+
+def estimate(arch, source, trips=None, default_trips=DEFAULT_TRIPS):
+    """Estimate the cost of running source lines on an architecture. Returns an Estimate."""
+    source = list(source)
+    line_numbers = []
+    words, symbols = assembler.assemble(_disassembler(arch).parser, source, line_numbers)
+    return estimate_words(arch, words, trips, default_trips, source, line_numbers, symbols)
+
+
+def parse_trips(items):
+    """Parse NAME=N arguments, where NAME is a label or a source line number."""
+    trips = {}
+    for item in items:
+        name, _, count = item.partition("=")
+        if not count:
+            raise ValueError(f"Expected NAME=TRIPS, got {item}")
+        trips[int(name) if name.isdigit() else name] = int(count)
+    return trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict gate counts and costs of an assembly program without simulating")
+
+    parser.add_argument("--arch", type=str, default="both", choices=["binary", "ternary", "both"], help="Architecture to estimate")
+    parser.add_argument("--filepath", type=str, default="input.asm", help="Input assembly filepath")
+    parser.add_argument("--trips", type=int, default=DEFAULT_TRIPS, help="Trip count of loops not given one with --trip")
+    parser.add_argument("--trip", type=str, nargs='+', default=[], help="Trip counts of loops as LABEL=N or LINE=N (line of the backward branch)")
+    parser.add_argument("--top", type=int, default=None, help="List only the most expensive addresses")
+    parser.add_argument("--compare", action="store_true", help="Also run the simulator and print its gate counts")
+
+    args = parser.parse_args()
+    architectures = toolchain.ARCHITECTURES if args.arch == "both" else (args.arch,)
+    trips = parse_trips(args.trip)
+
+    with open(args.filepath, 'r') as f:
+        source = f.readlines()
+
+    for arch in architectures:
+        print(f"\n[{arch}]")
+        try:
+            result = estimate(arch, source, trips, args.trips)
+        except ValueError as e:
+            print(e)
+            continue
+        print(result.report(args.top))
+
+        if args.compare:
+            machine = simulator.SIMULATORS[arch]()
+            machine.load_source(source)
+            counts = machine.run().gate_counts
+            predicted = result.totals()["gates"]
+            print("\nGate    Estimated   Simulated")
+            for gate in result.gates:
+                print(f"{gate:<7} {predicted[gate]:>9} {counts[gate]:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Cost Model
+----------
+Transistor, switching energy and delay costs of gate activity for CMOS (binary) and CNFET
+(ternary) gates, as NumPy matrices. The figures are the gate_transistors and
+circuit_propagation_delay tables from program_analysis.ipynb.
+
+Each technology is a gates x metrics matrix, so costing any number of runs is one matrix
+product of their gate counts (one row per run, one column per gate counter) with it:
+
+costs = cost_model.gate_costs(counts, "ternary")      # N x 3: transistors, energy, delay
+
+and re-costing a whole result history after changing a gate design is a matrix product with a
+modified technology:
+
+cnfet = cost_model.technology("ternary").replace(transistors={"AND": 12})
+costs = cost_model.gate_costs(counts, cnfet)
+
+Metrics, per run:
+- transistors: transistors switched, each gate activation weighted by the transistors in the gate
+- energy: transistors switched times the technology's switching energy per transistor. The
+  default of 1 per transistor gives relative units until a technology is calibrated.
+- delay: sum of the propagation delays of the activated gates, in delay units
+
+opcode_costs() costs per-opcode execution counts instead, using the delay along the critical path
+of each instruction's ALU operation (operation_delay in the notebook), so its delay column is
+the serial critical-path delay of the run.
+"""
+
+import numpy as np
+
+import simulator
+
+# Gate counters reported by gate_counter_top (the binary machine has no ANY gate)
+GATES = ("NOT", "AND", "OR", "XOR", "ANY")
+
+METRICS = ("transistors", "energy", "delay")
+
+TECHNOLOGIES = {
+    "binary": "CMOS",
+    "ternary": "CNFET",
+}
+
+# Transistors per gate (gate_transistors in program_analysis.ipynb)
+GATE_TRANSISTORS = {
+    "CMOS": {"NOT": 2, "AND": 6, "NAND": 4, "OR": 6, "NOR": 4, "XOR": 12},
+    "CNFET": {"NTI": 5, "NOT": 5, "PTI": 5, "AND": 15, "NAND": 10, "OR": 15, "NOR": 10, "XOR": 18, "ANY": 7, "CONS": 55},
+}
+
+# Propagation delay units per gate (circuit_propagation_delay in program_analysis.ipynb)
+GATE_DELAYS = {
+    "CMOS": {"NOT": 1, "AND": 2, "NAND": 2, "OR": 2, "NOR": 2, "XOR": 3, "Half Adder": 3, "Full Adder": 8},
+    "CNFET": {"NOT": 2, "NTI": 2, "PTI": 2, "AND": 5, "NAND": 3, "OR": 5, "NOR": 3, "XOR": 4, "CONS": 12, "ANY": 6,
+              "Addition": 18, "Half Adder": 18, "Full Adder": 42},
+}
+
+WORD_WIDTHS = {
+    "binary": 16,
+    "ternary": 9,
+}
+
+# Picoseconds per delay unit in a 32nm process (scale_factors in program_analysis.ipynb)
+DELAY_SCALE_PS = {
+    "binary": 9.55,
+    "ternary": 3.11,
+}
+
+# Gate activations of one execution of each instruction (from the simulator's per-opcode tables)
+INSTRUCTION_GATES = {
+    "binary": dict(zip(simulator.BINARY_GATES, zip(*simulator.BINARY_GATE_COSTS.values()))),
+    "ternary": dict(zip(simulator.TERNARY_GATES, zip(*simulator.TERNARY_GATE_COSTS.values()))),
+}
+INSTRUCTIONS = {
+    "binary": tuple(simulator.BINARY_GATE_COSTS),
+    "ternary": tuple(simulator.TERNARY_GATE_COSTS),
+}
+
+
+class Technology:
+    """Per-gate transistor counts and delays of a logic technology, and its switching energy."""
+
+    def __init__(self, name, transistors, delays, energy_per_transistor=1.0):
+        self.name = name
+        self.transistors = dict(transistors)
+        self.delays = dict(delays)
+        self.energy_per_transistor = energy_per_transistor
+
+    def replace(self, name=None, transistors=None, delays=None, energy_per_transistor=None):
+        """A copy with some gates' transistor counts or delays (or the switching energy) changed."""
+        return Technology(
+            name or self.name,
+            {**self.transistors, **(transistors or {})},
+            {**self.delays, **(delays or {})},
+            self.energy_per_transistor if energy_per_transistor is None else energy_per_transistor,
+        )
+
+    def matrix(self, gates=GATES):
+        """gates x METRICS matrix of the cost of one activation of each gate (0 for absent gates)."""
+        transistors = np.array([self.transistors.get(gate, 0) for gate in gates], dtype=np.float64)
+        delays = np.array([self.delays.get(gate, 0) for gate in gates], dtype=np.float64)
+        return np.column_stack([transistors, transistors * self.energy_per_transistor, delays])
+
+
+def technology(arch):
+    """The default technology of an architecture (CMOS for binary, CNFET for ternary)."""
+    name = TECHNOLOGIES[arch]
+    return Technology(name, GATE_TRANSISTORS[name], GATE_DELAYS[name])
+
+
+def _technology(model):
+    return technology(model) if isinstance(model, str) else model
+
+
+def gate_costs(counts, model, gates=GATES):
+    """
+    Cost runs from their gate counts: an N x len(gates) array (or one run as a vector), costed
+    with a Technology or the default technology of an architecture. Returns N x METRICS.
+    """
+    return np.asarray(counts, dtype=np.float64) @ _technology(model).matrix(gates)
+
+
+def mixed_gate_costs(counts, architectures, models=None, gates=GATES):
+    """
+    Cost runs from both architectures at once. architectures gives each row's architecture and
+    models optionally maps architectures to Technology objects. Each row is placed in its
+    architecture's block of columns so the whole set is still a single matrix product.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    names = list(TECHNOLOGIES)
+    models = models or {}
+    stacked = np.vstack([_technology(models.get(arch, arch)).matrix(gates) for arch in names])
+
+    index = np.array([names.index(arch) for arch in architectures], dtype=np.intp)
+    blocks = np.zeros((len(counts), len(names) * len(gates)))
+    columns = index[:, None] * len(gates) + np.arange(len(gates))
+    blocks[np.arange(len(counts))[:, None], columns] = counts
+    return blocks @ stacked
+
+
+def operation_delays(arch, model=None):
+    """Critical-path delay units of one execution of each ALU instruction (operation_delay in the notebook)."""
+    delays = _technology(model or arch).delays
+    adder = WORD_WIDTHS[arch] * delays["Full Adder"]
+    return {
+        "NOT": delays["NOT"], "AND": delays["AND"], "ANDI": delays["AND"], "OR": delays["OR"], "XOR": delays["XOR"],
+        "ADD": adder, "ADDI": adder, "SUB": 1 + adder,
+    }
+
+
+def instruction_matrix(arch, model=None):
+    """
+    INSTRUCTIONS x METRICS matrix of the cost of one execution of each ALU instruction: its gate
+    activations costed with the technology, and its critical-path delay.
+    """
+    model = _technology(model or arch)
+    gates = tuple(INSTRUCTION_GATES[arch])
+    activations = np.array([INSTRUCTION_GATES[arch][gate] for gate in gates], dtype=np.float64).T
+    matrix = activations @ model.matrix(gates)
+    delays = operation_delays(arch, model)
+    matrix[:, 2] = [delays.get(mnemonic, 0) for mnemonic in INSTRUCTIONS[arch]]
+    return matrix
+
+
+def opcode_costs(counts, arch, model=None):
+    """
+    Cost runs from their instruction counts: an N x len(INSTRUCTIONS[arch]) array of executions
+    of each ALU instruction. Returns N x METRICS, with delay along the critical path.
+    """
+    return np.asarray(counts, dtype=np.float64) @ instruction_matrix(arch, model)
+
+
+def frame_costs(frame, arch_column="type", gates=GATES, models=None):
+    """
+    Cost a pandas DataFrame of runs with a column per gate (such as results_store gate_counts()).
+    Returns a DataFrame of METRICS aligned with the input rows, plus delay in picoseconds.
+    """
+    import pandas as pd
+
+    counts = frame.reindex(columns=list(gates), fill_value=0).to_numpy(dtype=np.float64)
+    costs = mixed_gate_costs(counts, frame[arch_column], models, gates)
+    result = pd.DataFrame(costs, columns=list(METRICS), index=frame.index)
+    result["delay_ps"] = result["delay"] * frame[arch_column].map(DELAY_SCALE_PS).to_numpy()
+    return result
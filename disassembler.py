@@ -0,0 +1,350 @@
+"""
+Disassembler
+------------
+Turns program.hex files and program images back into assembly for both architectures. Opcodes
+and operand fields come from the assembler itself (the parser's instructions, formats and
+instruction layout), so the disassembler follows any change to the encoding.
+
+An operand's spelling is chosen by trying readable candidates (the logical value first, then the
+raw field in decimal and hex) against the assembler's own operand tables and keeping the first
+that encodes to the same field. The output therefore always reassembles to the same words, even
+where the encoder stores an immediate in an unusual way, and each field value is looked up once.
+Branch offsets that land inside the program are written as labels.
+
+The round-trip check assembles a corpus, disassembles the words and reassembles the text,
+reporting every program whose words change. It runs in a process pool like batch_assembler.py
+and is a cheap regression gate for encoder changes; --exhaustive also round-trips every
+decodable word of the encoding.
+
+python disassembler.py disassemble Verilog/ternary/programs/bin/program.hex
+python disassembler.py check Verilog/binary/programs/multiplication.asm --exhaustive
+"""
+
+import argparse
+import multiprocessing
+
+import assembler
+import batch_assembler
+import program_image
+import toolchain
+
+# Operand kinds that are register numbers, and those that are offsets from the branch itself
+REGISTER_KINDS = ("register",)
+BRANCH_KINDS = ("branch_immediate",)
+
+# Words handed to each worker at a time by the exhaustive check
+WORD_CHUNK = 4096
+
+
+def _signed(value, width):
+    """Read a field as a two's complement number."""
+    return value - (1 << width) if value >> (width - 1) & 1 else value
+
+
+def _balanced(value, width):
+    """Read a field as balanced ternary trits (2 bits each), or None if it holds the unused code 0b10."""
+    result = 0
+    for shift in range(width - 2, -1, -2):
+        code = value >> shift & 3
+        if code == 0b10:
+            return None
+        result = 3 * result + (-1 if code == 0b11 else code)
+    return result
+
+
+def detect_arch(filename):
+    """Architecture of a program image (from its header) or program.hex file (from its word width)."""
+    if program_image.is_image(filename):
+        with open(filename, 'rb') as f:
+            return program_image.read_header(f.read(program_image.HEADER.size))[0]
+    with open(filename, 'r') as f:
+        width = max((len(line.strip()) for line in f), default=0)
+    return "ternary" if width > toolchain.HEX_DIGITS["binary"] else "binary"
+
+
+class Disassembler:
+    """Decodes the words of one architecture, using the tables of an assembler for that architecture."""
+
+    def __init__(self, arch, parser=None):
+        self.arch = arch
+        self.parser = toolchain.new_parser(arch) if parser is None else parser
+        if self.parser.encoders is None:
+            self.parser.build_encoders()
+
+        layout = self.parser.layout
+        self.opcode_shift = layout["opcode_shift"]
+        self.opcode_mask = (1 << (layout["word_bits"] - self.opcode_shift)) - 1
+        self.digits = toolchain.HEX_DIGITS[arch]
+
+        # Opcode -> (mnemonic, fields, mask of the bits the instruction uses), where fields are
+        # (operand kind, operand table, bit position, width in bits)
+        self.decoders = {}
+        for mnemonic, opcode in self.parser.instructions.items():
+            operands, _ = self.parser.formats[self.parser.instruction_formats[mnemonic]]
+            _, tables, _ = self.parser.encoders[mnemonic]
+            shifts = sorted(shift for _, shift in operands) + [self.opcode_shift]
+            fields = []
+            used = self.opcode_mask << self.opcode_shift
+            for (kind, shift), (table, _) in zip(operands, tables):
+                width = shifts[shifts.index(shift) + 1] - shift
+                fields.append((kind, table, shift, width))
+                used |= ((1 << width) - 1) << shift
+            self.decoders[opcode] = (mnemonic, tuple(fields), used)
+
+        # (operand kind, field value) -> spelling, filled in as fields are seen
+        self.spellings = {}
+
+    def logical_value(self, kind, value, width):
+        """The number a numeric field stands for, or None if it is not a valid number."""
+        if self.arch == "ternary":
+            return _balanced(value, width)
+        return _signed(value, width) if kind in BRANCH_KINDS else value
+
+    def operand(self, kind, table, value, width):
+        """Spelling of an operand field that the assembler encodes back to the same value, or None."""
+        key = (kind, value)
+        if key in self.spellings:
+            return self.spellings[key]
+
+        if kind in REGISTER_KINDS:
+            candidates = [f"R{value}"]
+        else:
+            logical = self.logical_value(kind, value, width)
+            candidates = [] if logical is None else [str(logical)]
+            candidates += [str(value), str(_signed(value, width)), f"0x{value:x}", f"-0x{(1 << width) - value:x}"]
+
+        spelling = None
+        for candidate in candidates:
+            try:
+                if table[candidate] == value:
+                    spelling = candidate
+                    break
+            except KeyError:
+                continue
+        self.spellings[key] = spelling
+        return spelling
+
+    def decode(self, word):
+        """(mnemonic, [(operand kind, operand table, field value, width)]) of a word, or None."""
+        decoder = self.decoders.get(word >> self.opcode_shift & self.opcode_mask)
+        if decoder is None:
+            return None
+        mnemonic, fields, used = decoder
+        if word & ~used:
+            return None
+        return mnemonic, [(kind, table, word >> shift & ((1 << width) - 1), width) for kind, table, shift, width in fields]
+
+    def instruction(self, word):
+        """Assembly text of a single word, or None if it cannot be written as an instruction."""
+        decoded = self.decode(word)
+        if decoded is None:
+            return None
+        mnemonic, fields = decoded
+        operands = [self.operand(kind, table, value, width) for kind, table, value, width in fields]
+        if None in operands:
+            return None
+        return f"{mnemonic} {', '.join(operands)}" if operands else mnemonic
+
+    def branch_target(self, address, fields, count):
+        """Address a branch at address jumps to, if it lies in a program of count words and a label can encode it."""
+        kind, table, value, width = fields[-1]
+        if kind not in BRANCH_KINDS:
+            return None
+        offset = self.logical_value(kind, value, width)
+        if offset is None or not 0 <= address + offset <= count:
+            return None
+        try:
+            # Labels are encoded from integer offsets, as assembler.assemble() does
+            return address + offset if table[offset] == value else None
+        except KeyError:
+            return None
+
+    def program(self, words, labels=True, listing=False):
+        """
+        Disassemble a program into source lines. With labels, branches inside the program name a
+        label (L<address>); with listing, each line ends in a comment with its address and word.
+        Words that are not instructions become comments, so they are dropped on reassembly.
+        """
+        words = list(words)
+        texts = []
+        targets = set()
+        for address, word in enumerate(words):
+            decoded = self.decode(word)
+            target = None
+            if labels and decoded is not None and decoded[1]:
+                target = self.branch_target(address, decoded[1], len(words))
+            text = self.instruction(word)
+            if text is not None and target is not None:
+                text = text.rsplit(", ", 1)[0] + f", L{target}"
+                targets.add(target)
+            texts.append(text)
+
+        lines = []
+        for address, (word, text) in enumerate(zip(words, texts)):
+            if address in targets:
+                lines.append(f"L{address}:")
+            if text is None:
+                lines.append(f"; {address:04}: {word:0{self.digits}x} is not a valid instruction")
+            elif listing:
+                lines.append(f"{text:<22}; {address:04}: {word:0{self.digits}x}")
+            else:
+                lines.append(text)
+        if len(words) in targets:
+            lines.append(f"L{len(words)}:")
+        return lines
+
+
+def disassemble_file(filename, arch=None, labels=True, listing=False):
+    """Disassemble a program.hex file or program image into source lines."""
+    arch = arch or detect_arch(filename)
+    return Disassembler(arch).program(program_image.load_words(filename), labels, listing)
+
+
+# Assembler and disassembler kept by each worker process between programs
+_tools = {}
+
+
+def _init_worker(architectures):
+    for arch in architectures:
+        _tools[arch] = Disassembler(arch)
+
+
+def round_trip(disassembler, lines):
+    """
+    Assemble source lines, disassemble the words and reassemble the text. Returns None if the
+    words are unchanged, or a description of the first difference.
+    """
+    parser = disassembler.parser
+    words, _ = assembler.assemble(parser, lines)
+    text = disassembler.program(words, listing=True)
+    again, _ = assembler.assemble(parser, text)
+    if again == words:
+        return None
+
+    digits = disassembler.digits
+    for address, (before, after) in enumerate(zip(words, again)):
+        if before != after:
+            return f"word {address}: {before:0{digits}x} reassembled as {after:0{digits}x} ({disassembler.instruction(before)})"
+    return f"{len(words)} words reassembled as {len(again)}"
+
+
+def _check_source(source):
+    entry = {"source": source, "targets": {}}
+    try:
+        with open(source, 'r') as f:
+            lines = f.readlines()
+    except OSError as e:
+        entry["error"] = str(e)
+        return entry
+
+    for arch, disassembler in _tools.items():
+        try:
+            entry["targets"][arch] = round_trip(disassembler, lines)
+        except ValueError as e:
+            # Programs the assembler rejects have nothing to round-trip
+            entry["targets"][arch] = None
+            entry.setdefault("skipped", []).append(f"{arch}: {e}")
+    return entry
+
+
+def _check_words(task):
+    arch, start, stop = task
+    disassembler = _tools[arch]
+    failures = []
+    for word in range(start, stop):
+        text = disassembler.instruction(word)
+        if text is None:
+            continue
+        encoded = disassembler.parser.encode(assembler.split_line(text)[1])
+        if encoded != word:
+            failures.append((word, text, encoded))
+    return failures
+
+
+def _map(architectures, processes, function, tasks):
+    processes = min(processes or multiprocessing.cpu_count(), max(len(tasks), 1))
+    if processes > 1:
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(architectures,)) as pool:
+            return pool.map(function, tasks, chunksize=max(1, len(tasks) // (4 * processes)))
+    _init_worker(architectures)
+    return list(map(function, tasks))
+
+
+def check_corpus(sources, architectures=toolchain.ARCHITECTURES, processes=None):
+    """Round-trip every source for each architecture. Returns one entry per source, in order."""
+    return _map(architectures, processes, _check_source, list(sources))
+
+
+def check_words(arch, processes=None):
+    """
+    Round-trip every word of an architecture's encoding that decodes to an instruction.
+    Returns (words checked, [(word, text, word it reassembled to)] for each failure).
+    """
+    bits = toolchain.instruction_layout(arch, toolchain.read_parameters(arch))["word_bits"]
+    tasks = [(arch, start, min(start + WORD_CHUNK, 1 << bits)) for start in range(0, 1 << bits, WORD_CHUNK)]
+    failures = [failure for chunk in _map((arch,), processes, _check_words, tasks) for failure in chunk]
+    return 1 << bits, failures
+
+
+def run_check(patterns, architectures=toolchain.ARCHITECTURES, processes=None, exhaustive=False):
+    """Round-trip the programs matching directories or globs and print a summary. Returns the failure count."""
+    sources = [source for pattern in patterns for source in batch_assembler.find_sources(pattern)]
+    failures = 0
+    for entry in check_corpus(sources, architectures, processes):
+        for message in entry.get("skipped", ()):
+            print(f"Skipped {entry['source']}: {message}")
+        errors = [entry["error"]] if "error" in entry else [
+            f"{arch}: {difference}" for arch, difference in entry["targets"].items() if difference is not None
+        ]
+        if errors:
+            failures += 1
+            print(f"Round trip failed for {entry['source']}: {'; '.join(errors)}")
+    print(f"{len(sources) - failures} of {len(sources)} programs round-trip")
+
+    if exhaustive:
+        for arch in architectures:
+            count, mismatches = check_words(arch, processes)
+            digits = toolchain.HEX_DIGITS[arch]
+            for word, text, encoded in mismatches[:20]:
+                print(f"{arch}: {word:0{digits}x} disassembles to '{text}', which assembles to "
+                      f"{'nothing' if encoded is None else format(encoded, f'0{digits}x')}")
+            print(f"{arch}: {len(mismatches)} of {count} words fail to round-trip")
+            failures += len(mismatches)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Disassemble programs and check that assembly round-trips")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    disassemble = commands.add_parser("disassemble", help="Print the assembly of a program.hex file or program image")
+    disassemble.add_argument("program", type=str)
+    disassemble.add_argument("--arch", type=str, default=None, choices=toolchain.ARCHITECTURES,
+                             help="Architecture of a program.hex file (default: from the word width)")
+    disassemble.add_argument("--output", type=str, default=None, help="Write the assembly to this file")
+    disassemble.add_argument("--no-labels", action="store_true", help="Write branch offsets instead of labels")
+    disassemble.add_argument("--listing", action="store_true", help="Comment each line with its address and word")
+
+    check = commands.add_parser("check", help="Assemble, disassemble and reassemble a corpus")
+    check.add_argument("patterns", type=str, nargs='+', help="Directories or globs of .asm files")
+    check.add_argument("--arch", type=str, default="both", choices=["binary", "ternary", "both"])
+    check.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    check.add_argument("--exhaustive", action="store_true", help="Also round-trip every decodable word")
+
+    args = parser.parse_args()
+    if args.command == "disassemble":
+        lines = disassemble_file(args.program, args.arch, not args.no_labels, args.listing)
+        if args.output is None:
+            print("\n".join(lines))
+        else:
+            with open(args.output, 'w') as f:
+                f.write("\n".join(lines) + "\n")
+        return
+
+    architectures = toolchain.ARCHITECTURES if args.arch == "both" else (args.arch,)
+    if run_check(args.patterns, architectures, args.processes, args.exhaustive):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Simulation Farm
+---------------
+Runs a corpus of .asm programs through the binary and ternary Verilog testbenches in parallel,
+on any machine with Icarus Verilog (iverilog and vvp) on the PATH.
+
+run.bat assembles one program and runs each testbench in turn, and both testbenches write fixed
+paths relative to their working directory (programs/program_gate_counts.csv,
+testbenches/system_tb.vcd). The farm instead:
+- takes each architecture's compiled testbench from the build cache (testbench_cache.py), so
+  iverilog runs at most once per architecture for the whole corpus
+- gives each simulation a scratch directory with that layout, holding its own program.hex
+  (passed with +program=) and gate count CSV, so any number of vvp processes can run at once
+- runs the simulations on a process pool and merges the gate counts into one results.csv
+
+Outputs go to <output_dir>/<arch>/<program>_results.csv (the per-program format read by
+program_analysis.ipynb) and <output_dir>/<arch>/<program>.log, plus results.csv and
+summary.json covering every run.
+
+python farm.py Verilog/binary/programs --output farm_results
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+import assembler
+import batch_assembler
+import testbench_cache
+import toolchain
+
+# Program file passed with +program=, and paths the testbenches write relative to the directory
+# vvp is run in
+PROGRAM_HEX = "program.hex"
+GATE_COUNTS_CSV = os.path.join("programs", "program_gate_counts.csv")
+WAVEFORM_DIR = "testbenches"
+
+RESULTS_NAME = "results.csv"
+SUMMARY_NAME = "summary.json"
+
+# Final register values printed by both testbenches, e.g. "R2=   42" or "R2= 42 - 000000001111",
+# and the number of cycles executed
+REGISTER_PATTERN = re.compile(r"^R(\d+)=\s*(-?\d+)", re.MULTILINE)
+CYCLES_PATTERN = re.compile(r"^Cycles:\s*(\d+)", re.MULTILINE)
+TIMEOUT_MESSAGE = "Timeout - simulation stopped"
+
+# Assemblers kept by each worker process between programs, per architecture and parameters
+_parsers = {}
+
+
+def check_tools():
+    """Raise RuntimeError unless iverilog and vvp are available."""
+    missing = [tool for tool in ("iverilog", "vvp") if shutil.which(tool) is None]
+    if missing:
+        raise RuntimeError(f"Icarus Verilog not found on the PATH: {', '.join(missing)}")
+
+
+def read_gate_counts(filename):
+    """Read a Gate,Count CSV written by the testbench into a dict."""
+    with open(filename, 'r', newline='') as f:
+        return {row["Gate"]: int(row["Count"]) for row in csv.DictReader(f)}
+
+
+def parse_registers(output):
+    """Final register values from the testbench output, as a list indexed by register."""
+    registers = {int(index): int(value) for index, value in REGISTER_PATTERN.findall(output)}
+    return [registers[i] for i in sorted(registers)]
+
+
+def program_name(source, base_dir=None):
+    """Name of a program in the results: its path below base_dir without the extension."""
+    relative = os.path.relpath(os.path.abspath(source), os.path.abspath(base_dir)) if base_dir else os.path.basename(source)
+    return os.path.splitext(relative)[0]
+
+
+def _parser(arch, parameters):
+    key = (arch, None if parameters is None else tuple(sorted(parameters.items())))
+    parser = _parsers.get(key)
+    if parser is None:
+        parser = _parsers[key] = getattr(toolchain.load_compiler(arch), toolchain.PARSER_CLASSES[arch])(parameters=parameters)
+    return parser
+
+
+def simulation_task(source, arch, name, vvp_file, scratch_dir, waves=False, trace_file=None, timeout=600, parameters=None):
+    """
+    One program to run on one compiled testbench in its own scratch directory. parameters are
+    the parameters.vh values the testbench was built with (None for the file itself), which the
+    program is assembled for.
+    """
+    return (source, arch, name, vvp_file, scratch_dir, waves, trace_file, timeout, parameters)
+
+
+def _simulate(task):
+    """Assemble one program into a fresh scratch directory and run it on one testbench."""
+    source, arch, name, vvp_file, scratch_dir, waves, trace_file, timeout, parameters = task
+    result = {"program": name, "source": source, "arch": arch}
+
+    try:
+        parser = _parser(arch, parameters)
+        with open(source, 'r') as f:
+            words, _ = assembler.assemble(parser, f)
+        # Refuses programs larger than the testbench's program memory
+        parser.store_program(words)
+    except (OSError, ValueError) as e:
+        result["error"] = str(e)
+        return result
+    result["words"] = len(words)
+
+    toolchain.write_hex(os.path.join(scratch_dir, PROGRAM_HEX), words, arch)
+    os.makedirs(os.path.join(scratch_dir, WAVEFORM_DIR), exist_ok=True)
+
+    # -none skips writing the waveform dump, which is most of the cost of a short run
+    command = ["vvp", "-n", vvp_file, f"+program={os.path.abspath(os.path.join(scratch_dir, PROGRAM_HEX))}"]
+    command += [] if waves else ["-none"]
+    if trace_file is not None:
+        os.makedirs(os.path.dirname(trace_file), exist_ok=True)
+        command.append(f"+trace={os.path.abspath(trace_file)}")
+    try:
+        run = subprocess.run(command, cwd=scratch_dir, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        result["error"] = f"vvp did not finish within {timeout} seconds"
+        return result
+
+    result["output"] = run.stdout
+    result["timeout"] = TIMEOUT_MESSAGE in run.stdout
+    result["registers"] = parse_registers(run.stdout)
+    cycles = CYCLES_PATTERN.search(run.stdout)
+    if cycles is not None:
+        result["cycles"] = int(cycles.group(1))
+    try:
+        result["gates"] = read_gate_counts(os.path.join(scratch_dir, GATE_COUNTS_CSV))
+    except (OSError, KeyError, ValueError):
+        result["error"] = run.stderr.strip() or "The testbench did not write gate counts"
+    return result
+
+
+def run_farm(sources, output_dir, architectures=toolchain.ARCHITECTURES, processes=None, base_dir=None,
+             scratch_dir=None, keep_scratch=False, waves=False, trace=False, timeout=600):
+    """
+    Simulate every source file on each architecture and merge the results into output_dir.
+    With trace=True each run also writes <output_dir>/<arch>/<program>.trace.jsonl (see
+    trace_reader.py). Returns the results, one per program and architecture in the order given.
+    """
+    check_tools()
+    scratch_root = tempfile.mkdtemp(prefix="farm-", dir=scratch_dir)
+    try:
+        testbenches = {arch: testbench_cache.cached_testbench(arch, {"system_tb.VERBOSE": 0}) for arch in architectures}
+
+        tasks = []
+        for source in sources:
+            name = program_name(source, base_dir)
+            for arch in architectures:
+                run_dir = os.path.join(scratch_root, "runs", f"{len(tasks):05d}")
+                trace_file = os.path.join(output_dir, arch, f"{name}.trace.jsonl") if trace else None
+                tasks.append(simulation_task(source, arch, name, testbenches[arch], run_dir, waves, trace_file, timeout))
+
+        results = simulate(tasks, processes)
+    finally:
+        if keep_scratch:
+            print(f"Scratch directories kept in {scratch_root}")
+        else:
+            shutil.rmtree(scratch_root, ignore_errors=True)
+
+    write_results(results, output_dir)
+    return results
+
+
+def simulate(tasks, processes=None):
+    """Run simulation tasks on a process pool (CPU count by default), returning results in task order."""
+    processes = min(processes or multiprocessing.cpu_count(), max(len(tasks), 1))
+    if processes > 1:
+        with multiprocessing.Pool(processes) as pool:
+            return pool.map(_simulate, tasks, chunksize=1)
+    return list(map(_simulate, tasks))
+
+
+def write_results(results, output_dir):
+    """Write the per-run CSVs and logs, the merged results.csv and summary.json."""
+    os.makedirs(output_dir, exist_ok=True)
+    summary = []
+    rows = []
+    for result in results:
+        base = os.path.join(output_dir, result["arch"], result["program"])
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        if "output" in result:
+            with open(f"{base}.log", 'w') as f:
+                f.write(result["output"])
+        if "gates" in result:
+            with open(f"{base}_results.csv", 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(["Gate", "Count"])
+                writer.writerows(result["gates"].items())
+            rows.extend((result["program"], result["arch"], gate, count) for gate, count in result["gates"].items())
+        summary.append({key: value for key, value in result.items() if key != "output"})
+
+    with open(os.path.join(output_dir, RESULTS_NAME), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Program", "Architecture", "Gate", "Count"])
+        writer.writerows(rows)
+    with open(os.path.join(output_dir, SUMMARY_NAME), 'w') as f:
+        json.dump(summary, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a corpus of programs on the binary and ternary testbenches")
+
+    parser.add_argument("programs", type=str, help="Directory (searched recursively for .asm) or glob pattern of programs")
+    parser.add_argument("--output", type=str, default="farm_results", help="Directory for the merged results")
+    parser.add_argument("--arch", type=str, nargs='+', choices=toolchain.ARCHITECTURES, default=list(toolchain.ARCHITECTURES),
+                        help="Architectures to simulate")
+    parser.add_argument("--processes", type=int, default=None, help="Simulations to run at once (default: CPU count)")
+    parser.add_argument("--scratch", type=str, default=None, help="Directory for scratch directories (default: system temp)")
+    parser.add_argument("--keep-scratch", action="store_true", help="Keep the scratch directories after the run")
+    parser.add_argument("--waves", action="store_true", help="Write system_tb.vcd waveforms in each scratch directory")
+    parser.add_argument("--trace", action="store_true", help="Write a per-cycle trace of each run (<arch>/<program>.trace.jsonl)")
+    parser.add_argument("--store", action="store_true", help="Also add the runs to the Parquet results store (results_store.py)")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds allowed for each simulation")
+
+    args = parser.parse_args()
+    sources = batch_assembler.find_sources(args.programs)
+    if os.path.isdir(args.programs):
+        base_dir = args.programs
+    else:
+        base_dir = os.path.commonpath([os.path.dirname(os.path.abspath(source)) for source in sources]) if sources else None
+
+    try:
+        results = run_farm(sources, args.output, args.arch, args.processes, base_dir,
+                           args.scratch, args.keep_scratch, args.waves, args.trace, args.timeout)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return
+
+    failures = 0
+    for result in results:
+        if "error" in result:
+            failures += 1
+            print(f"Error simulating {result['source']} ({result['arch']}): {result['error']}")
+        elif result["timeout"]:
+            print(f"Warning: {result['source']} ({result['arch']}) hit the testbench timeout")
+
+    print(f"Completed {len(results) - failures} of {len(results)} simulations "
+          f"into {os.path.join(args.output, RESULTS_NAME)}")
+
+    if args.store:
+        import results_store
+        store = results_store.ResultsStore()
+        print(f"Added {store.ingest_farm(args.output)} runs to {store.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Differential Fuzzer
+-------------------
+Checks the claim that the binary and ternary machines are functionally equivalent by running
+random programs on both and comparing the results. Each case is a random straight-line stream
+of instructions (forward branches only, so every case terminates) within the operands both
+assemblers accept: registers R0-R7, immediates 0 to 40 and memory offsets 0 to 4. Cases start
+by loading R0-R7 with random immediates, so the register file is not all zeros.
+
+Both assemblers encode the case and both instruction-level simulators run it. The final
+registers are compared as integers, binary words read as 16-bit two's complement and ternary
+words through the balanced ternary decoder, and so are the memory words either machine wrote.
+A binary result beyond the ternary range (+/-9841) only shows the machines' different word
+sizes, so such cases are counted as out of range rather than as differences.
+
+By default cases only use the instructions both machines define the same way (SHARED_OPCODES).
+The others differ by design, so name them with --opcodes to see how: NOT, AND, OR, XOR and ANDI
+work on bits in binary and trits in ternary, LI keeps the register's upper digits and LUI shifts
+by 8 digits in a different base, COMP is not implemented in ternary_alu, binary LT decides on the
+lowest differing bit, BEQ tests the lowest bit or trit, BNE only agrees on registers holding 0 or
+1, and LOAD and STORE address memory through different registers.
+
+Failing cases are shrunk to a minimal program by deleting instructions and simplifying operands
+while the difference remains. Cases run in chunks on a process pool, each chunk from its own
+seed, so a run is reproducible from --seed.
+
+python fuzzer.py --cases 50000
+python fuzzer.py --cases 20000 --opcodes ADD SUB ADDI MV EQ BNE --output fuzz.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import time
+
+import balanced_ternary
+import program_generator
+import simulator
+import toolchain
+
+# Operand kinds of each instruction in a generated case
+OPERANDS = {
+    "MV": ("register", "register"), "NOT": ("register", "register"), "AND": ("register", "register"),
+    "OR": ("register", "register"), "XOR": ("register", "register"), "ADD": ("register", "register"),
+    "SUB": ("register", "register"), "COMP": ("register", "register"), "LT": ("register", "register"),
+    "EQ": ("register", "register"),
+    "ANDI": ("register", "immediate"), "ADDI": ("register", "immediate"), "LUI": ("register", "immediate"),
+    "LI": ("register", "immediate"),
+    "BEQ": ("register", "branch"), "BNE": ("register", "branch"),
+    "LOAD": ("register", "register", "offset"), "STORE": ("register", "register", "offset"),
+}
+
+# Instructions with the same semantics on both machines, which a run uses unless told otherwise
+SHARED_OPCODES = ("MV", "ADD", "SUB", "ADDI", "EQ")
+
+REGISTERS = 8
+
+# Instructions after the register loads, so a whole case fits the 27 words of ternary program memory
+DEFAULT_LENGTH = 18
+
+# Cases run by a worker per task
+CHUNK_CASES = 500
+
+# Failing cases each chunk shrinks; the rest are only counted
+SHRINKS_PER_CHUNK = 4
+
+BINARY_SIGN = 1 << 15
+
+
+def random_case(rng, length=DEFAULT_LENGTH, opcodes=SHARED_OPCODES):
+    """
+    A case as a list of token lists: register loads, then length random instructions. Operands
+    are strings, except branch offsets, which are integers.
+    """
+    case = [["LI", f"R{reg}", str(rng.randint(0, program_generator.IMMEDIATE_MAX))] for reg in range(REGISTERS)]
+    for index in range(length):
+        mnemonic = rng.choice(opcodes)
+        tokens = [mnemonic]
+        for kind in OPERANDS[mnemonic]:
+            if kind == "register":
+                tokens.append(f"R{rng.randrange(REGISTERS)}")
+            elif kind == "immediate":
+                tokens.append(str(rng.randint(0, program_generator.IMMEDIATE_MAX)))
+            elif kind == "offset":
+                tokens.append(str(rng.randint(0, program_generator.OFFSET_MAX)))
+            else:
+                # Forward to a later instruction or the final HALT, as an integer offset like
+                # the assembler passes for a label
+                tokens.append(rng.randint(1, length - index))
+        case.append(tokens)
+    return case
+
+
+def render(case):
+    """Source lines of a case, with branch targets as labels."""
+    targets = {index + tokens[-1] for index, tokens in enumerate(case) if tokens[0] in ("BEQ", "BNE")}
+    lines = []
+    for index, tokens in enumerate(case + [["HALT"]]):
+        if index in targets:
+            lines.append(f"L{index}:")
+        operands = [f"L{index + token}" if tokens[0] in ("BEQ", "BNE") and i == len(tokens) - 2 else str(token)
+                    for i, token in enumerate(tokens[1:])]
+        lines.append(f"{tokens[0]} {', '.join(operands)}" if operands else tokens[0])
+    return lines
+
+
+def _binary_value(word):
+    return word - (BINARY_SIGN << 1) if word & BINARY_SIGN else word
+
+
+def _written(machine, result):
+    """Integer address -> integer value of every memory word a STORE wrote."""
+    return {machine.address_value(index): machine.register_value(result.memory[index]) for index in machine.stored}
+
+
+class Executor:
+    """Both assemblers and simulators, kept by a worker for all its cases."""
+
+    def __init__(self):
+        self.parsers = {arch: toolchain.new_parser(arch) for arch in toolchain.ARCHITECTURES}
+        self.machines = {arch: simulator.SIMULATORS[arch](self.parsers[arch].instructions)
+                         for arch in toolchain.ARCHITECTURES}
+
+    def run(self, case):
+        """{arch: (registers, memory writes, words)} of a case; None if an assembler rejects it."""
+        outcome = {}
+        for arch, parser in self.parsers.items():
+            words = [parser.encode(list(tokens)) for tokens in case + [["HALT"]]]
+            if None in words:
+                return None
+            machine = self.machines[arch]
+            machine.load(words)
+            result = machine.run(max_steps=len(words))
+            registers = [_binary_value(word) for word in result.raw_registers] if arch == "binary" else result.registers
+            memory = {address: _binary_value(value) if arch == "binary" else value
+                      for address, value in _written(machine, result).items()}
+            outcome[arch] = (registers, memory, words)
+        return outcome
+
+    def compare(self, case):
+        """
+        ("same" | "range" | "different", differences) for a case, where differences lists
+        (location, binary value, ternary value).
+        """
+        outcome = self.run(case)
+        if outcome is None:
+            return "invalid", []
+        binary_registers, binary_memory, _ = outcome["binary"]
+        ternary_registers, ternary_memory, _ = outcome["ternary"]
+
+        differences = [(f"R{reg}", b, t) for reg, (b, t) in enumerate(zip(binary_registers, ternary_registers)) if b != t]
+        for address in sorted(set(binary_memory) | set(ternary_memory)):
+            b, t = binary_memory.get(address), ternary_memory.get(address)
+            if b != t:
+                differences.append((f"[{address}]", b, t))
+        if not differences:
+            return "same", []
+        _, high = balanced_ternary.value_range(balanced_ternary.WORD_TRITS)
+        if all(b is not None and abs(b) > high for _, b, _ in differences):
+            return "range", differences
+        return "different", differences
+
+    def shrink(self, case):
+        """Smallest case found, by deleting instructions and simplifying operands, that still differs."""
+        def fails(candidate):
+            return self.compare(candidate)[0] == "different"
+
+        changed = True
+        while changed:
+            changed = False
+            for index in reversed(range(len(case))):
+                candidate = _delete(case, index)
+                if fails(candidate):
+                    case, changed = candidate, True
+            for index, tokens in enumerate(case):
+                for position in range(1, len(tokens)):
+                    for simpler in _simpler(tokens, position):
+                        candidate = case[:index] + [tokens[:position] + [simpler] + tokens[position + 1:]] + case[index + 1:]
+                        if fails(candidate):
+                            case, tokens, changed = candidate, candidate[index], True
+                            break
+        return case
+
+
+def _delete(case, index):
+    """A case without one instruction, with forward branches over it shortened to keep their targets."""
+    result = []
+    for i, tokens in enumerate(case):
+        if i == index:
+            continue
+        if tokens[0] in ("BEQ", "BNE") and i < index < i + tokens[-1]:
+            tokens = tokens[:-1] + [tokens[-1] - 1]
+        result.append(tokens)
+    return result
+
+
+def _simpler(tokens, position):
+    """Simpler values for one operand, simplest first."""
+    value = tokens[position]
+    if isinstance(value, int):
+        return list(range(1, value))
+    if value.startswith("R"):
+        return [f"R{reg}" for reg in range(int(value[1:]))]
+    return [str(candidate) for candidate in (0, 1) if candidate < int(value)]
+
+
+# Executor kept by each worker process between chunks
+_executor = None
+
+
+def _init_worker():
+    global _executor
+    _executor = Executor()
+
+
+def _run_chunk(task):
+    seed, chunk, cases, length, opcodes = task
+    rng = random.Random(f"{seed}:{chunk}")
+    counts = {"same": 0, "range": 0, "different": 0, "invalid": 0}
+    failures = []
+    for _ in range(cases):
+        case = random_case(rng, length, opcodes)
+        verdict, _ = _executor.compare(case)
+        counts[verdict] += 1
+        if verdict == "different" and len(failures) < SHRINKS_PER_CHUNK:
+            minimal = _executor.shrink(case)
+            failures.append({"case": render(case), "minimal": render(minimal),
+                             "differences": _executor.compare(minimal)[1]})
+    return counts, failures
+
+
+def fuzz(cases, seed=0, length=DEFAULT_LENGTH, opcodes=SHARED_OPCODES, processes=None):
+    """
+    Run cases random programs on both machines. Returns (counts per verdict, shrunk failures),
+    with failures whose minimal programs use the same instruction sequence merged and counted.
+    """
+    tasks = [(seed, chunk, min(CHUNK_CASES, cases - start), length, tuple(opcodes))
+             for chunk, start in enumerate(range(0, cases, CHUNK_CASES))]
+    processes = min(processes or multiprocessing.cpu_count(), max(len(tasks), 1))
+    if processes > 1:
+        with multiprocessing.Pool(processes, initializer=_init_worker) as pool:
+            chunks = pool.map(_run_chunk, tasks)
+    else:
+        _init_worker()
+        chunks = list(map(_run_chunk, tasks))
+
+    counts = {}
+    minimal = {}
+    for chunk_counts, failures in chunks:
+        for verdict, count in chunk_counts.items():
+            counts[verdict] = counts.get(verdict, 0) + count
+        for failure in failures:
+            key = tuple(line.split()[0] for line in failure["minimal"] if not line.endswith(":"))
+            if key in minimal:
+                minimal[key]["occurrences"] += 1
+            else:
+                minimal[key] = dict(failure, occurrences=1)
+    return counts, sorted(minimal.values(), key=lambda failure: (len(failure["minimal"]), -failure["occurrences"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Differential fuzzing of the binary and ternary machines")
+
+    parser.add_argument("--cases", type=int, default=10000, help="Random programs to run")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random programs")
+    parser.add_argument("--length", type=int, default=DEFAULT_LENGTH, help="Instructions per program after the register loads")
+    parser.add_argument("--opcodes", type=str, nargs='+', default=list(SHARED_OPCODES), choices=list(OPERANDS),
+                        help="Instructions to draw from (default: those with the same semantics on both machines)")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--show", type=int, default=10, help="Minimal failing programs to print")
+    parser.add_argument("--output", type=str, default=None, help="Write the counts and failing programs as JSON")
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+    counts, failures = fuzz(args.cases, args.seed, args.length, args.opcodes, args.processes)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.cases} cases in {elapsed:.1f}s ({60 * args.cases / elapsed:.0f} per minute): "
+          + ", ".join(f"{count} {verdict}" for verdict, count in counts.items()))
+    for failure in failures[:args.show]:
+        print(f"\nDiffers ({failure['occurrences']} shrunk cases): "
+              + ", ".join(f"{location} binary={b} ternary={t}" for location, b, t in failure["differences"]))
+        print("\n".join("    " + line for line in failure["minimal"]))
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({"seed": args.seed, "cases": args.cases, "counts": counts, "failures": failures}, f, indent=2)
+    if counts.get("different"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Ternary Gate Compiler
+---------------------
+Flattens gates written as compositions of the gate_design.py primitives (such as consensus_gate
+and any_gate) into a single precomputed lookup table, and fuses those tables to operate on whole
+multi-trit words a chunk of trits at a time.
+
+Trit tables are indexed by trit value + 1, following the TRIT_VALUES order (-1, 0, 1). Word tables
+work on offset values (value + half the word range), whose base 3 digits are exactly trit + 1, so a
+chunk of k trits is a single index between 0 and 3^k - 1.
+"""
+
+import inspect
+
+import numpy as np
+
+import gate_design
+
+WORD_TRITS = 9
+CHUNK_TRITS = 3
+
+# Trit value for each 2-bit code of the packed word encoding (0b10 is unused and reads as 0)
+CODE_TO_TRIT = np.array([0, 1, 0, -1], dtype=np.int8)
+
+
+class CompiledGate:
+    """A monadic or dyadic ternary gate reduced to its truth table."""
+
+    def __init__(self, table, name="gate"):
+        self.table = np.asarray(table, dtype=np.int8)
+        self.arity = self.table.ndim
+        self.name = name
+        self._word_gates = {}
+
+    def __call__(self, *trits):
+        """Evaluate the gate trit-wise on scalars or arrays of trit values."""
+        return self.table[tuple(np.asarray(t, dtype=np.intp) + 1 for t in trits)]
+
+    def __repr__(self):
+        return f"CompiledGate({self.name}, {self.table.tolist()})"
+
+    def signature(self):
+        """Hashable truth table, identical for any two compositions that compute the same gate."""
+        return self.table.tobytes()
+
+    def words(self, trits=WORD_TRITS, chunk=CHUNK_TRITS):
+        """Return a (cached) evaluator applying this gate across words of the given width."""
+        key = (trits, chunk)
+        if key not in self._word_gates:
+            self._word_gates[key] = WordGate(self, trits, chunk)
+        return self._word_gates[key]
+
+
+def compile_gate(gate_function, name=None):
+    """
+    Evaluate a gate function on every input once and return it as a CompiledGate.
+    The function may be composed of other gates, including other compiled gates.
+    """
+    if isinstance(gate_function, CompiledGate):
+        return gate_function
+    arity = len(inspect.signature(gate_function).parameters)
+    if arity == 1:
+        table = gate_design.generate_monadic_truth_table(gate_function)
+    elif arity == 2:
+        table = gate_design.generate_dyadic_truth_table(gate_function)
+    else:
+        raise ValueError(f"Gates must take one or two trits, not {arity}")
+    return CompiledGate(table, name or gate_function.__name__)
+
+
+def chunk_digits(chunk):
+    """Trit values of every chunk index, least significant trit first, shape (3^chunk, chunk)."""
+    indices = np.arange(3 ** chunk)
+    return np.stack([(indices // 3 ** i) % 3 - 1 for i in range(chunk)], axis=-1).astype(np.int8)
+
+
+class WordGate:
+    """
+    A compiled gate fused to operate on whole words: one table lookup per chunk of trits.
+    Word values are balanced integers; packed() works on the 2-bit-per-trit machine encoding.
+    """
+
+    def __init__(self, gate, trits=WORD_TRITS, chunk=CHUNK_TRITS):
+        self.gate = gate
+        self.trits = trits
+        self.chunk = min(chunk, trits)
+        self.chunks = -(-trits // self.chunk)
+        self.base = 3 ** self.chunk
+        self.half = (3 ** trits - 1) // 2
+        self.modulus = 3 ** trits
+
+        # Chunk table over offset digits: entry [x] or [x, y] is the offset index of the result chunk
+        digits = chunk_digits(self.chunk)
+        weights = 3 ** np.arange(self.chunk)
+        if gate.arity == 1:
+            self.table = ((gate(digits) + 1) @ weights).astype(np.int64)
+        else:
+            results = gate(digits[:, np.newaxis, :], digits[np.newaxis, :, :])
+            self.table = ((results + 1) @ weights).astype(np.int64)
+
+        # The same table over packed 2-bit codes for each chunk of 2*chunk bits
+        codes = np.arange(4 ** self.chunk)
+        code_trits = np.stack([CODE_TO_TRIT[(codes >> (2 * i)) & 3] for i in range(self.chunk)], axis=-1)
+        shifts = 2 * np.arange(self.chunk)
+        if gate.arity == 1:
+            results = gate(code_trits)
+        else:
+            results = gate(code_trits[:, np.newaxis, :], code_trits[np.newaxis, :, :])
+        self.packed_table = np.bitwise_or.reduce((results.astype(np.int64) & 3) << shifts, axis=-1)
+
+    def __call__(self, *values):
+        """Apply the gate to arrays of balanced integer word values."""
+        offsets = [(np.asarray(v, dtype=np.int64) + self.half) % self.modulus for v in values]
+        return self.offset(*offsets) - self.half
+
+    def offset(self, *offsets):
+        """Apply the gate to offset word values (value + half), returning offset values."""
+        result = 0
+        scale = 1
+        for _ in range(self.chunks):
+            result = result + self.table[tuple(o // scale % self.base for o in offsets)] * scale
+            scale *= self.base
+        return result % self.modulus
+
+    def packed(self, *words):
+        """Apply the gate to arrays of packed 2-bit-per-trit words, returning packed words."""
+        words = [np.asarray(w, dtype=np.int64) for w in words]
+        bits = 2 * self.chunk
+        mask = (1 << bits) - 1
+        result = 0
+        for i in range(self.chunks):
+            shift = i * bits
+            result = result | (self.packed_table[tuple((w >> shift) & mask for w in words)] << shift)
+        return result & ((1 << (2 * self.trits)) - 1)
+
+    def sweep(self, block=None):
+        """
+        Evaluate a dyadic gate over every pair of word values, a block of first operands at a time.
+        Yields (a, results) where results[i, j] is the gate applied to a[i] and the j-th word value
+        (word values run from -half to +half).
+        """
+        if self.gate.arity != 2:
+            raise ValueError("sweep() needs a dyadic gate")
+        block = block or self.base
+        all_offsets = np.arange(self.modulus, dtype=np.int64)
+        scales = [self.base ** i for i in range(self.chunks)]
+        b_chunks = [all_offsets // scale % self.base for scale in scales]
+
+        for start in range(0, self.modulus, block):
+            a = all_offsets[start:start + block]
+            results = np.zeros((len(a), self.modulus), dtype=np.int64)
+            for scale, b_chunk in zip(scales, b_chunks):
+                a_chunk = (a // scale % self.base)[:, np.newaxis]
+                results += self.table[a_chunk, b_chunk[np.newaxis, :]] * scale
+            yield a - self.half, (results % self.modulus) - self.half
+
+
+# The gate_design.py gates compiled once for reuse
+PTI = compile_gate(gate_design.PTI)
+NTI = compile_gate(gate_design.NTI)
+STI = compile_gate(gate_design.STI)
+AND = compile_gate(gate_design.AND)
+OR = compile_gate(gate_design.OR)
+NAND = compile_gate(gate_design.NAND)
+NOR = compile_gate(gate_design.NOR)
+consensus_gate = compile_gate(gate_design.consensus_gate)
+any_gate = compile_gate(gate_design.any_gate)
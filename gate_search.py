@@ -0,0 +1,256 @@
+"""
+Ternary Gate Design Search
+--------------------------
+Enumerates compositions of the primitive gates in gate_design.py (PTI, NTI, STI, NAND, NOR, AND,
+OR) over two inputs a and b, and finds the cheapest realisation of any target 3x3 truth table
+using the CNFET transistor counts of cost_model.py.
+
+Every two-input ternary function has one of 3^9 = 19683 truth tables, so compositions are
+deduplicated by truth table: only the cheapest expression found for each table is kept, and new
+compositions are built from those memoized sub-expressions. Each round extends the search one
+gate deeper, spreading the pairwise compositions across worker processes.
+
+Costs are counted per expression tree, so a sub-expression used twice is paid for twice.
+"""
+
+import argparse
+import multiprocessing
+
+import numpy as np
+
+import cost_model
+import gate_compiler
+import gate_design
+
+PRIMITIVES = ('PTI', 'NTI', 'STI', 'NAND', 'NOR', 'AND', 'OR')
+
+# CNFET transistors per primitive; STI is the standard ternary inverter, costed as NOT
+CNFET_TRANSISTORS = {
+    name: cost_model.GATE_TRANSISTORS["CNFET"]["NOT" if name == 'STI' else name] for name in PRIMITIVES
+}
+
+# Target gates that can be named on the command line
+TARGETS = {
+    'consensus': gate_design.consensus_gate,
+    'any': lambda a, b: max(-1, min(1, a + b)),  # ternary_any_1bit in Verilog/ternary/alu.v
+    'and': gate_design.AND,
+    'or': gate_design.OR,
+    'nand': gate_design.NAND,
+    'nor': gate_design.NOR,
+}
+
+TABLE_SIZE = 9  # Entries in a 3x3 truth table
+FUNCTIONS = 3 ** TABLE_SIZE
+UNKNOWN = np.iinfo(np.int32).max
+LEAF = -1
+POWERS = 3 ** np.arange(TABLE_SIZE, dtype=np.int32)
+
+# Truth table digits (trit + 1) of every function index, entry k = 3 * (a + 1) + (b + 1)
+DIGITS = np.stack([(np.arange(FUNCTIONS) // 3 ** k) % 3 for k in range(TABLE_SIZE)], axis=-1).astype(np.int32)
+
+# Rounds with fewer (frontier, known) pairs than this are not worth starting worker processes for
+PARALLEL_PAIRS = 1 << 20
+
+# Worker state, installed in each process by _init_worker
+_worker = {}
+
+
+def _init_worker(tables, costs, known, gate_costs):
+    _worker.update(tables=tables, costs=costs, known=known, gate_costs=gate_costs)
+
+
+def table_index(truth_table):
+    """Index of a 3x3 truth table (rows a, columns b in TRIT_VALUES order)."""
+    digits = np.asarray(truth_table, dtype=np.int32).reshape(TABLE_SIZE) + 1
+    return int(digits @ POWERS)
+
+
+def index_table(index):
+    """3x3 truth table of a function index."""
+    return (DIGITS[index] - 1).reshape(3, 3)
+
+
+def _compose(gate, left, right, costs, gate_cost):
+    """
+    Apply a dyadic gate table to every (left, right) pair and keep the candidates that beat the
+    current best cost. Returns (result, cost, left, right) arrays with one entry per result.
+    """
+    results = np.zeros((len(left), len(right)), dtype=np.int32)
+    left_digits = DIGITS[left] * 3
+    right_digits = DIGITS[right]
+    for k in range(TABLE_SIZE):
+        results += gate[left_digits[:, k, np.newaxis] + right_digits[np.newaxis, :, k]] * POWERS[k]
+    pair_costs = costs[left][:, np.newaxis] + costs[right][np.newaxis, :] + gate_cost
+
+    better = pair_costs < costs[results]
+    rows, cols = np.nonzero(better)
+    return _cheapest(results[rows, cols], pair_costs[rows, cols], left[rows], right[cols])
+
+
+def _cheapest(results, pair_costs, left, right):
+    # Keep the cheapest candidate for each distinct result
+    order = np.argsort(pair_costs, kind='stable')
+    unique, first = np.unique(results[order], return_index=True)
+    chosen = order[first]
+    return unique, pair_costs[chosen], left[chosen], right[chosen]
+
+
+def _compose_task(task):
+    gate_name, block, swap = task
+    known = _worker['known']
+    left, right = (known, block) if swap else (block, known)
+    result = _compose(_worker['tables'][gate_name], left, right, _worker['costs'], _worker['gate_costs'][gate_name])
+    return gate_name, result
+
+
+class GateSearch:
+    """Cheapest known expression for every reachable two-input truth table."""
+
+    def __init__(self, gate_costs=CNFET_TRANSISTORS, primitives=PRIMITIVES, constants=False, processes=None,
+                 block=64):
+        self.gate_costs = dict(gate_costs)
+        self.primitives = primitives
+        self.processes = processes or multiprocessing.cpu_count()
+        self.block = block
+        self.depth = 0
+
+        self.monadic = {}
+        self.dyadic = {}
+        for name in primitives:
+            gate = getattr(gate_compiler, name)
+            if gate.arity == 1:
+                self.monadic[name] = (gate.table + 1).astype(np.int32)
+            else:
+                self.dyadic[name] = (gate.table + 1).astype(np.int32).reshape(TABLE_SIZE)
+
+        self.costs = np.full(FUNCTIONS, UNKNOWN, dtype=np.int64)
+        self.gate = np.full(FUNCTIONS, '', dtype=object)
+        self.left = np.full(FUNCTIONS, LEAF, dtype=np.int32)
+        self.right = np.full(FUNCTIONS, LEAF, dtype=np.int32)
+        self.names = {}
+
+        # The inputs (and optionally the -1, 0, +1 supply rails) cost nothing
+        leaves = [('a', lambda a, b: a), ('b', lambda a, b: b)]
+        if constants:
+            leaves += [(str(trit), lambda a, b, trit=trit: trit) for trit in gate_design.TRIT_VALUES]
+        for name, function in leaves:
+            index = table_index(gate_design.generate_dyadic_truth_table(function))
+            self.costs[index] = 0
+            self.names[index] = name
+        self.frontier = np.flatnonzero(self.costs != UNKNOWN).astype(np.int32)
+
+    def expand(self):
+        """Search one gate deeper, composing the functions improved in the previous round."""
+        known = np.flatnonzero(self.costs != UNKNOWN).astype(np.int32)
+        frontier = self.frontier
+        candidates = []
+
+        for name, table in self.monadic.items():
+            results = table[DIGITS[frontier]] @ POWERS
+            pair_costs = self.costs[frontier] + self.gate_costs[name]
+            better = pair_costs < self.costs[results]
+            unique, cost, left, right = _cheapest(results[better], pair_costs[better], frontier[better],
+                                                  np.full(int(better.sum()), LEAF, dtype=np.int32))
+            candidates.append((name, (unique, cost, left, right)))
+
+        tasks = []
+        for name, table in self.dyadic.items():
+            symmetric = (table.reshape(3, 3) == table.reshape(3, 3).T).all()
+            for start in range(0, len(frontier), self.block):
+                block = frontier[start:start + self.block]
+                tasks.append((name, block, False))
+                if not symmetric:
+                    tasks.append((name, block, True))
+
+        state = (self.dyadic, self.costs, known, self.gate_costs)
+        if self.processes > 1 and len(frontier) * len(known) >= PARALLEL_PAIRS:
+            with multiprocessing.Pool(self.processes, initializer=_init_worker, initargs=state) as pool:
+                candidates.extend(pool.imap_unordered(_compose_task, tasks))
+        else:
+            _init_worker(*state)
+            candidates.extend(map(_compose_task, tasks))
+
+        improved = set()
+        for name, (unique, cost, left, right) in candidates:
+            for index, c, l, r in zip(unique.tolist(), cost.tolist(), left.tolist(), right.tolist()):
+                if c < self.costs[index]:
+                    self.costs[index] = c
+                    self.gate[index] = name
+                    self.left[index] = l
+                    self.right[index] = r
+                    improved.add(index)
+
+        self.frontier = np.array(sorted(improved), dtype=np.int32)
+        self.depth += 1
+        return len(improved)
+
+    def run(self, depth, verbose=False):
+        """Expand the search until the given depth or until no table can be improved."""
+        while self.depth < depth and len(self.frontier):
+            improved = self.expand()
+            if verbose:
+                print(f"Depth {self.depth}: {improved} tables improved, {self.reachable()} of {FUNCTIONS} reachable")
+        return self
+
+    def reachable(self):
+        """Number of truth tables with a known realisation."""
+        return int((self.costs != UNKNOWN).sum())
+
+    def expression(self, index):
+        """Expression string for the cheapest known realisation of a function index."""
+        if index in self.names:
+            return self.names[index]
+        name = self.gate[index]
+        if self.right[index] == LEAF:
+            return f"{name}({self.expression(int(self.left[index]))})"
+        return f"{name}({self.expression(int(self.left[index]))}, {self.expression(int(self.right[index]))})"
+
+    def best(self, target):
+        """
+        Cheapest realisation of a target gate function or 3x3 truth table.
+        Returns (transistors, expression), or None if it has not been reached yet.
+        """
+        if callable(target):
+            target = gate_design.generate_dyadic_truth_table(target)
+        index = table_index(target)
+        if self.costs[index] == UNKNOWN:
+            return None
+        return int(self.costs[index]), self.expression(index)
+
+
+def parse_table(text):
+    """Parse nine comma separated trits (row-major, a then b in -, 0, + order) into a 3x3 table."""
+    values = [int(value) for value in text.split(',')]
+    if len(values) != TABLE_SIZE or any(value not in gate_design.TRIT_VALUES for value in values):
+        raise ValueError("A truth table needs nine trits from -1, 0, 1")
+    return np.array(values, dtype=int).reshape(3, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search for the cheapest CNFET realisation of a ternary gate")
+
+    parser.add_argument("--target", type=str, default="consensus", help=f"Gate to realise: {', '.join(TARGETS)}")
+    parser.add_argument("--table", type=str, default=None, help="Target truth table as nine comma separated trits")
+    parser.add_argument("--depth", type=int, default=4, help="Maximum composition depth")
+    parser.add_argument("--constants", action="store_true", help="Allow inputs tied to the -1, 0, +1 rails")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+
+    args = parser.parse_args()
+    target = parse_table(args.table) if args.table else gate_design.generate_dyadic_truth_table(TARGETS[args.target])
+
+    search = GateSearch(constants=args.constants, processes=args.processes).run(args.depth, verbose=True)
+
+    gate_design.print_dyadic_truth_table("Target", target)
+    found = search.best(target)
+    if found is None and not len(search.frontier):
+        print(f"\nNo realisation exists: the primitives only reach {search.reachable()} truth tables")
+    elif found is None:
+        print(f"\nNo realisation found within depth {args.depth}")
+    else:
+        transistors, expression = found
+        print(f"\nCheapest realisation: {expression}")
+        print(f"CNFET transistors: {transistors}")
+
+
+if __name__ == "__main__":
+    main()
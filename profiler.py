@@ -0,0 +1,229 @@
+"""
+Gate-Cost Profiler
+------------------
+Attributes gate activations, and the transistor and delay costs derived from them, to each
+instruction of a program: a line profiler for assembly. gate_counter_top only reports totals
+for the whole run; the profiler splits them by program address and by opcode, so the
+instructions that dominate the cost of a kernel (an ADD in a loop running
+ternary_ripple_carry_adder, say) stand out.
+
+Execution counts come from the instruction-level simulator by default, or from a Verilog trace
+written with +trace=<path> (--trace), in which case the gate counts are the testbench's own.
+
+Costs come from cost_model.py, with binary gates built in CMOS and ternary gates in CNFET:
+- transistors: gate activations weighted by transistors per gate
+- delay: critical-path delay units of the ALU operation per execution, and the same in
+  picoseconds for a 32nm process. Operations without a delay figure (LT, EQ, COMP and non-ALU
+  instructions) count as 0.
+
+python profiler.py --filepath multiplication.asm --arch ternary --top 10
+"""
+
+import argparse
+
+import assembler
+import cost_model
+import simulator
+import toolchain
+import trace_reader
+
+# ALU module activated by each instruction (alu.v)
+ALU_MODULES = {
+    "binary": {
+        "NOT": "binary_not", "AND": "binary_and", "ANDI": "binary_and", "OR": "binary_or", "XOR": "binary_xor",
+        "ADD": "ripple_carry_adder", "ADDI": "ripple_carry_adder", "SUB": "ripple_carry_subtractor",
+        "LT": "binary_less_than", "EQ": "binary_equality",
+    },
+    "ternary": {
+        "NOT": "ternary_not", "AND": "ternary_and", "ANDI": "ternary_and", "OR": "ternary_or", "XOR": "ternary_xor",
+        "ADD": "ternary_ripple_carry_adder", "ADDI": "ternary_ripple_carry_adder", "SUB": "ternary_ripple_carry_adder",
+        "LT": "ternary_less_than", "EQ": "ternary_equality",
+    },
+}
+
+GATES = {
+    "binary": simulator.BINARY_GATES,
+    "ternary": simulator.TERNARY_GATES,
+}
+
+# Control state in which an instruction's opcode is first valid (STATE_REGLOAD in parameters.vh)
+STATE_REGLOAD = 3
+
+
+class Profile:
+    """Executions, cycles and gate activations of a program, per instruction address."""
+
+    def __init__(self, arch, source=None, line_numbers=None, first_address=0):
+        self.arch = arch
+        self.gates = GATES[arch]
+        self.source = source or []              # Source lines of the program
+        self.line_numbers = line_numbers or []  # Source line of each program word
+        self.first_address = first_address     # Address of the first program word
+        self.entries = {}
+
+        self.transistors = cost_model.technology(arch).matrix(self.gates)[:, 0].astype(int).tolist()
+        self.delays = cost_model.operation_delays(arch)
+
+    def add(self, address, mnemonic, hits=0, cycles=0, gates=None):
+        """Add executions, cycles and per-gate activations to an address."""
+        entry = self.entries.get(address)
+        if entry is None:
+            entry = self.entries[address] = {"mnemonic": mnemonic, "hits": 0, "cycles": 0, "gates": [0] * len(self.gates)}
+        if mnemonic is not None:
+            entry["mnemonic"] = mnemonic
+        entry["hits"] += hits
+        entry["cycles"] += cycles
+        if gates:
+            for i, count in enumerate(gates):
+                entry["gates"][i] += count
+
+    def line(self, address):
+        """(line number, source text) of the instruction at an address, or (None, '')."""
+        index = address - self.first_address
+        if 0 <= index < len(self.line_numbers):
+            number = self.line_numbers[index]
+            if number <= len(self.source):
+                return number, self.source[number - 1].strip()
+        return None, ""
+
+    def rows(self):
+        """Per-address rows with the derived transistor and delay costs, in address order."""
+        rows = []
+        for address in sorted(self.entries):
+            entry = self.entries[address]
+            number, text = self.line(address)
+            rows.append(self._row(entry, address=address, line=number, source=text))
+        return rows
+
+    def by_opcode(self):
+        """Rows totalled per mnemonic, most expensive first."""
+        totals = {}
+        for entry in self.entries.values():
+            total = totals.setdefault(entry["mnemonic"], {"mnemonic": entry["mnemonic"], "hits": 0, "cycles": 0,
+                                                          "gates": [0] * len(self.gates)})
+            total["hits"] += entry["hits"]
+            total["cycles"] += entry["cycles"]
+            total["gates"] = [a + b for a, b in zip(total["gates"], entry["gates"])]
+        rows = [self._row(total, module=ALU_MODULES[self.arch].get(mnemonic, "")) for mnemonic, total in totals.items()]
+        return sorted(rows, key=lambda row: (-row["transistors"], -row["cycles"]))
+
+    def _row(self, entry, **fields):
+        delay = self.delays.get(entry["mnemonic"], 0) * entry["hits"]
+        row = {
+            "mnemonic": entry["mnemonic"],
+            "hits": entry["hits"],
+            "cycles": entry["cycles"],
+            "gates": dict(zip(self.gates, entry["gates"])),
+            "gate_total": sum(entry["gates"]),
+            "transistors": sum(count * weight for count, weight in zip(entry["gates"], self.transistors)),
+            "delay": delay,
+            "delay_ps": delay * cost_model.DELAY_SCALE_PS[self.arch],
+        }
+        row.update(fields)
+        return row
+
+    def totals(self):
+        """Whole-program totals."""
+        rows = self.rows()
+        totals = {key: sum(row[key] for row in rows) for key in ("hits", "cycles", "gate_total", "transistors", "delay", "delay_ps")}
+        totals["gates"] = {gate: sum(row["gates"][gate] for row in rows) for gate in self.gates}
+        return totals
+
+    def report(self, top=None):
+        """Format the profile as a line-by-line listing followed by the per-opcode summary."""
+        totals = self.totals()
+        rows = self.rows()
+        if top is not None:
+            rows = sorted(rows, key=lambda row: (-row["transistors"], -row["cycles"]))[:top]
+
+        technology = cost_model.TECHNOLOGIES[self.arch]
+        lines = [
+            f"{self.arch} ({technology}): {totals['hits']} instructions, {totals['cycles']} cycles, "
+            f"{totals['gate_total']} gate activations, {totals['transistors']} transistors, "
+            f"{totals['delay']} delay units ({totals['delay_ps']:.1f} ps)",
+            "",
+            f"{'Addr':>5} {'Line':>5} {'Hits':>9} {'Cycles':>9} {'Gates':>10} {'Transistors':>12} {'%':>6} {'Delay':>9}  Source",
+        ]
+        for row in rows:
+            share = 100 * row["transistors"] / totals["transistors"] if totals["transistors"] else 0
+            line = "" if row["line"] is None else row["line"]
+            source = row["source"] or (row["mnemonic"] or "?")
+            lines.append(f"{row['address']:>5} {line:>5} {row['hits']:>9} {row['cycles']:>9} {row['gate_total']:>10} "
+                         f"{row['transistors']:>12} {share:>5.1f}% {row['delay']:>9}  {source}")
+
+        lines += ["", f"{'Opcode':<7} {'Module':<27} {'Hits':>9} {'Cycles':>9} {'Gates':>10} {'Transistors':>12} {'%':>6} {'Delay':>9}"]
+        for row in self.by_opcode():
+            share = 100 * row["transistors"] / totals["transistors"] if totals["transistors"] else 0
+            lines.append(f"{row['mnemonic'] or '?':<7} {row['module']:<27} {row['hits']:>9} {row['cycles']:>9} "
+                         f"{row['gate_total']:>10} {row['transistors']:>12} {share:>5.1f}% {row['delay']:>9}")
+        return "\n".join(lines)
+
+
+def assemble_source(arch, source):
+    """Assemble source lines, returning (words, line number of each word)."""
+    line_numbers = []
+    words, _ = assembler.assemble(toolchain.new_parser(arch), source, line_numbers)
+    return words, line_numbers
+
+
+def profile_simulation(arch, source, max_steps=None):
+    """Profile a run of the source lines on the instruction-level simulator."""
+    words, line_numbers = assemble_source(arch, source)
+    machine = simulator.SIMULATORS[arch]()
+    machine.load(words)
+    result = machine.run(max_steps=max_steps)
+
+    profile = Profile(arch, source, line_numbers, machine.FIRST_ADDRESS)
+    costs = machine.GATE_COSTS
+    for (address, mnemonic), hits in result.address_counts.items():
+        gates = [count * hits for count in costs.get(mnemonic, ())]
+        profile.add(address, mnemonic, hits, simulator.INSTRUCTION_CYCLES[mnemonic] * hits, gates)
+    return profile
+
+
+def profile_trace(filename, source=None):
+    """
+    Profile a Verilog trace written with +trace=<path>. Each cycle and its gate activations are
+    charged to the address in the program counter; an instruction is counted once, in its
+    register load state. source gives the program's lines for the listing.
+    """
+    with trace_reader.TraceReader(filename) as reader:
+        arch = reader.arch
+        line_numbers = assemble_source(arch, source)[1] if source is not None else None
+        profile = Profile(arch, source, line_numbers, simulator.SIMULATORS[arch].FIRST_ADDRESS)
+        for record in reader:
+            if record["pc"] is None:
+                continue
+            counted = record["state"] == STATE_REGLOAD
+            gates = record.get("gates")
+            profile.add(record["pc"], record["mnemonic"] if counted else None, int(counted), 1,
+                        [gates[gate] for gate in profile.gates] if gates else None)
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-instruction gate-cost profile of an assembly program")
+
+    parser.add_argument("--arch", type=str, default="both", choices=["binary", "ternary", "both"], help="Architecture to profile")
+    parser.add_argument("--filepath", type=str, default="input.asm", help="Input assembly filepath")
+    parser.add_argument("--trace", type=str, default=None, help="Profile a Verilog trace instead of simulating ({arch} is replaced)")
+    parser.add_argument("--max-steps", type=int, default=None, help="Stop the simulation after this many instructions")
+    parser.add_argument("--top", type=int, default=None, help="List only the most expensive addresses")
+
+    args = parser.parse_args()
+    architectures = toolchain.ARCHITECTURES if args.arch == "both" else (args.arch,)
+
+    with open(args.filepath, 'r') as f:
+        source = f.readlines()
+
+    for arch in architectures:
+        if args.trace is not None:
+            profile = profile_trace(args.trace.format(arch=arch), source)
+        else:
+            profile = profile_simulation(arch, source, args.max_steps)
+        print(f"\n[{arch}]")
+        print(profile.report(args.top))
+
+
+if __name__ == "__main__":
+    main()
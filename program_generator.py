@@ -0,0 +1,445 @@
+"""
+Program Generator
+-----------------
+Generates corpora of synthetic benchmark programs in the shared ISA, each with the results it
+should produce, for binary-vs-ternary comparisons over many more programs than the hand-written
+ones. Kernels:
+- fibonacci: iterates F(n), F(n+1) in registers
+- shift_add_multiply: a * b by doubling and adding over the bits of b, most significant first
+  (unrolled, as neither machine can test the bits of a register)
+- bubble_sort: sorts values in memory with LOAD/STORE
+- matrix_multiply: C = A x B for n x n matrices in memory, multiplying by repeated addition
+- alu_mix: random ALU instructions drawn from a seeded opcode distribution
+
+Every program keeps to the operands both assemblers accept (immediates 0 to 40, memory offsets 0
+to 4, registers R0-R7) and branches only with EQ followed by BNE, the one condition both machines
+evaluate the same way. Kernels that keep data in memory jump over a block of HALT words at the
+start of the program and use it as their data, so the addresses fit in an immediate.
+
+Expected results are worked out from the kernel's parameters (for alu_mix, whose instructions
+mean different things on the two machines, they are the reference simulator's final registers).
+Each program is assembled for both architectures and run on simulator.py; the manifest records
+its size, whether it fits the machine's program memory, instructions and cycles, and whether
+the expected results were reproduced. Ternary programs hold at most 27 words, so the memory
+kernels only run on the binary machine.
+
+python program_generator.py --count 1000 --seed 1 --output benchmarks/generated
+python program_generator.py --kernels alu_mix --count 5000 --mix ADD=4 SUB=2 AND=1
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+
+import assembler
+import simulator
+import toolchain
+
+MANIFEST_NAME = "manifest.json"
+
+# Largest immediate and memory offset both assemblers accept
+IMMEDIATE_MAX = min(toolchain.instruction_layout(arch)["big_immediate"][1] for arch in toolchain.ARCHITECTURES)
+OFFSET_MAX = min(toolchain.instruction_layout(arch)["small_immediate"][1] for arch in toolchain.ARCHITECTURES)
+
+# Largest value both machines hold without wrapping (9 balanced trits)
+VALUE_MAX = (3 ** 9 - 1) // 2
+
+# Words the scratch block of matrix_multiply holds: row of A, column of B, element of C and the
+# j loop counter
+SCRATCH_WORDS = 4
+
+# Default opcode distribution of alu_mix
+DEFAULT_MIX = {
+    "ADD": 4, "SUB": 3, "ADDI": 3, "MV": 2, "AND": 2, "OR": 2, "XOR": 2,
+    "NOT": 1, "ANDI": 1, "LI": 1, "EQ": 1, "LT": 1,
+}
+MIX_FORMATS = {
+    "ADD": "R", "SUB": "R", "MV": "R", "AND": "R", "OR": "R", "XOR": "R", "NOT": "R", "LT": "R", "EQ": "R",
+    "COMP": "R", "ADDI": "I", "ANDI": "I", "LI": "I", "LUI": "I",
+}
+
+# Instructions a simulation may run before it is abandoned as non-terminating
+MAX_STEPS = 1000000
+
+
+class Program:
+    """A generated program: its source lines and the register and memory values it should leave."""
+
+    def __init__(self, name, kernel, parameters, lines, registers=None, memory=None):
+        self.name = name
+        self.kernel = kernel
+        self.parameters = parameters
+        self.lines = lines
+        self.registers = registers  # Register number -> value, or None if the simulator decides
+        self.memory = memory or {}  # Address -> value
+
+    def source(self):
+        """The program text, headed by its kernel and parameters."""
+        header = [f"; {self.name}: {self.kernel} {json.dumps(self.parameters)}"]
+        if self.registers:
+            header.append("; Expected: " + ", ".join(f"R{reg}={value}" for reg, value in sorted(self.registers.items())))
+        if self.memory:
+            header.append("; Expected memory: " + ", ".join(f"[{address}]={value}" for address, value in sorted(self.memory.items())))
+        return "\n".join(header + self.lines) + "\n"
+
+
+def load_constant(register, value):
+    """Lines loading a constant of up to 255 into a register whose upper digits are 0."""
+    lines = [f"LI R{register}, {min(value, IMMEDIATE_MAX)}"]
+    value -= min(value, IMMEDIATE_MAX)
+    while value > 0:
+        lines.append(f"ADDI R{register}, {min(value, IMMEDIATE_MAX)}")
+        value -= min(value, IMMEDIATE_MAX)
+    return lines
+
+
+def data_block(words):
+    """Jump over words HALT words at addresses 1 to words, which the program then uses as data."""
+    return ["BNE R0, START     ; R0 is 0 after reset, so this always branches"] + ["HALT"] * words + ["START:"]
+
+
+def store_values(base, values, value_register=0, pointers=(1, 2, 3, 4, 5, 6)):
+    """
+    Lines storing values at consecutive addresses from base. Each pointer register covers a
+    window of OFFSET_MAX + 1 addresses, and values are loaded once for all the words holding them.
+    """
+    window = OFFSET_MAX + 1
+    windows = [base + start for start in range(0, len(values), window)]
+    if len(windows) > len(pointers):
+        raise ValueError(f"At most {len(pointers) * window} values can be stored")
+
+    lines = []
+    for pointer, address in zip(pointers, windows):
+        lines += load_constant(pointer, address)
+    for value in sorted(set(values)):
+        lines.append(f"LI R{value_register}, {value}")
+        for index, stored in enumerate(values):
+            if stored == value:
+                lines.append(f"STORE R{value_register}, R{pointers[index // window]}, {index % window}")
+    return lines
+
+
+def loop_until_zero(register, label):
+    """Lines branching back to label unless the register is 0 (R2 is overwritten)."""
+    return ["SUB R2, R2", f"EQ R2, R{register}", f"BNE R2, {label}"]
+
+
+def fibonacci(n):
+    """F(n) in R0 and F(n+1) in R1, for n of at least 1."""
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    lines = [
+        "LI R0, 0          ; F(i)",
+        "LI R1, 1          ; F(i+1)",
+        "LI R3, 0          ; i",
+        f"LI R4, {n}",
+        "LOOP:",
+        "MV R2, R1",
+        "ADD R1, R0",
+        "MV R0, R2",
+        "ADDI R3, 1",
+        "MV R5, R3",
+        "EQ R5, R4",
+        "BNE R5, LOOP",
+        "HALT",
+    ]
+    return lines, {0: a, 1: b, 3: n}, {}
+
+
+def shift_add_multiply(a, b):
+    """a * b in R1, built from the bits of b from the most significant down."""
+    lines = [f"LI R0, {a}", "MV R1, R0         ; Leading 1 bit of b"]
+    for bit in format(b, "b")[1:]:
+        lines.append("ADD R1, R1        ; Shift left")
+        if bit == "1":
+            lines.append("ADD R1, R0")
+    lines.append("HALT")
+    return lines, {0: a, 1: a * b}, {}
+
+
+def bubble_sort(values):
+    """Sort at least two values of 0 to 40 in place at addresses 1 to len(values)."""
+    count = len(values)
+    lines = data_block(count) + store_values(1, values) + [
+        "LI R7, 1",
+        "LI R3, 40",
+        "ADDI R3, 24       ; R3 = 64: a - b + 63 has this bit set exactly when a > b",
+        f"LI R5, {count - 1}          ; Passes",
+        "OUTER:",
+        "LI R6, 1          ; First value",
+        f"LI R4, {count - 1}          ; Comparisons",
+        "INNER:",
+        "LOAD R0, R6, 0",
+        "LOAD R1, R6, 1",
+        "MV R2, R0",
+        "SUB R2, R1",
+        "ADDI R2, 40",
+        "ADDI R2, 23",
+        "AND R2, R3",
+        "EQ R2, R3",
+        "BNE R2, NEXT      ; In order",
+        "STORE R1, R6, 0",
+        "STORE R0, R6, 1",
+        "NEXT:",
+        "ADDI R6, 1",
+        "SUB R4, R7",
+    ] + loop_until_zero(4, "INNER") + ["SUB R5, R7"] + loop_until_zero(5, "OUTER") + ["HALT"]
+    return lines, None, {1 + i: value for i, value in enumerate(sorted(values))}
+
+
+def matrix_multiply(a, b):
+    """
+    C = A x B for n x n matrices of values of at least 1, held row by row after the scratch
+    words: A from address 5, then B, then C. The rows end when the row pointer reaches B.
+    """
+    n = len(a)
+    start_a = 1 + SCRATCH_WORDS
+    start_b = start_a + n * n
+    start_c = start_b + n * n
+    values = [value for row in a for value in row] + [value for row in b for value in row]
+    product = [[sum(a[i][k] * b[k][j] for k in range(n)) for j in range(n)] for i in range(n)]
+
+    lines = data_block(SCRATCH_WORDS + 3 * n * n) + store_values(start_a, values) + [
+        "LI R7, 1          ; Scratch words are addressed from R7"]
+    for slot, value in enumerate((start_a, start_b, start_c, n)):
+        lines += load_constant(2, value) + [f"STORE R2, R7, {slot}"]
+    lines += [
+        "JLOOP:",
+        "LOAD R4, R7, 0    ; A[i][0]",
+        "LOAD R5, R7, 1    ; B[0][j]",
+        "SUB R3, R3",
+        f"LI R6, {n}          ; k counter",
+        "KLOOP:",
+        "LOAD R0, R4, 0",
+        "LOAD R1, R5, 0",
+        "MLOOP:",
+        "ADD R3, R0        ; R3 += A[i][k] * B[k][j]",
+        "SUB R1, R7",
+    ] + loop_until_zero(1, "MLOOP") + [
+        "ADDI R4, 1",
+        f"ADDI R5, {n}",
+        "SUB R6, R7",
+    ] + loop_until_zero(6, "KLOOP") + [
+        "LOAD R2, R7, 2",
+        "STORE R3, R2, 0   ; C[i][j]",
+        "ADDI R2, 1",
+        "STORE R2, R7, 2",
+        "LOAD R2, R7, 1",
+        "ADDI R2, 1",
+        "STORE R2, R7, 1",
+        "LOAD R6, R7, 3",
+        "SUB R6, R7",
+        "STORE R6, R7, 3",
+    ] + loop_until_zero(6, "JLOOP") + [
+        "LOAD R2, R7, 0",
+        f"ADDI R2, {n}",
+        "STORE R2, R7, 0   ; Next row of A",
+    ] + load_constant(3, start_b) + ["STORE R3, R7, 1"] + load_constant(6, n) + [
+        "STORE R6, R7, 3",
+        "EQ R2, R3",
+        "BNE R2, JLOOP",
+        "HALT",
+    ]
+
+    memory = {start_c + i * n + j: product[i][j] for i in range(n) for j in range(n)}
+    return lines, None, memory
+
+
+def alu_mix(length, seed, mix=None):
+    """length ALU instructions drawn from mix (mnemonic -> weight) after loading R0-R3."""
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    mnemonics = list(mix)
+    lines = [f"LI R{reg}, {rng.randint(0, IMMEDIATE_MAX)}" for reg in range(4)]
+    for mnemonic in rng.choices(mnemonics, weights=[mix[name] for name in mnemonics], k=length):
+        if MIX_FORMATS[mnemonic] == "R":
+            lines.append(f"{mnemonic} R{rng.randrange(8)}, R{rng.randrange(8)}")
+        else:
+            lines.append(f"{mnemonic} R{rng.randrange(8)}, {rng.randint(0, IMMEDIATE_MAX)}")
+    lines.append("HALT")
+    return lines, None, {}
+
+
+def _sample_fibonacci(rng):
+    # F(n+1) must fit in 9 trits
+    return {"n": rng.randint(1, 19)}
+
+
+def _sample_shift_add_multiply(rng):
+    a = rng.randint(1, IMMEDIATE_MAX)
+    return {"a": a, "b": rng.randint(1, min(VALUE_MAX // a, 2 ** 12 - 1))}
+
+
+def _sample_bubble_sort(rng):
+    return {"values": [rng.randint(0, IMMEDIATE_MAX) for _ in range(rng.randint(2, 16))]}
+
+
+def _sample_matrix_multiply(rng):
+    n = rng.randint(1, 3)
+    return {
+        "a": [[rng.randint(1, 3) for _ in range(n)] for _ in range(n)],
+        "b": [[rng.randint(1, 3) for _ in range(n)] for _ in range(n)],
+    }
+
+
+def _sample_alu_mix(rng):
+    return {"length": rng.randint(8, 22), "seed": rng.randrange(2 ** 32)}
+
+
+# Kernel name -> (program builder, parameter sampler)
+KERNELS = {
+    "fibonacci": (fibonacci, _sample_fibonacci),
+    "shift_add_multiply": (shift_add_multiply, _sample_shift_add_multiply),
+    "bubble_sort": (bubble_sort, _sample_bubble_sort),
+    "matrix_multiply": (matrix_multiply, _sample_matrix_multiply),
+    "alu_mix": (alu_mix, _sample_alu_mix),
+}
+
+
+def generate(kernel, name, parameters, mix=None):
+    """Build one program of a kernel from its parameters."""
+    build, _ = KERNELS[kernel]
+    if kernel == "alu_mix" and mix is not None:
+        parameters = dict(parameters, mix=mix)
+    lines, registers, memory = build(**parameters)
+    return Program(name, kernel, parameters, lines, registers, memory)
+
+
+def generate_corpus(count, kernels=tuple(KERNELS), seed=0, mix=None):
+    """count programs of each kernel, with parameters drawn from a generator seeded by seed."""
+    programs = []
+    for kernel in kernels:
+        _, sample = KERNELS[kernel]
+        rng = random.Random(f"{seed}:{kernel}")
+        for index in range(count):
+            programs.append(generate(kernel, f"{kernel}_{index:05}", sample(rng), mix))
+    return programs
+
+
+# Assemblers kept by each worker process between programs
+_parsers = {}
+
+
+def _init_worker():
+    for arch in toolchain.ARCHITECTURES:
+        _parsers[arch] = toolchain.new_parser(arch)
+
+
+def _memory_index(arch, address):
+    return simulator.integer_to_ternary(address, 3) if arch == "ternary" else address
+
+
+def check_program(program):
+    """
+    Assemble a program for both architectures and run it on the simulator where it fits.
+    Returns {arch: target}, where target holds words, fits and, for programs that ran, halted,
+    instructions, cycles, the final registers and whether the expected results were produced
+    (None for programs whose results are the simulator's).
+    """
+    targets = {}
+    for arch in toolchain.ARCHITECTURES:
+        parser = _parsers[arch]
+        words, _ = assembler.assemble(parser, program.lines)
+        target = targets[arch] = {"words": len(words), "fits": len(words) <= toolchain.program_capacity(arch)}
+        if not target["fits"]:
+            continue
+
+        machine = simulator.SIMULATORS[arch](parser.instructions)
+        machine.load(words)
+        result = machine.run(max_steps=MAX_STEPS)
+        target.update({
+            "halted": result.halted,
+            "instructions": result.instructions,
+            "cycles": result.cycles,
+            "registers": result.registers,
+            "verified": None,
+        })
+        if program.registers is not None or program.memory:
+            target["verified"] = result.halted and all(
+                result.registers[reg] == value for reg, value in (program.registers or {}).items()
+            ) and all(
+                machine.register_value(result.memory[_memory_index(arch, address)]) == value
+                for address, value in program.memory.items()
+            )
+    return targets
+
+
+def _check(program):
+    return program.name, check_program(program)
+
+
+def write_corpus(programs, output_dir, processes=None, seed=None):
+    """
+    Write each program to <output_dir>/<kernel>/<name>.asm, check it on both architectures and
+    write manifest.json. Returns the manifest entries.
+    """
+    processes = min(processes or multiprocessing.cpu_count(), max(len(programs), 1))
+    if processes > 1:
+        with multiprocessing.Pool(processes, initializer=_init_worker) as pool:
+            checks = dict(pool.map(_check, programs, chunksize=max(1, len(programs) // (4 * processes))))
+    else:
+        _init_worker()
+        checks = dict(map(_check, programs))
+
+    entries = []
+    for program in programs:
+        path = os.path.join(output_dir, program.kernel, program.name + ".asm")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(program.source())
+        entries.append({
+            "name": program.name,
+            "kernel": program.kernel,
+            "source": path,
+            "parameters": program.parameters,
+            "expected_registers": program.registers,
+            "expected_memory": program.memory,
+            "targets": checks[program.name],
+        })
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as f:
+        json.dump({"seed": seed, "programs": entries}, f, indent=2)
+    return entries
+
+
+def parse_mix(items):
+    """Read an opcode distribution from MNEMONIC=WEIGHT strings."""
+    mix = {}
+    for item in items:
+        mnemonic, _, weight = item.partition("=")
+        mnemonic = mnemonic.upper()
+        if mnemonic not in MIX_FORMATS:
+            raise ValueError(f"Unknown ALU instruction: {mnemonic}")
+        mix[mnemonic] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark programs with known results")
+
+    parser.add_argument("--kernels", type=str, nargs='+', default=list(KERNELS), choices=list(KERNELS), help="Kernels to generate")
+    parser.add_argument("--count", type=int, default=100, help="Programs per kernel")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the program parameters")
+    parser.add_argument("--mix", type=str, nargs='+', default=None, help="Opcode distribution of alu_mix as MNEMONIC=WEIGHT")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--output", type=str, default="generated_programs", help="Output directory")
+
+    args = parser.parse_args()
+    mix = parse_mix(args.mix) if args.mix else None
+    programs = generate_corpus(args.count, args.kernels, args.seed, mix)
+    entries = write_corpus(programs, args.output, args.processes, args.seed)
+
+    for arch in toolchain.ARCHITECTURES:
+        ran = [entry["targets"][arch] for entry in entries if entry["targets"][arch]["fits"]]
+        checked = [target for target in ran if target["verified"] is not None]
+        verified = sum(1 for target in checked if target["verified"])
+        print(f"{arch}: {len(ran)} of {len(entries)} programs fit, "
+              f"{verified} of {len(checked)} with worked-out results reproduce them")
+    print(f"Wrote {len(entries)} programs to {os.path.join(args.output, MANIFEST_NAME)}")
+
+
+if __name__ == "__main__":
+    main()
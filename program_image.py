@@ -0,0 +1,174 @@
+"""
+Program Images
+--------------
+A packed binary alternative to program.hex for assembled programs and memory dumps. Images are
+mapped straight into memory and their words used in place, with no text to parse.
+
+Layout (all fields little-endian):
+offset 0    4 bytes  magic b"MVLI"
+offset 4    u8       format version (1)
+offset 5    u8       architecture (0 = binary, 1 = ternary)
+offset 6    u8       kind (0 = program, 1 = memory dump)
+offset 7    u8       bytes per word (2 for binary, 4 for ternary)
+offset 8    u32      number of words
+offset 12   u32      reserved (0)
+offset 16   words
+
+Binary words are 16-bit. Ternary words keep the 2-bit-per-trit encoding of program.hex in the low
+18 bits of a 32-bit word, so both kinds of image can be used directly as arrays of words.
+Memory dumps hold memory in address order (the raw 6-bit address patterns for ternary).
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+import toolchain
+
+MAGIC = b"MVLI"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBII")
+
+ARCH_CODES = {"binary": 0, "ternary": 1}
+KINDS = ("program", "memory")
+
+WORD_BYTES = {"binary": 2, "ternary": 4}
+WORD_BITS = {"binary": 16, "ternary": 18}
+
+# array/memoryview type codes and NumPy dtypes for each word size
+TYPECODES = {2: "H", 4: "I"}
+DTYPES = {2: "<u2", 4: "<u4"}
+
+
+def is_image(filename):
+    """Return True if the file starts with the program image magic number."""
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_header(data):
+    """Decode an image header from the start of a bytes-like object. Returns (arch, kind, word_bytes, count)."""
+    if len(data) < HEADER.size:
+        raise ValueError("Program image is shorter than its header")
+    magic, version, arch_code, kind_code, word_bytes, count, _ = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a program image")
+    if version != VERSION:
+        raise ValueError(f"Unsupported program image version: {version}")
+
+    arch = {code: name for name, code in ARCH_CODES.items()}.get(arch_code)
+    if arch is None or kind_code >= len(KINDS) or word_bytes != WORD_BYTES[arch]:
+        raise ValueError("Corrupt program image header")
+    return arch, KINDS[kind_code], word_bytes, count
+
+
+def _check_size(size, word_bytes, count):
+    if size < HEADER.size + count * word_bytes:
+        raise ValueError(f"Program image is truncated: expected {count} words")
+
+
+def write_image(filename, words, arch, kind="program"):
+    """Write words (any iterable of ints) as a program image."""
+    word_bytes = WORD_BYTES[arch]
+    data = array(TYPECODES[word_bytes], words)
+    if data and max(data) >> WORD_BITS[arch]:
+        raise ValueError(f"Words do not fit in {WORD_BITS[arch]} bits")
+    if sys.byteorder != "little":
+        data.byteswap()
+
+    with open(filename, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, ARCH_CODES[arch], KINDS.index(kind), word_bytes, len(data), 0))
+        data.tofile(f)
+
+
+class ProgramImage:
+    """
+    A program image mapped read-only into memory. words is a memoryview of the file's words
+    (no copy is made on little-endian machines). Use as a context manager or call close().
+    """
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.filename = filename
+        self.arch, self.kind, self.word_bytes, self.count = read_header(self._map)
+        _check_size(len(self._map), self.word_bytes, self.count)
+
+        start = HEADER.size
+        data = memoryview(self._map)[start:start + self.count * self.word_bytes]
+        if sys.byteorder == "little":
+            self.words = data.cast(TYPECODES[self.word_bytes])
+        else:
+            swapped = array(TYPECODES[self.word_bytes], data.tobytes())
+            swapped.byteswap()
+            data.release()
+            self.words = memoryview(swapped)
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def array(self):
+        """The words as a read-only NumPy array sharing the mapped memory."""
+        import numpy as np
+        return np.frombuffer(self._map, dtype=DTYPES[self.word_bytes], count=self.count, offset=HEADER.size)
+
+    def close(self):
+        """Release the mapping. Raises BufferError while arrays or views taken from the image are alive."""
+        self.words.release()
+        self._map.close()
+
+
+def open_image(filename):
+    """Map a program image into memory."""
+    return ProgramImage(filename)
+
+
+def memmap_image(filename):
+    """Return (arch, kind, numpy.memmap of the words) for a program image."""
+    import numpy as np
+    with open(filename, 'rb') as f:
+        arch, kind, word_bytes, count = read_header(f.read(HEADER.size))
+        _check_size(os.fstat(f.fileno()).st_size, word_bytes, count)
+    words = np.memmap(filename, dtype=DTYPES[word_bytes], mode='r', offset=HEADER.size, shape=(count,))
+    return arch, kind, words
+
+
+def load_words(filename):
+    """Read the words of a program image or program.hex file as a list of ints."""
+    if is_image(filename):
+        with open_image(filename) as image:
+            return image.words.tolist()
+    with open(filename, 'r') as f:
+        return [int(line, 16) for line in f if line.strip()]
+
+
+def export_hex(image_filename, hex_filename):
+    """Write a program image out as a text program.hex file for $readmemh."""
+    with open_image(image_filename) as image:
+        toolchain.write_hex(hex_filename, image.words, image.arch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or export a program image")
+
+    parser.add_argument("image", type=str, help="Program image file")
+    parser.add_argument("--hex", type=str, default=None, help="Export the words to this program.hex file")
+
+    args = parser.parse_args()
+    with open_image(args.image) as image:
+        print(f"{image.arch} {image.kind} image: {image.count} words of {image.word_bytes} bytes")
+    if args.hex is not None:
+        export_hex(args.image, args.hex)
+
+
+if __name__ == "__main__":
+    main()
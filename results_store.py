@@ -0,0 +1,272 @@
+"""
+Results Store
+-------------
+A columnar store of simulation runs for program_analysis.ipynb, replacing the pile of per-run
+*_results.csv files. Every run (program, architecture, gate counts, cycles, registers) is a row
+in a Parquet dataset partitioned by architecture:
+
+results/arch=binary/part-<time>-<id>.parquet
+results/arch=ternary/part-<time>-<id>.parquet
+
+Appends write new files and never rewrite old ones, so runs can be added from many processes at
+once; compact() later merges each partition into one file sorted by operation. Loads read only
+the requested columns, skip partitions for other architectures and use Parquet row group
+statistics to skip data for other operations, so large histories load in well under a second.
+
+Requires pyarrow (and pandas for load()).
+
+python results_store.py ingest-csv Verilog/binary/programs --arch binary
+python results_store.py ingest-farm farm_results
+python results_store.py show --operation multiplication
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+import uuid
+
+import toolchain
+
+STORE_DIR = os.path.join(toolchain.ROOT_DIR, "results")
+
+GATE_COLUMNS = ("NOT", "AND", "OR", "XOR", "ANY")
+
+# Rows per Parquet row group; smaller groups let operation filters skip more of a file
+ROW_GROUP_ROWS = 16384
+
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema(
+        [
+            ("run_id", pa.string()),
+            ("timestamp", pa.timestamp("ms", tz="UTC")),
+            ("operation", pa.string()),
+            ("source", pa.string()),
+        ]
+        + [(gate, pa.int64()) for gate in GATE_COLUMNS]
+        + [
+            ("cycles", pa.int64()),
+            ("instructions", pa.int64()),
+            ("registers", pa.list_(pa.int64())),
+            ("halted", pa.bool_()),
+        ]
+    )
+
+
+def run_record(operation, arch, gates, cycles=None, instructions=None, registers=None, source=None,
+               halted=None, run_id=None, timestamp=None):
+    """A run as a row for ResultsStore.append(). gates maps gate names to counts."""
+    if arch not in toolchain.ARCHITECTURES:
+        raise ValueError(f"Unknown architecture: {arch}")
+    unknown = set(gates) - set(GATE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown gates: {', '.join(sorted(unknown))}")
+
+    record = {
+        "run_id": run_id or uuid.uuid4().hex,
+        "timestamp": int(1000 * (time.time() if timestamp is None else timestamp)),
+        "operation": operation,
+        "source": source,
+        "arch": arch,
+        "cycles": cycles,
+        "instructions": instructions,
+        "registers": None if registers is None else list(registers),
+        "halted": halted,
+    }
+    for gate in GATE_COLUMNS:
+        record[gate] = gates.get(gate, 0)
+    return record
+
+
+def simulation_record(operation, result, source=None):
+    """A row for a simulator.SimulationResult."""
+    return run_record(operation, result.arch, result.gate_counts, result.cycles, result.instructions,
+                      result.registers, source, result.halted)
+
+
+class ResultsStore:
+    """The Parquet dataset of runs under path."""
+
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+
+    def _partition_dir(self, arch):
+        return os.path.join(self.path, f"arch={arch}")
+
+    def _files(self):
+        return sorted(glob.glob(os.path.join(self.path, "arch=*", "*.parquet")))
+
+    def _write(self, arch, table):
+        import pyarrow.parquet as pq
+
+        directory = self._partition_dir(arch)
+        os.makedirs(directory, exist_ok=True)
+        # Written under a temporary name so readers never see a partial file
+        name = f"part-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:12]}.parquet"
+        temporary = os.path.join(directory, f".{name}.tmp")
+        pq.write_table(table, temporary, row_group_size=ROW_GROUP_ROWS)
+        os.replace(temporary, os.path.join(directory, name))
+
+    def append(self, records):
+        """Add runs (dicts from run_record) to the store. Returns the number of rows written."""
+        import pyarrow as pa
+
+        by_arch = {}
+        for record in records:
+            by_arch.setdefault(record["arch"], []).append(record)
+
+        schema = _schema()
+        for arch, rows in by_arch.items():
+            rows.sort(key=lambda row: row["operation"])
+            self._write(arch, pa.Table.from_pylist(rows, schema=schema))
+        return sum(len(rows) for rows in by_arch.values())
+
+    def dataset(self, files=None):
+        """The store (or just the given files of it) as a pyarrow.dataset.Dataset, or None if it is empty."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        files = self._files() if files is None else files
+        if not files:
+            return None
+        partitioning = ds.partitioning(pa.schema([("arch", pa.string())]), flavor="hive")
+        return ds.dataset(files, schema=_schema().append(pa.field("arch", pa.string())), format="parquet",
+                          partitioning=partitioning, partition_base_dir=self.path)
+
+    def table(self, operations=None, architectures=None, columns=None):
+        """
+        Read runs as a pyarrow Table, keeping only the given operations and architectures
+        (None for all) and columns (None for all, arch included).
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        dataset = self.dataset()
+        if dataset is None:
+            return _schema().append(pa.field("arch", pa.string())).empty_table()
+
+        condition = None
+        if operations is not None:
+            condition = ds.field("operation").isin(list(operations))
+        if architectures is not None:
+            arch_condition = ds.field("arch").isin(list(architectures))
+            condition = arch_condition if condition is None else condition & arch_condition
+        return dataset.to_table(columns=None if columns is None else list(columns), filter=condition)
+
+    def load(self, operations=None, architectures=None, columns=None):
+        """Read runs as a pandas DataFrame (see table())."""
+        return self.table(operations, architectures, columns).to_pandas()
+
+    def gate_counts(self, operations=None, architectures=None, latest=False):
+        """
+        Gate counts in the layout program_analysis.ipynb uses: one row per run with type
+        (architecture), operation and a column per gate. With latest=True only the most recent
+        run of each operation on each architecture is kept.
+        """
+        frame = self.load(operations, architectures, columns=("arch", "operation", "timestamp") + GATE_COLUMNS)
+        if latest:
+            frame = frame.sort_values("timestamp", kind="stable").drop_duplicates(["arch", "operation"], keep="last")
+            frame = frame.sort_values(["arch", "operation"]).reset_index(drop=True)
+        frame = frame.rename(columns={"arch": "type"})
+        return frame[["type", "operation"] + list(GATE_COLUMNS)]
+
+    def run_ids(self):
+        """The set of run ids in the store."""
+        return set(self.table(columns=("run_id",)).column("run_id").to_pylist())
+
+    def compact(self):
+        """Merge each architecture's files into one, sorted by operation and time."""
+        for arch in toolchain.ARCHITECTURES:
+            files = glob.glob(os.path.join(self._partition_dir(arch), "*.parquet"))
+            if len(files) < 2:
+                continue
+            # Only the files found above are merged and removed, so runs appended meanwhile are kept as they are
+            table = self.dataset(files).to_table().drop_columns(["arch"])
+            self._write(arch, table.sort_by([("operation", "ascending"), ("timestamp", "ascending")]))
+            for path in files:
+                os.remove(path)
+
+    def ingest_csv(self, directory, arch):
+        """
+        Add the *_results.csv gate counts in a directory (named <operation>_results.csv), skipping
+        files already ingested. Returns the number of runs added.
+        """
+        existing = self.run_ids()
+        records = []
+        for path in sorted(glob.glob(os.path.join(directory, "*_results.csv"))):
+            with open(path, 'rb') as f:
+                content = f.read()
+            run_id = hashlib.sha256(f"{arch}\0{os.path.basename(path)}\0".encode() + content).hexdigest()[:32]
+            if run_id in existing:
+                continue
+
+            gates = {}
+            for line in content.decode().splitlines()[1:]:
+                if line.strip():
+                    gate, count = line.split(",")
+                    gates[gate.strip()] = int(count)
+            operation = os.path.basename(path)[:-len("_results.csv")]
+            records.append(run_record(operation, arch, gates, source=path, run_id=run_id,
+                                      timestamp=os.path.getmtime(path)))
+        return self.append(records) if records else 0
+
+    def ingest_farm(self, output_dir):
+        """Add the runs in a farm.py summary.json, skipping runs already ingested."""
+        import farm
+
+        summary_path = os.path.join(output_dir, farm.SUMMARY_NAME)
+        with open(summary_path, 'r') as f:
+            results = json.load(f)
+        existing = self.run_ids()
+        stamp = os.path.getmtime(summary_path)
+
+        records = []
+        for result in results:
+            if "gates" not in result:
+                continue
+            run_id = hashlib.sha256(f"{summary_path}\0{stamp}\0{result['arch']}\0{result['program']}".encode()).hexdigest()[:32]
+            if run_id not in existing:
+                records.append(run_record(result["program"], result["arch"], result["gates"],
+                                          cycles=result.get("cycles"), registers=result.get("registers"), source=result.get("source"),
+                                          run_id=run_id, timestamp=stamp))
+        return self.append(records) if records else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the Parquet store of simulation results")
+    parser.add_argument("--store", type=str, default=STORE_DIR, help="Store directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_csv = commands.add_parser("ingest-csv", help="Add a directory of <operation>_results.csv files")
+    ingest_csv.add_argument("directory", type=str)
+    ingest_csv.add_argument("--arch", type=str, required=True, choices=toolchain.ARCHITECTURES)
+
+    ingest_farm = commands.add_parser("ingest-farm", help="Add the runs from a farm.py output directory")
+    ingest_farm.add_argument("directory", type=str)
+
+    commands.add_parser("compact", help="Merge each partition into a single file")
+
+    show = commands.add_parser("show", help="Print stored gate counts")
+    show.add_argument("--operation", type=str, nargs='+', default=None)
+    show.add_argument("--arch", type=str, nargs='+', default=None, choices=toolchain.ARCHITECTURES)
+    show.add_argument("--latest", action="store_true", help="Only the most recent run of each operation")
+
+    args = parser.parse_args()
+    store = ResultsStore(args.store)
+
+    if args.command == "ingest-csv":
+        print(f"Added {store.ingest_csv(args.directory, args.arch)} runs to {store.path}")
+    elif args.command == "ingest-farm":
+        print(f"Added {store.ingest_farm(args.directory)} runs to {store.path}")
+    elif args.command == "compact":
+        store.compact()
+    else:
+        print(store.gate_counts(args.operation, args.arch, args.latest).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,10 @@
 @echo off
 
 REM Compile the assembly code into a hex file for binary
-python Verilog/binary/programs/compiler.py --filepath "input.asm" --output "Verilog/binary/programs/bin/program.hex"
+python Verilog/binary/programs/compiler.py --filepath "input.asm" --output "Verilog/binary/programs/bin/program.hex" --cache
 
 REM Compile the assembly code into a hex file for ternary
-python Verilog/ternary/programs/compiler.py --filepath "input.asm" --output "Verilog/ternary/programs/bin/program.hex"
+python Verilog/ternary/programs/compiler.py --filepath "input.asm" --output "Verilog/ternary/programs/bin/program.hex" --cache
 
 REM Run the batch file that runs the binary testbench
 cd /d %~dp0
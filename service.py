@@ -0,0 +1,308 @@
+"""
+Toolchain Service
+-----------------
+A long-running process that assembles, simulates and costs programs on request, so the dashboard
+backend does not have to start Python, load both assemblers and re-read CSV files for every edit.
+Each worker process loads the assemblers, simulators and cost tables once, and keeps the path of
+each compiled testbench after its first Verilog run (restart the service after editing the RTL).
+
+Requests and responses are JSON objects, one per line, over stdin/stdout or a Unix socket:
+
+{"id": 1, "method": "estimate", "params": {"source": "LI R0, 6\\n...", "trips": {"LOOP": 7}}}
+{"id": 1, "result": {"binary": {...}, "ternary": {...}}}
+
+Requests run concurrently on the worker pool, so responses may come back in a different order;
+the id of each request is copied to its response. A request that fails gets {"id": ..., "error": ...}.
+Every method takes the program text as source and arch ("binary", "ternary" or "both", the
+default), and returns a result per architecture, with any messages the tools printed:
+- assemble: words (as hex), label addresses and diagnostics (line, text and message of each
+  invalid line)
+- simulate: diagnostics, final registers, gate counts, instructions, cycles and whether the program halted,
+  from the instruction-level simulator (max_steps, 1000000 by default)
+- estimate: predicted gate counts, transistors, cycles and delay from cost_estimator.py
+  (trips, default_trips)
+- verilog: registers, gate counts and cycles from the compiled Verilog testbench (timeout)
+- ping: the worker's process id
+
+python service.py                         # JSON lines on stdin/stdout
+python service.py --socket /tmp/mvl.sock  # JSON lines on a Unix socket, one client per connection
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+
+import assembler
+import cost_estimator
+import farm
+import simulator
+import testbench_cache
+import toolchain
+
+# Instructions a simulation may run before it is stopped
+DEFAULT_MAX_STEPS = 1000000
+
+# Seconds a Verilog simulation may run
+DEFAULT_TIMEOUT = 60
+
+# Assemblers, simulators and testbench paths kept by each worker process
+_tools = {}
+
+
+def _init_worker():
+    for arch in toolchain.ARCHITECTURES:
+        parser = toolchain.new_parser(arch)
+        _tools[arch] = {
+            "parser": parser,
+            "simulator": simulator.SIMULATORS[arch](parser.instructions),
+            "testbench": None,
+        }
+        # Builds the estimator's decoding tables and the cost matrices
+        cost_estimator.estimate(arch, ["HALT"])
+
+
+def _assemble(tools, lines):
+    """(words, label addresses, diagnostics as dicts) of source lines."""
+    words = []
+    diagnostics = []
+    for item in tools["parser"].stream(lines):
+        if isinstance(item, assembler.Diagnostic):
+            diagnostics.append(item.to_dict())
+        else:
+            words.append(item[2])
+    return words, dict(tools["parser"].symbols), diagnostics
+
+
+def _method_assemble(arch, tools, lines, params):
+    words, symbols, diagnostics = _assemble(tools, lines)
+    digits = toolchain.HEX_DIGITS[arch]
+    return {"words": [f"{word:0{digits}x}" for word in words], "symbols": symbols, "diagnostics": diagnostics}
+
+
+def _method_simulate(arch, tools, lines, params):
+    words, _, diagnostics = _assemble(tools, lines)
+    machine = tools["simulator"]
+    machine.load(words)
+    result = machine.run(max_steps=params.get("max_steps", DEFAULT_MAX_STEPS))
+    return {
+        "diagnostics": diagnostics,
+        "registers": result.registers,
+        "gate_counts": result.gate_counts,
+        "instructions": result.instructions,
+        "cycles": result.cycles,
+        "halted": result.halted,
+    }
+
+
+def _method_estimate(arch, tools, lines, params):
+    estimate = cost_estimator.estimate(arch, lines, params.get("trips"), params.get("default_trips", cost_estimator.DEFAULT_TRIPS))
+    totals = estimate.totals()
+    return {
+        "gate_counts": totals["gates"],
+        "instructions": totals["hits"],
+        "cycles": totals["cycles"],
+        "transistors": totals["transistors"],
+        "delay": totals["delay"],
+        "delay_ps": totals["delay_ps"],
+        "loops": estimate.loops,
+    }
+
+
+def _method_verilog(arch, tools, lines, params):
+    if tools["testbench"] is None:
+        farm.check_tools()
+        tools["testbench"] = testbench_cache.cached_testbench(arch, {"system_tb.VERBOSE": 0})
+
+    scratch = tempfile.mkdtemp(prefix="service-")
+    try:
+        source = os.path.join(scratch, "program.asm")
+        with open(source, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        task = farm.simulation_task(source, arch, "program", tools["testbench"], os.path.join(scratch, "run"),
+                                    timeout=params.get("timeout", DEFAULT_TIMEOUT))
+        result = farm.simulate([task], processes=1)[0]
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return {key: result.get(key) for key in ("registers", "gates", "cycles", "timeout")}
+
+
+METHODS = {
+    "assemble": _method_assemble,
+    "simulate": _method_simulate,
+    "estimate": _method_estimate,
+    "verilog": _method_verilog,
+}
+
+
+def handle(request):
+    """Run one request in this process and return its response."""
+    response = {"id": request.get("id") if isinstance(request, dict) else None}
+    try:
+        if not isinstance(request, dict):
+            raise ValueError("A request must be a JSON object")
+        method = request.get("method")
+        if method == "ping":
+            response["result"] = {"pid": os.getpid()}
+            return response
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method}")
+
+        params = request.get("params") or {}
+        arch = params.get("arch", "both")
+        architectures = toolchain.ARCHITECTURES if arch == "both" else (arch,)
+        if any(name not in toolchain.ARCHITECTURES for name in architectures):
+            raise ValueError(f"Unknown architecture: {arch}")
+        lines = str(params.get("source", "")).splitlines()
+
+        result = {}
+        for name in architectures:
+            # The assemblers report invalid lines with print, which would corrupt the stdout stream
+            messages = io.StringIO()
+            try:
+                with contextlib.redirect_stdout(messages):
+                    result[name] = METHODS[method](name, _tools[name], lines, params)
+            except (ValueError, RuntimeError, OSError) as e:
+                result[name] = {"error": str(e)}
+            result[name]["messages"] = messages.getvalue().splitlines()
+        response["result"] = result
+    except Exception as e:
+        response["error"] = f"{type(e).__name__}: {e}"
+    return response
+
+
+class Service:
+    """
+    Runs requests on a pool of warm worker processes and hands each response to a callback. With
+    one process the requests run in this process, one at a time, as the tools and the stdout
+    redirection are shared by every connection.
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes or multiprocessing.cpu_count()
+        if self.processes > 1:
+            self.pool = multiprocessing.Pool(self.processes, initializer=_init_worker)
+        else:
+            self.pool = None
+            self.lock = threading.Lock()
+            _init_worker()
+
+    def submit(self, request, respond):
+        """Queue a request; respond(response) is called when it finishes, from another thread with a pool."""
+        if self.pool is None:
+            with self.lock:
+                response = handle(request)
+            respond(response)
+            return
+        request_id = request.get("id") if isinstance(request, dict) else None
+        self.pool.apply_async(handle, (request,), callback=respond,
+                              error_callback=lambda e: respond({"id": request_id, "error": str(e)}))
+
+    def close(self):
+        """Finish the queued requests and stop the workers."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+
+def _serve_lines(service, lines, write):
+    """
+    Submit each JSON line as a request, writing responses with write(text). Returns once every
+    request has been answered.
+    """
+    done = threading.Condition()
+    pending = [0]
+
+    def send(response):
+        text = json.dumps(response) + "\n"
+        with done:
+            write(text)
+
+    def respond(response):
+        send(response)
+        with done:
+            pending[0] -= 1
+            done.notify_all()
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            send({"id": None, "error": f"Invalid JSON: {e}"})
+            continue
+        with done:
+            pending[0] += 1
+        service.submit(request, respond)
+
+    with done:
+        done.wait_for(lambda: pending[0] == 0)
+
+
+def serve_stdio(service):
+    """Serve requests from stdin until it closes, answering on stdout."""
+    output = sys.stdout
+
+    def write(text):
+        output.write(text)
+        output.flush()
+
+    _serve_lines(service, sys.stdin, write)
+    service.close()
+
+
+def serve_socket(service, path):
+    """Serve requests on a Unix socket, with a thread reading each connection."""
+    if os.path.exists(path):
+        os.remove(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+
+    def connection(client):
+        with client, client.makefile('r') as reader:
+            def write(text):
+                try:
+                    client.sendall(text.encode())
+                except OSError:
+                    pass  # The client has gone
+            _serve_lines(service, reader, write)
+
+    try:
+        while True:
+            client, _ = server.accept()
+            threading.Thread(target=connection, args=(client,), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        os.remove(path)
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assemble, simulate and cost programs on request over JSON lines")
+
+    parser.add_argument("--socket", type=str, default=None, help="Listen on this Unix socket instead of stdin/stdout")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+
+    args = parser.parse_args()
+    service = Service(args.processes)
+    if args.socket is not None:
+        serve_socket(service, args.socket)
+    else:
+        serve_stdio(service)
+
+
+if __name__ == "__main__":
+    main()
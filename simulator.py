@@ -0,0 +1,659 @@
+"""
+Instruction-Level Simulator
+---------------------------
+Executes assembled programs for the binary and ternary machines directly in Python, without
+recompiling the Verilog and running vvp. Each instruction is applied to the datapath described
+in Verilog/<arch>/cpu.v and alu.v, and the run reports the same final registers and gate counts
+as testbenches/system_tb.v.
+
+Gate counts are not tallied gate by gate. Every ALU module in alu.v raises its counters a fixed
+number of times per activation, so the simulator counts executed opcodes and converts them to
+NOT/AND/OR/XOR/ANY totals at the end of the run.
+
+LOAD and STORE use the address and data paths from cpu.v, but not the timing of the control state
+machine, so the RTL side effects of holding mem_write high across several states are not modelled.
+"""
+
+import argparse
+import re
+
+import balanced_ternary
+import program_image
+import toolchain
+
+BINARY_GATES = ("NOT", "AND", "OR", "XOR")
+TERNARY_GATES = ("NOT", "AND", "OR", "XOR", "ANY")
+
+# Gates activated by one execution of each instruction (binary/alu.v, WORD_SIZE = 16)
+BINARY_GATE_COSTS = {
+    'NOT':  (16, 0, 0, 0),      # binary_not
+    'AND':  (0, 16, 0, 0),      # binary_and
+    'ANDI': (0, 16, 0, 0),
+    'OR':   (0, 0, 16, 0),      # binary_or
+    'XOR':  (0, 0, 0, 16),      # binary_xor
+    'ADD':  (0, 32, 16, 32),    # ripple_carry_adder: 16 full adders
+    'ADDI': (0, 32, 16, 32),
+    'SUB':  (16, 32, 16, 32),   # ripple_carry_subtractor: binary_not + ripple_carry_adder
+    'LT':   (32, 32, 16, 16),   # binary_less_than
+    'EQ':   (16, 16, 0, 16),    # binary_equality
+}
+
+# Gates activated by one execution of each instruction (ternary/alu.v, WORD_SIZE = 9)
+TERNARY_GATE_COSTS = {
+    'NOT':  (9, 0, 0, 0, 0),        # ternary_not
+    'AND':  (0, 9, 0, 0, 0),        # ternary_and
+    'ANDI': (0, 9, 0, 0, 0),
+    'OR':   (0, 0, 9, 0, 0),        # ternary_or
+    'XOR':  (0, 0, 0, 9, 0),        # ternary_xor
+    'ADD':  (90, 36, 72, 0, 63),    # ternary_ripple_carry_adder: 9 ternary_adder_1bit
+    'ADDI': (90, 36, 72, 0, 63),
+    'SUB':  (99, 36, 72, 0, 63),    # ternary_not + ternary_ripple_carry_adder
+    'LT':   (9, 27, 18, 9, 0),      # ternary_less_than: 9 ternary_comparator_1trit
+    'EQ':   (9, 27, 18, 9, 0),      # ternary_equality: 9 ternary_comparator_1trit
+}
+
+# Clock cycles spent in the control state machine (control.v) by each class of instruction
+ALU_OPERATIONS = ('NOT', 'AND', 'OR', 'XOR', 'ADD', 'SUB', 'COMP', 'ANDI', 'ADDI', 'LT', 'EQ')
+INSTRUCTION_CYCLES = {
+    'MV': 4, 'LUI': 4, 'LI': 4,     # FETCH, REGLOAD, REGSTORE, NEXT
+    'LOAD': 5,                      # FETCH, REGLOAD, LOAD, REGSTORE, NEXT
+    'STORE': 4,                     # FETCH, REGLOAD, STORE, NEXT
+    'BEQ': 3, 'BNE': 3,             # FETCH, REGLOAD, NEXT
+    'HALT': 3,                      # FETCH, REGLOAD, HALT
+}
+INSTRUCTION_CYCLES.update({op: 5 for op in ALU_OPERATIONS})  # FETCH, REGLOAD, ALU, REGSTORE, NEXT
+RESET_CYCLES = 1
+INVALID_CYCLES = 3  # An unknown opcode sends REGLOAD straight to HALT
+
+
+class SimulationResult:
+    """Final machine state and statistics of a simulation run."""
+
+    def __init__(self, arch, registers, raw_registers, memory, gate_counts, opcode_counts,
+                 instructions, cycles, halted, pc, address_counts=None):
+        self.arch = arch
+        self.registers = registers          # Register values as printed by system_tb.v
+        self.raw_registers = raw_registers  # Register contents as stored in the register file
+        self.memory = memory
+        self.gate_counts = gate_counts
+        self.opcode_counts = opcode_counts  # Executions per mnemonic
+        self.address_counts = address_counts or {}  # Executions per (address, mnemonic)
+        self.instructions = instructions
+        self.cycles = cycles
+        self.halted = halted
+        self.pc = pc
+
+    def report(self):
+        """Format the result the same way system_tb.v prints it at the end of a run."""
+        lines = ["Final Register Values:"]
+        for i, value in enumerate(self.registers):
+            lines.append(f"R{i}={value}")
+        counts = ", ".join(f"{gate}={count}" for gate, count in self.gate_counts.items())
+        lines.append(f"Gate counts: {counts}")
+        lines.append(f"Instructions: {self.instructions}, Cycles: {self.cycles}, Halted: {self.halted}")
+        return "\n".join(lines)
+
+    def save_memory(self, filename):
+        """Write the final memory contents as a program image memory dump."""
+        program_image.write_image(filename, self.memory, self.arch, kind="memory")
+
+    def save_counts(self, filename):
+        """Write the gate counts as a CSV file matching gate_counter_top.save_counts."""
+        with open(filename, 'w') as f:
+            f.write("Gate,Count\n")
+            for gate, count in self.gate_counts.items():
+                f.write(f"{gate},{count}\n")
+
+
+class Simulator:
+    """Common program loading and bookkeeping for both architectures."""
+
+    ARCH = None
+    GATES = ()
+    GATE_COSTS = {}
+    REG_NUM = 8
+    OPCODES = 0     # Distinct opcode values, the stride of the run loop's per-address counts
+
+    def __init__(self, instructions=None):
+        # Opcode table shared with the assembler (InstructionParser.instructions)
+        if instructions is None:
+            instructions = toolchain.new_parser(self.ARCH).instructions
+        self.instructions = instructions
+        self.mnemonics = {opcode: name for name, opcode in instructions.items()}
+        self.opcodes = {name: opcode for name, opcode in instructions.items()}
+        self.reset()
+
+    def reset(self):
+        """Clear registers, memory and statistics as the system reset does."""
+        self.registers = [0] * self.REG_NUM
+        self.memory = [0] * self.MEMORY_WORDS
+        self.decoded = [None] * self.MEMORY_WORDS
+        self.stored = set()  # Memory indexes written by STORE
+        self.opcode_counts = {}
+        self.pc_counts = {}
+        self.invalid_count = 0
+        self.instruction_total = 0
+        self.pc = self.RESET_PC
+        self.halted = False
+
+    def load_hex(self, filename):
+        """Load a program.hex file written by the assembler."""
+        with open(filename, 'r') as f:
+            self.load([int(line, 16) for line in f if line.strip()])
+
+    def load_image(self, filename):
+        """Load a packed program image written by the assembler (compiler.py --format image)."""
+        with program_image.open_image(filename) as image:
+            if image.arch != self.ARCH or image.kind != "program":
+                raise ValueError(f"{filename} is a {image.arch} {image.kind} image, not a {self.ARCH} program")
+            self.load(image.words)
+
+    def load_source(self, lines):
+        """Assemble source lines with the architecture's assembler and load the result."""
+        self.load(toolchain.assemble_lines(toolchain.new_parser(self.ARCH), lines))
+
+    def gate_counts(self):
+        """Convert opcode execution counts to per-gate totals."""
+        totals = [0] * len(self.GATES)
+        for opcode, count in self.opcode_counts.items():
+            cost = self.GATE_COSTS.get(self.mnemonics.get(opcode))
+            if cost is not None:
+                for i, gates in enumerate(cost):
+                    totals[i] += gates * count
+        return dict(zip(self.GATES, totals))
+
+    def cycles(self):
+        """Clock cycles spent executing, from the reset state to the last instruction."""
+        cycles = RESET_CYCLES + self.invalid_count * INVALID_CYCLES
+        for opcode, count in self.opcode_counts.items():
+            cycles += INSTRUCTION_CYCLES[self.mnemonics[opcode]] * count
+        return cycles
+
+    def result(self):
+        """Snapshot the machine state into a SimulationResult."""
+        return SimulationResult(
+            arch=self.ARCH,
+            registers=[self.register_value(word) for word in self.registers],
+            raw_registers=list(self.registers),
+            memory=list(self.memory),
+            gate_counts=self.gate_counts(),
+            opcode_counts={self.mnemonics[op]: n for op, n in self.opcode_counts.items()},
+            address_counts={
+                (self.address_value(pc), self.mnemonics[op]): n for (pc, op), n in self.pc_counts.items()
+            },
+            instructions=self.instruction_total,
+            cycles=self.cycles(),
+            halted=self.halted,
+            pc=self.pc,
+        )
+
+    def register_value(self, word):
+        return word
+
+    def address_value(self, pc):
+        return pc
+
+    def _count(self, counts):
+        # Merge the run loop's list, indexed by pc * OPCODES + opcode, into the running totals
+        for slot, count in enumerate(counts):
+            if count:
+                key = pc, opcode = divmod(slot, self.OPCODES)
+                self.pc_counts[key] = self.pc_counts.get(key, 0) + count
+                self.opcode_counts[opcode] = self.opcode_counts.get(opcode, 0) + count
+                self.instruction_total += count
+
+
+class BinarySimulator(Simulator):
+    """Simulator for the 16-bit binary machine in Verilog/binary."""
+
+    ARCH = "binary"
+    GATES = BINARY_GATES
+    GATE_COSTS = BINARY_GATE_COSTS
+    MEMORY_WORDS = 128      # MEM_SIZE
+    RESET_PC = 0
+    FIRST_ADDRESS = 0       # Address of the first program word
+    OPCODES = 32
+
+    def load(self, words):
+        """Place program words in memory from address 0, as program_loader.v does."""
+        if len(words) > self.MEMORY_WORDS:
+            raise ValueError(f"Program of {len(words)} words does not fit in {self.MEMORY_WORDS} words of memory")
+        self.reset()
+        for address, word in enumerate(words):
+            self.memory[address] = word & 0xFFFF
+
+    def _decode(self, address, word):
+        # {opcode, reg_dest, reg_src, small_immediate} with big_immediate = {reg_src, small_immediate}
+        opcode = (word >> 11) & 0x1F
+        return opcode, (word >> 8) & 0x7, (word >> 5) & 0x7, word & 0xFF, word & 0x1F, address * 32 + opcode
+
+    def run(self, max_steps=None):
+        """Execute until HALT, an invalid opcode or max_steps instructions; return a SimulationResult."""
+        op = self.opcodes
+        MV, NOT, AND, OR, XOR = op['MV'], op['NOT'], op['AND'], op['OR'], op['XOR']
+        ADD, SUB, COMP, ANDI, ADDI = op['ADD'], op['SUB'], op['COMP'], op['ANDI'], op['ADDI']
+        LT, EQ, LUI, LI, BEQ, BNE = op['LT'], op['EQ'], op['LUI'], op['LI'], op['BEQ'], op['BNE']
+        LOAD, STORE, HALT = op['LOAD'], op['STORE'], op['HALT']
+
+        regs = self.registers
+        memory = self.memory
+        decoded = self.decoded
+        stored = self.stored
+        size = self.MEMORY_WORDS
+        counts = [0] * (size * self.OPCODES)
+        pc = self.pc
+        steps = 0
+        limit = 0 if self.halted else -1 if max_steps is None else max_steps
+
+        while steps != limit:
+            if pc >= size:
+                # Fetching past the end of memory reads X, which control.v treats as an invalid opcode
+                self.invalid_count += 1
+                self.halted = True
+                break
+
+            entry = decoded[pc]
+            if entry is None:
+                entry = decoded[pc] = self._decode(pc, memory[pc])
+            opcode, a, b, big, small, slot = entry
+            steps += 1
+
+            if opcode == ADD:
+                regs[a] = (regs[a] + regs[b]) & 0xFFFF
+            elif opcode == ADDI:
+                regs[a] = (regs[a] + big) & 0xFFFF
+            elif opcode == MV:
+                regs[a] = regs[b]
+            elif opcode == LI:
+                regs[a] = (regs[a] & 0xFF00) | big
+            elif opcode == LUI:
+                regs[a] = big << 8
+            elif opcode == BNE:
+                counts[slot] += 1
+                pc = (pc + (1 if regs[a] & 1 else big)) & 0xFF
+                continue
+            elif opcode == BEQ:
+                counts[slot] += 1
+                pc = (pc + (big if regs[a] & 1 else 1)) & 0xFF
+                continue
+            elif opcode == EQ:
+                # binary_equality reads its result from eq_chain[WIDTH-1], so bit 15 is not compared
+                regs[a] = 0 if (regs[a] ^ regs[b]) & 0x7FFF else 1
+            elif opcode == SUB:
+                regs[a] = (regs[a] - regs[b]) & 0xFFFF
+            elif opcode == AND:
+                regs[a] = regs[a] & regs[b]
+            elif opcode == ANDI:
+                regs[a] = regs[a] & big
+            elif opcode == OR:
+                regs[a] = regs[a] | regs[b]
+            elif opcode == XOR:
+                regs[a] = regs[a] ^ regs[b]
+            elif opcode == NOT:
+                regs[a] = ~regs[a] & 0xFFFF
+            elif opcode == LT:
+                # binary_less_than chains its comparison from bit 0 upwards, so the lowest
+                # differing bit decides the result: 1 when input1 has the set bit there
+                diff = regs[a] ^ regs[b]
+                regs[a] = 1 if regs[a] & diff & -diff else 0
+            elif opcode == COMP:
+                regs[a] = 1 if regs[a] == regs[b] else 0
+            elif opcode == LOAD:
+                address = (regs[b] + small) & 0xFF
+                regs[a] = memory[address] if address < size else 0
+            elif opcode == STORE:
+                address = (regs[b] + small) & 0xFF
+                if address < size:
+                    memory[address] = regs[a]
+                    decoded[address] = None
+                    stored.add(address)
+            elif opcode == HALT:
+                counts[slot] += 1
+                self.halted = True
+                break
+            else:
+                self.invalid_count += 1
+                self.halted = True
+                break
+
+            counts[slot] += 1
+            pc = (pc + 1) & 0xFF
+
+        self.pc = pc
+        self._count(counts)
+        return self.result()
+
+
+# Ternary trits are stored in two bits: -1 = 0b11, 0 = 0b00, +1 = 0b01 (0b10 is unused)
+_1 = 0b11
+_0 = 0b00
+_1_ = 0b01
+
+TRIT_CODES = {-1: _1, 0: _0, 1: _1_}
+CODE_VALUES = {_1: -1, _0: 0, _1_: 1}
+
+
+def _trit_gate(function):
+    """4x4 table over trit codes for a two-input gate; unused codes fall to the Verilog default of _0."""
+    table = [[_0] * 4 for _ in range(4)]
+    for a, a_val in CODE_VALUES.items():
+        for b, b_val in CODE_VALUES.items():
+            table[a][b] = TRIT_CODES[function(a_val, b_val)]
+    return table
+
+
+# Single trit gates from ternary/alu.v
+NEG_TRIT = [_0, _1, _0, _1_]    # ternary_negation_1bit
+AND_TRIT = _trit_gate(min)      # ternary_and_1bit
+OR_TRIT = _trit_gate(max)       # ternary_or_1bit
+XOR_TRIT = _trit_gate(lambda a, b: -1 if a == b != 0 else max(-1, min(1, a + b)))  # ternary_xor_1bit
+ANY_TRIT = _trit_gate(lambda a, b: max(-1, min(1, a + b)))  # ternary_any_1bit
+CONS_TRIT = _trit_gate(lambda a, b: a if a == b else 0)  # ternary_consensus_1bit
+
+
+def _full_adder_trit(a, b, carry_in):
+    """ternary_adder_1bit built from its half adders, returning (sum, carry_out) codes."""
+    def addition(x, y):
+        consensus_neg = NEG_TRIT[CONS_TRIT[x][y]]
+        return ANY_TRIT[consensus_neg][ANY_TRIT[consensus_neg][ANY_TRIT[x][y]]]
+
+    sum1, carry1 = addition(b, carry_in), CONS_TRIT[b][carry_in]
+    total, carry2 = addition(a, sum1), CONS_TRIT[a][sum1]
+    return total, ANY_TRIT[carry1][carry2]
+
+
+def _chunk_table(gate):
+    """Apply a single trit gate to every pair of 3-trit (6-bit) chunks."""
+    table = [0] * 4096
+    for x in range(64):
+        for y in range(64):
+            result = 0
+            for i in range(0, 6, 2):
+                result |= gate[(x >> i) & 3][(y >> i) & 3] << i
+            table[(x << 6) | y] = result
+    return table
+
+
+def _adder_table():
+    """Ripple three full adders across a chunk: index (x << 8) | (y << 2) | carry -> (sum << 2) | carry."""
+    table = [0] * 16384
+    for x in range(64):
+        for y in range(64):
+            for carry_in in range(4):
+                carry = carry_in
+                result = 0
+                for i in range(0, 6, 2):
+                    total, carry = _full_adder_trit((x >> i) & 3, (y >> i) & 3, carry)
+                    result |= total << i
+                table[(x << 8) | (y << 2) | carry_in] = (result << 2) | carry
+    return table
+
+
+AND_CHUNK = _chunk_table(AND_TRIT)
+OR_CHUNK = _chunk_table(OR_TRIT)
+XOR_CHUNK = _chunk_table(XOR_TRIT)
+ADD_CHUNK = _adder_table()
+NEG_CHUNK = [NEG_TRIT[x & 3] | NEG_TRIT[(x >> 2) & 3] << 2 | NEG_TRIT[x >> 4] << 4 for x in range(64)]
+VALUE_CHUNK = [sum(CODE_VALUES.get((x >> 2 * i) & 3, 0) * 3 ** i for i in range(3)) for x in range(64)]
+
+
+def ternary_gate(table, a, b):
+    """Apply a chunk table across two 9-trit words."""
+    return (table[(a >> 6) & 0xFC0 | (b >> 12) & 63] << 12
+            | table[a & 0xFC0 | (b >> 6) & 63] << 6
+            | table[(a << 6) & 0xFC0 | b & 63])
+
+
+def ternary_not(a):
+    """ternary_not over a 9-trit word."""
+    return NEG_CHUNK[a >> 12 & 63] << 12 | NEG_CHUNK[a >> 6 & 63] << 6 | NEG_CHUNK[a & 63]
+
+
+def ternary_add(a, b):
+    """ternary_ripple_carry_adder over two 9-trit words (carry out of the top trit is dropped)."""
+    low = ADD_CHUNK[(a & 63) << 8 | (b & 63) << 2]
+    mid = ADD_CHUNK[(a & 0xFC0) << 2 | (b >> 4) & 0xFC | low & 3]
+    high = ADD_CHUNK[(a >> 4) & 0x3F00 | (b >> 10) & 0xFC | mid & 3]
+    return (high >> 2) << 12 | (mid >> 2) << 6 | low >> 2
+
+
+def ternary_less_than(a, b):
+    """ternary_less_than: the most significant differing trit decides, using its 2-bit codes."""
+    if a == b:
+        return 0
+    shift = ((a ^ b).bit_length() - 1) & ~1
+    trit_a, trit_b = (a >> shift) & 3, (b >> shift) & 3
+    return 1 if (trit_a == _1 and trit_b in (_0, _1_)) or (trit_a == _0 and trit_b == _1_) else 0
+
+
+def ternary_to_integer(word):
+    """Decode an 18-bit ternary word like ternary_to_integer_func in system_tb.v."""
+    return VALUE_CHUNK[word & 63] + 27 * VALUE_CHUNK[word >> 6 & 63] + 729 * VALUE_CHUNK[word >> 12 & 63]
+
+
+def integer_to_ternary(value, trits=9):
+    """Encode an integer as balanced ternary trit codes, wrapping to the given number of trits."""
+    half = (3 ** trits) // 2
+    return balanced_ternary.encode((value + half) % (3 ** trits) - half, trits)
+
+
+class TernarySimulator(Simulator):
+    """Simulator for the 9-trit ternary machine in Verilog/ternary."""
+
+    ARCH = "ternary"
+    GATES = TERNARY_GATES
+    GATE_COSTS = TERNARY_GATE_COSTS
+    MEMORY_WORDS = 64               # 2*MEM_SIZE entries, addressed by 3 trits (6 bits)
+    PROGRAM_WORDS = 27              # program_loader.v fills addresses -13 .. 13
+    RESET_PC = integer_to_ternary(-13, 3)
+    FIRST_ADDRESS = -13
+    OPCODES = 64                    # 3 trits (6 bits)
+
+    # Memory address of each program word, in load order
+    PROGRAM_ADDRESSES = [integer_to_ternary(address, 3) for address in range(-13, 14)]
+
+    def load(self, words):
+        """Place program words from address -13 upwards, as program_loader.v does."""
+        if len(words) > self.PROGRAM_WORDS:
+            raise ValueError(f"Program of {len(words)} words does not fit in {self.PROGRAM_WORDS} words of memory")
+        self.reset()
+        for address, word in zip(self.PROGRAM_ADDRESSES, words):
+            self.memory[address] = word & 0x3FFFF
+
+    def register_value(self, word):
+        return ternary_to_integer(word)
+
+    def address_value(self, pc):
+        return ternary_to_integer(pc)
+
+    def _decode(self, address, word):
+        big = word & 0xFF
+        reg_a, reg_b = (word >> 8) & 0xF, (word >> 4) & 0xF
+        # program_counter.v adds through a 9-trit adder and keeps the lowest 3 trits
+        next_pc = ternary_add(address, _1_) & 0x3F
+        target = ternary_add(address, big) & 0x3F
+        opcode = (word >> 12) & 0x3F
+        return (
+            opcode,
+            reg_a if reg_a < self.REG_NUM else self.REG_NUM,
+            reg_b if reg_b < self.REG_NUM else self.REG_NUM + 1,
+            big, next_pc, target, address * 64 + opcode,
+        )
+
+    def run(self, max_steps=None):
+        """Execute until HALT, an invalid opcode or max_steps instructions; return a SimulationResult."""
+        op = self.opcodes
+        MV, NOT, AND, OR, XOR = op['MV'], op['NOT'], op['AND'], op['OR'], op['XOR']
+        ADD, SUB, COMP, ANDI, ADDI = op['ADD'], op['SUB'], op['COMP'], op['ANDI'], op['ADDI']
+        LT, EQ, LUI, LI, BEQ, BNE = op['LT'], op['EQ'], op['LUI'], op['LI'], op['BEQ'], op['BNE']
+        LOAD, STORE, HALT = op['LOAD'], op['STORE'], op['HALT']
+
+        # Two spare slots stand in for register numbers beyond REG_NUM: writes land in the
+        # first and are dropped, reads of a missing source register see the second (always 0)
+        regs = self.registers + [0, 0]
+        memory = self.memory
+        decoded = self.decoded
+        stored = self.stored
+        counts = [0] * (self.MEMORY_WORDS * self.OPCODES)
+        pc = self.pc
+        steps = 0
+        limit = 0 if self.halted else -1 if max_steps is None else max_steps
+
+        while steps != limit:
+            entry = decoded[pc]
+            if entry is None:
+                entry = decoded[pc] = self._decode(pc, memory[pc])
+            opcode, a, b, big, next_pc, target, slot = entry
+            steps += 1
+
+            if opcode == ADD:
+                regs[a] = ternary_add(regs[a], regs[b])
+            elif opcode == ADDI:
+                regs[a] = ternary_add(regs[a], big)
+            elif opcode == MV:
+                regs[a] = regs[b]
+            elif opcode == LI:
+                regs[a] = (regs[a] & 0x3FF00) | big
+            elif opcode == LUI:
+                regs[a] = big << 8
+            elif opcode == BNE:
+                # Branches when the whole register is zero
+                counts[slot] += 1
+                pc = target if regs[a] == 0 else next_pc
+                continue
+            elif opcode == BEQ:
+                # Branches when the lowest trit of the register is -1
+                counts[slot] += 1
+                pc = target if regs[a] & 3 == _1 else next_pc
+                continue
+            elif opcode == EQ:
+                regs[a] = 1 if regs[a] == regs[b] else 0
+            elif opcode == LT:
+                regs[a] = ternary_less_than(regs[a], regs[b])
+            elif opcode == SUB:
+                regs[a] = ternary_add(regs[a], ternary_not(regs[b]))
+            elif opcode == AND:
+                regs[a] = ternary_gate(AND_CHUNK, regs[a], regs[b])
+            elif opcode == ANDI:
+                regs[a] = ternary_gate(AND_CHUNK, regs[a], big)
+            elif opcode == OR:
+                regs[a] = ternary_gate(OR_CHUNK, regs[a], regs[b])
+            elif opcode == XOR:
+                regs[a] = ternary_gate(XOR_CHUNK, regs[a], regs[b])
+            elif opcode == NOT:
+                regs[a] = ternary_not(regs[a])
+            elif opcode == COMP:
+                pass  # Not implemented in ternary_alu, which passes input1 through
+            elif opcode == LOAD:
+                # The ternary memory interface addresses memory with reg_out1
+                regs[a] = memory[regs[a] & 0x3F]
+            elif opcode == STORE:
+                address = regs[a] & 0x3F
+                memory[address] = regs[a]
+                decoded[address] = None
+                stored.add(address)
+            elif opcode == HALT:
+                counts[slot] += 1
+                self.halted = True
+                break
+            else:
+                self.invalid_count += 1
+                self.halted = True
+                break
+
+            counts[slot] += 1
+            pc = next_pc
+
+        self.registers[:] = regs[:self.REG_NUM]
+        self.pc = pc
+        self._count(counts)
+        return self.result()
+
+
+SIMULATORS = {
+    "binary": BinarySimulator,
+    "ternary": TernarySimulator,
+}
+
+
+def parse_testbench_log(text):
+    """
+    Extract the final registers and gate counts from the output of vvp testbenches/main.vvp,
+    so a Verilog run can be compared against a simulator run.
+    """
+    registers = {}
+    final = text.split("Final Register Values:")[-1]
+    for match in re.finditer(r"^R(\d+)=\s*(-?\d+)", final, re.MULTILINE):
+        registers[int(match.group(1))] = int(match.group(2))
+
+    gate_counts = {}
+    match = re.search(r"Gate counts: (.*)", text)
+    if match:
+        for gate, count in re.findall(r"(\w+)=(\d+)", match.group(1)):
+            gate_counts[gate] = int(count)
+
+    return [registers[i] for i in sorted(registers)], gate_counts
+
+
+def compare_with_testbench(result, text):
+    """Return a list of differences between a SimulationResult and a Verilog testbench log."""
+    registers, gate_counts = parse_testbench_log(text)
+    differences = []
+    for i, (expected, actual) in enumerate(zip(registers, result.registers)):
+        if expected != actual:
+            differences.append(f"R{i}: verilog={expected} simulator={actual}")
+    for gate, expected in gate_counts.items():
+        actual = result.gate_counts.get(gate)
+        if expected != actual:
+            differences.append(f"{gate}: verilog={expected} simulator={actual}")
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Instruction-level simulator for the binary and ternary machines")
+
+    parser.add_argument("--arch", type=str, default="both", choices=["binary", "ternary", "both"], help="Architecture to simulate")
+    parser.add_argument("--filepath", type=str, default="input.asm", help="Input assembly filepath")
+    parser.add_argument("--hex", type=str, default=None, help="Run an assembled program.hex instead of assembling --filepath")
+    parser.add_argument("--image", type=str, default=None, help="Run a program image instead of assembling --filepath ({arch} is replaced)")
+    parser.add_argument("--max-steps", type=int, default=None, help="Stop after this many instructions")
+    parser.add_argument("--counts", type=str, default=None, help="Write gate counts CSV to this path ({arch} is replaced)")
+    parser.add_argument("--memory-dump", type=str, default=None, help="Write final memory as a program image ({arch} is replaced)")
+    parser.add_argument("--verilog-log", type=str, default=None, help="Compare against a saved vvp output log ({arch} is replaced)")
+
+    args = parser.parse_args()
+    architectures = toolchain.ARCHITECTURES if args.arch == "both" else (args.arch,)
+
+    for arch in architectures:
+        simulator = SIMULATORS[arch]()
+        if args.hex is not None:
+            simulator.load_hex(args.hex)
+        elif args.image is not None:
+            simulator.load_image(args.image.format(arch=arch))
+        else:
+            with open(args.filepath, 'r') as f:
+                simulator.load_source(f)
+
+        result = simulator.run(max_steps=args.max_steps)
+        print(f"\n[{arch}]")
+        print(result.report())
+
+        if args.counts is not None:
+            result.save_counts(args.counts.format(arch=arch))
+
+        if args.memory_dump is not None:
+            result.save_memory(args.memory_dump.format(arch=arch))
+
+        if args.verilog_log is not None:
+            with open(args.verilog_log.format(arch=arch), 'r') as f:
+                differences = compare_with_testbench(result, f.read())
+            if differences:
+                print("Differences from Verilog:")
+                for difference in differences:
+                    print(f"  {difference}")
+            else:
+                print("Matches Verilog output")
+
+
+if __name__ == "__main__":
+    main()
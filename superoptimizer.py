@@ -0,0 +1,413 @@
+"""
+Superoptimizer
+--------------
+Searches for the cheapest instruction sequence that computes the same registers as a short basic
+block, separately for each architecture, to separate the cost of the ternary ISA from the cost of
+unoptimised code. Blocks come from the assembled program, split at branches as in
+cost_estimator.py, and only their register instructions (the ALU operations, MV, LI and LUI) are
+optimised; LOAD, STORE, branches and HALT end a block.
+
+Candidates are costed per execution with the gate-count model: transistors switched (cost_model
+instruction_matrix, CMOS for binary and CNFET for ternary), then clock cycles. The search
+enumerates sequences of up to max_length instructions, cheapest first, over the registers the
+block names (plus any scratch registers) and the sums of the immediates it uses, and 0 and 1.
+A sequence is abandoned as soon as it costs as much as the best one found.
+
+Equivalence is checked by evaluation. Each candidate runs on a few random register files and is
+compared with the block on the live-out registers (all registers by default); candidates that
+agree are then checked against every value of the block's input registers when there are at most
+EXHAUSTIVE_CASES combinations, or against TEST_CASES random register files otherwise. Candidates
+are evaluated with per-opcode functions that mirror simulator.run, so the winner is confirmed on
+the instruction-level simulator itself before it is reported. The search is split by the first
+instruction of the sequence over a process pool.
+
+python superoptimizer.py --filepath multiplication.asm
+python superoptimizer.py --filepath block.asm --live-out R2 R3 --scratch 1 --max-length 3
+"""
+
+import argparse
+import itertools
+import multiprocessing
+import random
+
+import assembler
+import cost_estimator
+import cost_model
+import program_generator
+import simulator
+import toolchain
+
+# Instructions a block may contain and candidates are built from, with their operand format
+SEARCH_FORMATS = program_generator.MIX_FORMATS
+
+# Longest sequence searched by default
+DEFAULT_LENGTH = 2
+
+# Random register files every candidate is first run on
+FILTER_CASES = 8
+
+# Register files a candidate that passes the filter is checked on
+EXHAUSTIVE_CASES = 1 << 16
+TEST_CASES = 4096
+
+# Register files the best candidate is confirmed on with the simulator
+SIMULATOR_CASES = 64
+
+
+def _binary_lt(a, b, imm):
+    diff = a ^ b
+    return 1 if a & diff & -diff else 0
+
+
+# New destination register value of each instruction, from (destination, source, immediate field)
+OPERATIONS = {
+    "binary": {
+        "MV": lambda a, b, imm: b,
+        "NOT": lambda a, b, imm: ~a & 0xFFFF,
+        "AND": lambda a, b, imm: a & b,
+        "OR": lambda a, b, imm: a | b,
+        "XOR": lambda a, b, imm: a ^ b,
+        "ADD": lambda a, b, imm: (a + b) & 0xFFFF,
+        "SUB": lambda a, b, imm: (a - b) & 0xFFFF,
+        "COMP": lambda a, b, imm: 1 if a == b else 0,
+        "LT": _binary_lt,
+        "EQ": lambda a, b, imm: 0 if (a ^ b) & 0x7FFF else 1,
+        "ANDI": lambda a, b, imm: a & imm,
+        "ADDI": lambda a, b, imm: (a + imm) & 0xFFFF,
+        "LUI": lambda a, b, imm: imm << 8,
+        "LI": lambda a, b, imm: (a & 0xFF00) | imm,
+    },
+    "ternary": {
+        "MV": lambda a, b, imm: b,
+        "NOT": lambda a, b, imm: simulator.ternary_not(a),
+        "AND": lambda a, b, imm: simulator.ternary_gate(simulator.AND_CHUNK, a, b),
+        "OR": lambda a, b, imm: simulator.ternary_gate(simulator.OR_CHUNK, a, b),
+        "XOR": lambda a, b, imm: simulator.ternary_gate(simulator.XOR_CHUNK, a, b),
+        "ADD": lambda a, b, imm: simulator.ternary_add(a, b),
+        "SUB": lambda a, b, imm: simulator.ternary_add(a, simulator.ternary_not(b)),
+        "COMP": lambda a, b, imm: a,
+        "LT": lambda a, b, imm: simulator.ternary_less_than(a, b),
+        "EQ": lambda a, b, imm: 1 if a == b else 0,
+        "ANDI": lambda a, b, imm: simulator.ternary_gate(simulator.AND_CHUNK, a, imm),
+        "ADDI": lambda a, b, imm: simulator.ternary_add(a, imm),
+        "LUI": lambda a, b, imm: imm << 8,
+        "LI": lambda a, b, imm: (a & 0x3FF00) | imm,
+    },
+}
+
+
+def instruction_costs(arch):
+    """Mnemonic -> (transistors, cycles) of one execution of each instruction."""
+    transistors = dict(zip(cost_model.INSTRUCTIONS[arch], cost_model.instruction_matrix(arch)[:, 0].astype(int).tolist()))
+    return {mnemonic: (transistors.get(mnemonic, 0), simulator.INSTRUCTION_CYCLES[mnemonic]) for mnemonic in SEARCH_FORMATS}
+
+
+def sequence_cost(costs, sequence):
+    """(transistors, cycles) of a sequence of token lists."""
+    transistors = cycles = 0
+    for tokens in sequence:
+        t, c = costs[tokens[0].upper()]
+        transistors += t
+        cycles += c
+    return transistors, cycles
+
+
+def register_number(text):
+    return int(text.strip()[1:])
+
+
+def live_in(block):
+    """Registers the block reads before writing them."""
+    written = set()
+    read = set()
+    for tokens in block:
+        mnemonic = tokens[0].upper()
+        dest = register_number(tokens[1])
+        sources = [] if mnemonic in ("MV", "LUI") else [dest]
+        if SEARCH_FORMATS[mnemonic] == "R" and mnemonic != "NOT":
+            sources.append(register_number(tokens[2]))
+        read.update(reg for reg in sources if reg not in written)
+        written.add(dest)
+    return sorted(read)
+
+
+def random_registers(arch, rng, count=simulator.Simulator.REG_NUM):
+    """A register file of random words, as stored by the machine."""
+    if arch == "binary":
+        return [rng.randrange(1 << 16) for _ in range(count)]
+    high = (3 ** 9 - 1) // 2
+    return [simulator.integer_to_ternary(rng.randint(-high, high)) for _ in range(count)]
+
+
+def all_words(arch):
+    """Every word a register can hold."""
+    if arch == "binary":
+        return range(1 << 16)
+    high = (3 ** 9 - 1) // 2
+    return [simulator.integer_to_ternary(value) for value in range(-high, high + 1)]
+
+
+class Search:
+    """The search for one block on one architecture: candidate instructions, test register files and the block's results."""
+
+    def __init__(self, arch, block, live_out=None, scratch=0, max_length=DEFAULT_LENGTH, seed=0):
+        self.arch = arch
+        self.block = [list(tokens) for tokens in block]
+        self.max_length = max_length
+        self.parser = toolchain.new_parser(arch)
+        self.operations = OPERATIONS[arch]
+        self.costs = instruction_costs(arch)
+        self.live_out = list(range(simulator.Simulator.REG_NUM)) if live_out is None else sorted(live_out)
+        self.cost = sequence_cost(self.costs, self.block)
+
+        # Registers and immediates the candidates are built from
+        registers = sorted({register_number(tokens[1]) for tokens in block}
+                           | {register_number(tokens[2]) for tokens in block if SEARCH_FORMATS[tokens[0].upper()] == "R"})
+        spare = [reg for reg in range(simulator.Simulator.REG_NUM) if reg not in registers]
+        registers = sorted(registers + spare[:scratch])
+        immediates = [int(tokens[2], 16) if tokens[2].startswith("0x") else int(tokens[2])
+                      for tokens in block if SEARCH_FORMATS[tokens[0].upper()] == "I"]
+        low = max(toolchain.instruction_layout(name)["big_immediate"][0] for name in toolchain.ARCHITECTURES)
+        high = min(toolchain.instruction_layout(name)["big_immediate"][1] for name in toolchain.ARCHITECTURES)
+        values = {0, 1}
+        for immediate in immediates:
+            values |= {value + immediate for value in values}
+        values = sorted(value for value in values if low <= value <= high)
+
+        candidates = []
+        for mnemonic, form in SEARCH_FORMATS.items():
+            for dest in registers:
+                for operand in (registers if form == "R" else values):
+                    candidates.append([mnemonic, f"R{dest}", f"R{operand}" if form == "R" else str(operand)])
+        # Cheapest first, so a search can stop at the first candidate that is too expensive
+        candidates.sort(key=lambda tokens: self.costs[tokens[0]])
+        self.candidates = candidates
+        self.steps = [self.step(tokens) for tokens in candidates]
+
+        # Filter register files and the block's results on them
+        rng = random.Random(f"{seed}:{arch}")
+        self.filter = [random_registers(arch, rng) for _ in range(FILTER_CASES)]
+        self.filter_expected = [self.outputs(self.run(self.block_steps(), registers)) for registers in self.filter]
+        self.rng = rng
+        self.cases = self.expected = None
+
+    def step(self, tokens):
+        """(operation, destination, source, immediate field) of an instruction."""
+        word = self.parser.encode(tokens)
+        layout = self.parser.layout
+        immediate = word & ((1 << toolchain.DIGIT_BITS[self.arch] * layout["big_digits"]) - 1)
+        source = register_number(tokens[2]) if SEARCH_FORMATS[tokens[0].upper()] == "R" else 0
+        return self.operations[tokens[0].upper()], register_number(tokens[1]), source, immediate
+
+    def block_steps(self):
+        return [self.step(tokens) for tokens in self.block]
+
+    @staticmethod
+    def run(steps, registers):
+        registers = list(registers)
+        for operation, dest, source, immediate in steps:
+            registers[dest] = operation(registers[dest], registers[source], immediate)
+        return registers
+
+    def outputs(self, registers):
+        return [registers[reg] for reg in self.live_out]
+
+    def test_cases(self):
+        """
+        Register files for the full check: every value of the block's inputs (with the other
+        registers random) if there are few enough, and TEST_CASES random ones.
+        """
+        cases = [random_registers(self.arch, self.rng) for _ in range(TEST_CASES)]
+        inputs = live_in(self.block)
+        words = all_words(self.arch)
+        if len(words) ** len(inputs) <= EXHAUSTIVE_CASES:
+            for values in itertools.product(words, repeat=len(inputs)):
+                registers = random_registers(self.arch, self.rng)
+                for reg, value in zip(inputs, values):
+                    registers[reg] = value
+                cases.append(registers)
+        return cases
+
+    def equivalent(self, steps):
+        """Whether a candidate's steps leave the live-out registers as the block does on every test case."""
+        if self.cases is None:
+            block = self.block_steps()
+            self.cases = self.test_cases()
+            self.expected = [self.outputs(self.run(block, registers)) for registers in self.cases]
+        return all(self.outputs(self.run(steps, registers)) == expected
+                   for registers, expected in zip(self.cases, self.expected))
+
+    def search_from(self, first):
+        """
+        Cheapest sequence starting with candidate first that is cheaper than the block, as
+        ((transistors, cycles), [candidate indexes]), or None.
+        """
+        best = [self.cost, None]
+
+        def extend(sequence, cost, states):
+            for index, (operation, dest, source, immediate) in enumerate(self.steps):
+                t, c = self.costs[self.candidates[index][0]]
+                total = (cost[0] + t, cost[1] + c)
+                if total >= best[0]:
+                    break  # Candidates are sorted by cost, so the rest cost as much or more
+                after = []
+                for registers in states:
+                    registers = list(registers)
+                    registers[dest] = operation(registers[dest], registers[source], immediate)
+                    after.append(registers)
+                found = sequence + [index]
+                if [self.outputs(registers) for registers in after] == self.filter_expected:
+                    if self.equivalent([self.steps[i] for i in found]):
+                        best[:] = [total, found]
+                        continue
+                if len(found) < self.max_length:
+                    extend(found, total, after)
+
+        cost = self.costs[self.candidates[first][0]]
+        if cost >= self.cost:
+            return None
+        states = [self.run([self.steps[first]], registers) for registers in self.filter]
+        if [self.outputs(registers) for registers in states] == self.filter_expected and self.equivalent([self.steps[first]]):
+            return cost, [first]
+        if self.max_length > 1:
+            extend([first], cost, states)
+        return None if best[1] is None else tuple(best)
+
+    def confirm(self, sequence):
+        """Check a sequence against the block on the instruction-level simulator."""
+        machine = simulator.SIMULATORS[self.arch](self.parser.instructions)
+        halt = [self.parser.encode(["HALT"])]
+        block = [self.parser.encode(tokens) for tokens in self.block] + halt
+        candidate = [self.parser.encode(tokens) for tokens in sequence] + halt
+        rng = random.Random(f"confirm:{self.arch}")
+        for _ in range(SIMULATOR_CASES):
+            registers = random_registers(self.arch, rng)
+            results = []
+            for words in (block, candidate):
+                machine.load(words)
+                machine.registers[:] = registers
+                results.append(self.outputs(machine.run(max_steps=len(words)).raw_registers))
+            if results[0] != results[1]:
+                return False
+        return True
+
+
+# Search kept by each worker process
+_search = None
+
+
+def _init_worker(arch, block, live_out, scratch, max_length, seed):
+    global _search
+    _search = Search(arch, block, live_out, scratch, max_length, seed)
+
+
+def _search_from(first):
+    return _search.search_from(first)
+
+
+def optimize(arch, block, live_out=None, scratch=0, max_length=DEFAULT_LENGTH, seed=0, processes=None):
+    """
+    Cheapest sequence equivalent to a block (a list of token lists) on an architecture. Returns
+    a dict with the block's cost, the best sequence found (the block itself if nothing cheaper
+    is), its cost and whether the simulator confirmed it.
+    """
+    arguments = (arch, block, live_out, scratch, max_length, seed)
+    _init_worker(*arguments)
+    search = _search
+    tasks = [index for index, tokens in enumerate(search.candidates) if search.costs[tokens[0]] < search.cost]
+
+    processes = min(processes or multiprocessing.cpu_count(), max(len(tasks), 1))
+    if processes > 1:
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=arguments) as pool:
+            found = pool.map(_search_from, tasks, chunksize=max(1, len(tasks) // (4 * processes)))
+    else:
+        found = list(map(_search_from, tasks))
+
+    result = {"arch": arch, "block": search.block, "cost": search.cost,
+              "sequence": search.block, "sequence_cost": search.cost, "confirmed": True}
+    for cost, indexes in sorted(entry for entry in found if entry is not None):
+        sequence = [search.candidates[index] for index in indexes]
+        if search.confirm(sequence):
+            result.update(sequence=sequence, sequence_cost=cost)
+            break
+        result["confirmed"] = False  # The per-opcode functions disagree with the simulator
+    return result
+
+
+def basic_blocks(source):
+    """
+    Register-only basic blocks of a program as (first source line, [token lists]). Blocks are
+    cut from the binary assembly, whose instructions are the same for both machines.
+    """
+    source = list(source)
+    line_numbers = []
+    parser = toolchain.new_parser("binary")
+    words, _ = assembler.assemble(parser, source, line_numbers)
+    graph = cost_estimator.ControlFlowGraph(cost_estimator.decode_program("binary", words))
+
+    blocks = []
+    for start, end in graph.blocks:
+        run = []
+        for index in range(start, end + 1):
+            tokens = assembler.split_line(source[line_numbers[index] - 1])[1]
+            if tokens[0].upper() in SEARCH_FORMATS:
+                run.append((line_numbers[index], tokens))
+                continue
+            if run:
+                blocks.append((run[0][0], [tokens for _, tokens in run]))
+            run = []
+        if run:
+            blocks.append((run[0][0], [tokens for _, tokens in run]))
+    return blocks
+
+
+def _text(sequence):
+    return "; ".join(f"{tokens[0]} {', '.join(tokens[1:])}" for tokens in sequence) or "(nothing)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search for cheaper equivalent instruction sequences per architecture")
+
+    parser.add_argument("--arch", type=str, default="both", choices=["binary", "ternary", "both"], help="Architecture to optimise for")
+    parser.add_argument("--filepath", type=str, default="input.asm", help="Input assembly filepath")
+    parser.add_argument("--line", type=int, default=None, help="Only optimise the block starting at this source line")
+    parser.add_argument("--live-out", type=str, nargs='+', default=None, help="Registers whose values must be kept (default: all)")
+    parser.add_argument("--scratch", type=int, default=0, help="Unused registers the search may also write")
+    parser.add_argument("--max-length", type=int, default=DEFAULT_LENGTH, help="Longest sequence to search")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random register files")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+
+    args = parser.parse_args()
+    architectures = toolchain.ARCHITECTURES if args.arch == "both" else (args.arch,)
+    live_out = None if args.live_out is None else [register_number(reg) for reg in args.live_out]
+
+    with open(args.filepath, 'r') as f:
+        blocks = basic_blocks(f.readlines())
+    if args.line is not None:
+        blocks = [block for block in blocks if block[0] == args.line]
+
+    totals = {arch: [0, 0] for arch in architectures}
+    for line, block in blocks:
+        print(f"\nBlock at line {line}: {_text(block)}")
+        for arch in architectures:
+            result = optimize(arch, block, live_out, args.scratch, args.max_length, args.seed, args.processes)
+            before, after = result["cost"], result["sequence_cost"]
+            totals[arch][0] += before[0]
+            totals[arch][1] += after[0]
+            note = "" if result["confirmed"] else " (a cheaper candidate failed on the simulator)"
+            if after < before:
+                print(f"  {arch}: {before[0]} -> {after[0]} transistors, {before[1]} -> {after[1]} cycles: "
+                      f"{_text(result['sequence'])}{note}")
+            else:
+                print(f"  {arch}: {before[0]} transistors, {before[1]} cycles, no cheaper sequence{note}")
+
+    print()
+    for arch, (before, after) in totals.items():
+        print(f"{arch}: {before} transistors per pass through the blocks, {after} optimised")
+    if len(totals) == 2 and totals["binary"][0]:
+        print(f"ternary/binary as written: {totals['ternary'][0] / totals['binary'][0]:.2f}")
+    if len(totals) == 2 and totals["binary"][1]:
+        print(f"ternary/binary optimised: {totals['ternary'][1] / totals['binary'][1]:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Design-Space Sweep
+------------------
+Runs a corpus of programs on variants of the binary and ternary machines over a grid of word
+sizes, register counts and memory sizes, so the architectures can be compared across their
+design space instead of at the single point fixed in each parameters.vh.
+
+For each configuration:
+- toolchain.derive_parameters() sizes the instruction fields to the word (register addresses
+  for the register count, the small immediate taking the rest of the word)
+- the variant's parameters.vh is compiled through the testbench cache (testbench_cache.py), in
+  parallel, and reused by later sweeps
+- the programs are assembled with the field positions and operand ranges of the same parameters
+  and simulated on one process pool with the farm (farm.py)
+
+Gate counts are costed with cost_model.py. With --baseline, the unmodified machine of another
+architecture is run as well and every configuration is compared with it over the programs both
+completed, which answers questions such as which ternary word size beats the 16-bit binary machine:
+
+python sweep.py Verilog/ternary/programs --arch ternary --word-size 6 9 12 15 --baseline binary
+
+Results go to <output>/sweep.csv (one row per configuration and program) and
+<output>/configurations.csv (totals per configuration), which is also printed.
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+import batch_assembler
+import cost_model
+import farm
+import testbench_cache
+import toolchain
+
+RUNS_NAME = "sweep.csv"
+CONFIGURATIONS_NAME = "configurations.csv"
+
+# Swept parameters, in the order they are reported
+AXES = ("WORD_SIZE", "REG_NUM", "MEM_SIZE", "MEM_ADDR_SIZE")
+
+
+def configurations(arch, word_sizes=None, reg_nums=None, mem_sizes=None, mem_addr_sizes=None):
+    """
+    The grid of configurations of an architecture, as (parameters, error) pairs. Axes left as
+    None keep the value in parameters.vh. error is a message for configurations that cannot be
+    built, whose parameters are then only the requested values.
+    """
+    base = toolchain.read_parameters(arch)
+    grid = []
+    for word_size, reg_num, mem_size, mem_addr_size in itertools.product(
+            word_sizes or [None], reg_nums or [None], mem_sizes or [None], mem_addr_sizes or [None]):
+        try:
+            parameters = toolchain.derive_parameters(arch, word_size, reg_num, mem_size, mem_addr_size, base)
+        except ValueError as e:
+            requested = dict(zip(AXES, (word_size, reg_num, mem_size, mem_addr_size)))
+            grid.append(({name: value for name, value in requested.items() if value is not None}, str(e)))
+            continue
+        if all(parameters != existing for existing, _ in grid):
+            grid.append((parameters, None))
+    return grid
+
+
+def label(arch, parameters):
+    """Short name of a configuration, e.g. 'ternary W=12 R=8 M=32'."""
+    names = {"WORD_SIZE": "W", "REG_NUM": "R", "MEM_SIZE": "M", "MEM_ADDR_SIZE": "A"}
+    return " ".join([arch] + [f"{names[axis]}={parameters[axis]}" for axis in AXES if axis in parameters])
+
+
+def build_testbenches(configs, processes=None):
+    """
+    Compile the testbench of every buildable configuration, several at once. configs are
+    (arch, parameters, error) triples; returns a list of (vvp path, error) in the same order.
+    """
+    per_arch = {}
+    for arch, _, error in configs:
+        per_arch[arch] = per_arch.get(arch, 0) + (error is None)
+
+    def build(config):
+        arch, parameters, error = config
+        if error is not None:
+            return None, error
+        # The machine in parameters.vh shares its build with farm.py and main.bat
+        machine_parameters = None if parameters == toolchain.read_parameters(arch) else parameters
+        try:
+            vvp_file = testbench_cache.cached_testbench(arch, {"system_tb.VERBOSE": 0}, machine_parameters=machine_parameters,
+                                                        max_builds=testbench_cache.MAX_BUILDS + per_arch[arch])
+        except RuntimeError as e:
+            return None, str(e)
+        return vvp_file, None
+
+    # iverilog runs as a subprocess, so threads are enough to keep several builds going
+    with concurrent.futures.ThreadPoolExecutor(processes or multiprocessing.cpu_count()) as pool:
+        return list(pool.map(build, configs))
+
+
+def run_sweep(sources, output_dir, grids, processes=None, base_dir=None, scratch_dir=None, timeout=600, baseline=None):
+    """
+    Simulate every source file on every configuration. grids maps architectures to the
+    configurations() to run, and baseline optionally names one of them as (arch, parameters) to
+    compare() the others with. Writes sweep.csv and configurations.csv to output_dir and returns
+    (runs, totals), one row per configuration and program and one per configuration.
+    """
+    farm.check_tools()
+    configs = [(arch, parameters, error) for arch, grid in grids.items() for parameters, error in grid]
+    builds = build_testbenches(configs, processes)
+
+    scratch_root = tempfile.mkdtemp(prefix="sweep-", dir=scratch_dir)
+    try:
+        tasks = []
+        owners = []  # Configuration index of each task
+        for index, ((arch, parameters, _), (vvp_file, error)) in enumerate(zip(configs, builds)):
+            if error is not None:
+                continue
+            for source in sources:
+                run_dir = os.path.join(scratch_root, "runs", f"{len(tasks):05d}")
+                tasks.append(farm.simulation_task(source, arch, farm.program_name(source, base_dir), vvp_file, run_dir,
+                                                  timeout=timeout, parameters=parameters))
+                owners.append(index)
+        results = farm.simulate(tasks, processes)
+    finally:
+        shutil.rmtree(scratch_root, ignore_errors=True)
+
+    runs = []
+    for (arch, parameters, _), (_, error) in zip(configs, builds):
+        if error is not None:
+            runs.append(_run_row(arch, parameters, {"program": "", "error": error}))
+    for index, result in zip(owners, results):
+        arch, parameters, _ = configs[index]
+        runs.append(_run_row(arch, parameters, result))
+
+    totals = [_totals(arch, parameters, error, [run for run in runs if run["configuration"] == label(arch, parameters)])
+              for (arch, parameters, _), (_, error) in zip(configs, builds)]
+    if baseline is not None:
+        compare(totals, next(entry for entry in totals if entry["configuration"] == label(*baseline)))
+    write_results(runs, totals, output_dir)
+    return runs, totals
+
+
+def _run_row(arch, parameters, result):
+    row = {"configuration": label(arch, parameters), "arch": arch}
+    row.update({axis: parameters.get(axis) for axis in AXES})
+    row["program"] = result["program"]
+
+    if "error" in result:
+        row["status"] = f"error: {result['error']}"
+        return row
+    row["status"] = "timeout" if result["timeout"] else "ok"
+    row["cycles"] = result.get("cycles")
+
+    gates = result["gates"]
+    row.update({gate: gates.get(gate, 0) for gate in cost_model.GATES})
+    row["gates"] = sum(gates.values())
+    row["transistors"], row["energy"], row["delay"] = (
+        float(value) for value in cost_model.gate_costs([gates.get(gate, 0) for gate in cost_model.GATES], arch))
+    return row
+
+
+def _totals(arch, parameters, error, runs):
+    completed = [run for run in runs if run.get("status") == "ok"]
+    totals = {"configuration": label(arch, parameters), "arch": arch}
+    totals.update({axis: parameters.get(axis) for axis in AXES})
+    totals.update({
+        "programs": len(completed),
+        "failed": len(runs) - len(completed),
+        "error": error,
+        "gates": sum(run["gates"] for run in completed),
+        "transistors": sum(run["transistors"] for run in completed),
+        "cycles": sum(run["cycles"] or 0 for run in completed),
+        "completed": {run["program"] for run in completed},
+        "runs": {run["program"]: run for run in completed},
+    })
+    return totals
+
+
+def compare(totals, baseline):
+    """
+    Transistor and cycle ratios of each configuration to a baseline configuration, over the
+    programs both completed (below 1 is better than the baseline). Adds transistor_ratio and
+    cycle_ratio to each entry of totals.
+    """
+    for entry in totals:
+        common = entry["completed"] & baseline["completed"]
+        entry["compared"] = len(common)
+        entry["transistor_ratio"] = entry["cycle_ratio"] = None
+        if not common:
+            continue
+        ours = [entry["runs"][program] for program in common]
+        theirs = [baseline["runs"][program] for program in common]
+        base_transistors = sum(run["transistors"] for run in theirs)
+        base_cycles = sum(run["cycles"] or 0 for run in theirs)
+        if base_transistors:
+            entry["transistor_ratio"] = sum(run["transistors"] for run in ours) / base_transistors
+        if base_cycles:
+            entry["cycle_ratio"] = sum(run["cycles"] or 0 for run in ours) / base_cycles
+
+
+RUN_COLUMNS = ["configuration", "arch", *AXES, "program", "status", "cycles", *cost_model.GATES, "gates",
+               "transistors", "energy", "delay"]
+TOTAL_COLUMNS = ["configuration", "arch", *AXES, "programs", "failed", "gates", "transistors", "cycles",
+                 "compared", "transistor_ratio", "cycle_ratio", "error"]
+
+
+def write_results(runs, totals, output_dir):
+    """Write sweep.csv and configurations.csv."""
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, RUNS_NAME), 'w', newline='') as f:
+        writer = csv.DictWriter(f, RUN_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(runs)
+    with open(os.path.join(output_dir, CONFIGURATIONS_NAME), 'w', newline='') as f:
+        writer = csv.DictWriter(f, TOTAL_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(totals)
+
+
+def format_table(totals):
+    """The per-configuration totals as a text table, cheapest first."""
+    lines = [f"{'Configuration':<34} {'Programs':>8} {'Failed':>6} {'Gates':>10} {'Transistors':>12} {'Cycles':>8}"
+             f" {'vs baseline':>18}"]
+    ranked = sorted(totals, key=lambda entry: (entry["error"] is not None, -entry["programs"], entry["transistors"]))
+    for entry in ranked:
+        if entry["error"] is not None:
+            lines.append(f"{entry['configuration']:<34} {entry['error']}")
+            continue
+        versus = ""
+        if entry.get("transistor_ratio") is not None:
+            cycles = "-" if entry["cycle_ratio"] is None else f"{entry['cycle_ratio']:.2f}"
+            versus = f"{entry['transistor_ratio']:.2f}T {cycles}C ({entry['compared']})"
+        lines.append(f"{entry['configuration']:<34} {entry['programs']:>8} {entry['failed']:>6} {entry['gates']:>10} "
+                     f"{entry['transistors']:>12.0f} {entry['cycles']:>8} {versus:>18}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a corpus of programs over a grid of machine configurations")
+
+    parser.add_argument("programs", type=str, help="Directory (searched recursively for .asm) or glob pattern of programs")
+    parser.add_argument("--output", type=str, default="sweep_results", help="Directory for the results")
+    parser.add_argument("--arch", type=str, nargs='+', choices=toolchain.ARCHITECTURES, default=["ternary"],
+                        help="Architectures to sweep")
+    parser.add_argument("--word-size", type=int, nargs='+', default=None, help="Word sizes in digits (bits or trits)")
+    parser.add_argument("--reg-num", type=int, nargs='+', default=None, help="Register counts")
+    parser.add_argument("--mem-size", type=int, nargs='+', default=None, help="Memory sizes (MEM_SIZE)")
+    parser.add_argument("--mem-addr-size", type=int, nargs='+', default=None, help="Memory address widths in digits")
+    parser.add_argument("--baseline", type=str, choices=toolchain.ARCHITECTURES, default=None,
+                        help="Also run this architecture's parameters.vh machine and compare every configuration with it")
+    parser.add_argument("--processes", type=int, default=None, help="Builds and simulations to run at once (default: CPU count)")
+    parser.add_argument("--scratch", type=str, default=None, help="Directory for scratch directories (default: system temp)")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds allowed for each simulation")
+
+    args = parser.parse_args()
+    sources = batch_assembler.find_sources(args.programs)
+    base_dir = args.programs if os.path.isdir(args.programs) else None
+
+    grids = {arch: configurations(arch, args.word_size, args.reg_num, args.mem_size, args.mem_addr_size) for arch in args.arch}
+    baseline = None
+    if args.baseline is not None:
+        baseline = (args.baseline, toolchain.read_parameters(args.baseline))
+        grid = grids.setdefault(args.baseline, [])
+        if all(parameters != baseline[1] for parameters, _ in grid):
+            grid.append((baseline[1], None))
+
+    count = sum(len(grid) for grid in grids.values())
+    print(f"Sweeping {count} configurations over {len(sources)} programs")
+    try:
+        _, totals = run_sweep(sources, args.output, grids, args.processes, base_dir, args.scratch, args.timeout, baseline)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return
+
+    if baseline is not None:
+        print(f"Compared with {label(*baseline)} (transistor and cycle ratios, programs compared)")
+    print(format_table(totals))
+    print(f"Results written to {os.path.join(args.output, RUNS_NAME)} and {os.path.join(args.output, CONFIGURATIONS_NAME)}")
+
+
+if __name__ == "__main__":
+    main()
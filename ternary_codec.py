@@ -0,0 +1,146 @@
+"""
+Batched Balanced Ternary Codec
+------------------------------
+Packs and unpacks whole NumPy arrays of integers to and from the 2-bit-per-trit encoding used
+by the ternary machine, and applies the gates from gate_design.py trit-wise over those arrays.
+
+Trit encoding (trit i of a word occupies bits 2i+1:2i):
+-1 = 0b11 (_1)
+ 0 = 0b00 (_0)
+ 1 = 0b01 (_1_)
+
+The unused code 0b10 decodes to 0, as ternary_to_integer_func does in system_tb.v.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+import gate_compiler
+
+WORD_TRITS = 9
+
+# Trit value for each 2-bit code: 0b00 -> 0, 0b01 -> 1, 0b10 -> unused, 0b11 -> -1
+CODE_TO_TRIT = gate_compiler.CODE_TO_TRIT
+
+# Word widths up to this many trits get a full lookup table for encoding and decoding
+TABLE_TRITS = 10
+
+
+def trit_range(trits):
+    """Smallest and largest integers representable in the given number of balanced trits."""
+    half = (3 ** trits - 1) // 2
+    return -half, half
+
+
+def _word_dtype(trits):
+    return np.uint32 if trits <= 16 else np.uint64
+
+
+def _check_range(values, trits, wrap):
+    low, high = trit_range(trits)
+    if wrap:
+        return (values - low) % (3 ** trits) + low
+    if values.size and (values.min() < low or values.max() > high):
+        raise ValueError(f"Values must be between {low} and {high} for {trits} trits")
+    return values
+
+
+@lru_cache(maxsize=None)
+def _encode_table(trits):
+    # Packed word for every value from -half to +half
+    low, high = trit_range(trits)
+    return _encode_digits(np.arange(low, high + 1, dtype=np.int64), trits)
+
+
+@lru_cache(maxsize=None)
+def _decode_table(trits):
+    # Integer value of every 2*trits bit pattern
+    return _decode_digits(np.arange(4 ** trits, dtype=np.uint64), trits)
+
+
+def _encode_digits(values, trits):
+    # Shifting by half maps balanced digits (-1, 0, 1) onto ordinary base 3 digits (0, 1, 2)
+    shifted = values - trit_range(trits)[0]
+    words = np.zeros(values.shape, dtype=np.uint64)
+    for i in range(trits):
+        digit = (shifted % 3 - 1).astype(np.int64)
+        words |= (digit & 3).astype(np.uint64) << np.uint64(2 * i)
+        shifted //= 3
+    return words.astype(_word_dtype(trits))
+
+
+def _decode_digits(words, trits):
+    words = words.astype(np.uint64)
+    values = np.zeros(words.shape, dtype=np.int64)
+    for i in reversed(range(trits)):
+        codes = ((words >> np.uint64(2 * i)) & np.uint64(3)).astype(np.intp)
+        values = values * 3 + CODE_TO_TRIT[codes]
+    return values
+
+
+def encode(values, trits=WORD_TRITS, wrap=False):
+    """
+    Encode an array of integers as packed balanced ternary words.
+    Values outside the trit range raise ValueError unless wrap is set, in which case they
+    wrap around like the ripple carry adder does.
+    """
+    values = _check_range(np.asarray(values, dtype=np.int64), trits, wrap)
+    if trits <= TABLE_TRITS:
+        return _encode_table(trits)[values - trit_range(trits)[0]]
+    return _encode_digits(values, trits)
+
+
+def decode(words, trits=WORD_TRITS):
+    """Decode an array of packed balanced ternary words to integers."""
+    words = np.asarray(words)
+    if trits <= TABLE_TRITS:
+        mask = (1 << (2 * trits)) - 1
+        return _decode_table(trits)[words.astype(np.int64) & mask]
+    return _decode_digits(words, trits)
+
+
+def unpack(words, trits=WORD_TRITS):
+    """Split packed words into an array of trit values (-1, 0, 1) with the least significant trit first."""
+    words = np.asarray(words).astype(np.uint64)
+    shifts = np.arange(0, 2 * trits, 2, dtype=np.uint64)
+    codes = (words[..., np.newaxis] >> shifts) & np.uint64(3)
+    return CODE_TO_TRIT[codes.astype(np.intp)]
+
+
+def pack(trit_array):
+    """Combine an array of trit values (last axis, least significant trit first) into packed words."""
+    trit_array = np.asarray(trit_array, dtype=np.int64)
+    trits = trit_array.shape[-1]
+    codes = (trit_array & 3).astype(np.uint64)
+    shifts = np.arange(0, 2 * trits, 2, dtype=np.uint64)
+    return np.bitwise_or.reduce(codes << shifts, axis=-1).astype(_word_dtype(trits))
+
+
+def to_trits(values, trits=WORD_TRITS, wrap=False):
+    """Convert integers to an array of balanced trits with the least significant trit first."""
+    return unpack(encode(values, trits, wrap), trits)
+
+
+def from_trits(trit_array):
+    """Convert an array of balanced trits (least significant first) back to integers."""
+    trit_array = np.asarray(trit_array, dtype=np.int64)
+    weights = 3 ** np.arange(trit_array.shape[-1], dtype=np.int64)
+    return trit_array @ weights
+
+
+# Trit-wise gates from gate_design.py, evaluated through their compiled truth tables
+PTI = gate_compiler.PTI
+NTI = gate_compiler.NTI
+STI = gate_compiler.STI
+AND = gate_compiler.AND
+OR = gate_compiler.OR
+NAND = gate_compiler.NAND
+NOR = gate_compiler.NOR
+consensus_gate = gate_compiler.consensus_gate
+any_gate = gate_compiler.any_gate
+
+
+def apply_to_words(gate, *words, trits=WORD_TRITS):
+    """Apply a trit-wise gate to packed words and return packed words."""
+    return gate_compiler.compile_gate(gate).words(trits).packed(*words).astype(_word_dtype(trits))
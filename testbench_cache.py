@@ -0,0 +1,182 @@
+"""
+Testbench Build Cache
+---------------------
+Compiled system testbenches (main.vvp) for both architectures, kept between runs.
+
+A build is keyed on a hash of the RTL sources, parameters.vh, the -P parameter overrides and the
+iverilog executable, so iverilog only runs again when one of those changes. The program is not
+part of the build: program_loader.v reads the file named by the +program=<path> plusarg
+(programs/bin/program.hex by default), so one build serves every program.
+
+Variants of a machine (another word size or memory size, see sweep.py) are built from a copy of
+the sources with their own parameters.vh, and cached under the hash of that file's text.
+
+python testbench_cache.py binary -P system_tb.VERBOSE=1
+prints the path of the cached build, compiling it first if needed.
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import toolchain
+
+CACHE_DIR = os.path.join(toolchain.ROOT_DIR, ".testbench_cache")
+
+# Builds kept per architecture before the least recently used are dropped
+MAX_BUILDS = 16
+
+# Verilog sources for each testbench, in the order given in testbenches/main.bat
+TESTBENCH_SOURCES = {
+    "binary": [
+        "program_counter.v", "registers.v", "fetch_instruction.v", "decode_instruction.v", "alu.v",
+        "control.v", "memory.v", "cpu.v", "program_loader.v", "machine.v", "testbenches/system_tb.v",
+    ],
+    "ternary": [
+        "alu.v", "program_counter.v", "registers.v", "fetch_instruction.v", "decode_instruction.v",
+        "control.v", "memory.v", "cpu.v", "program_loader.v", "machine.v", "testbenches/system_tb.v",
+    ],
+}
+
+# Files pulled in with `include, hashed alongside the sources
+INCLUDE_FILES = ["parameters.vh"]
+PARAMETERS_FILE = "parameters.vh"
+
+
+def _iverilog():
+    path = shutil.which("iverilog")
+    if path is None:
+        raise RuntimeError("Icarus Verilog not found on the PATH: iverilog")
+    return path
+
+
+def build_key(arch, parameters=None, machine_parameters=None):
+    """
+    Hash identifying a testbench build: sources, includes, parameter overrides and compiler.
+    machine_parameters replaces values in parameters.vh (see toolchain.render_parameters).
+    """
+    source_dir = toolchain.architecture_dir(arch)
+    digest = hashlib.sha256(arch.encode())
+
+    # A different iverilog may produce an incompatible .vvp
+    compiler = os.stat(_iverilog())
+    digest.update(f"{compiler.st_size}:{compiler.st_mtime_ns}".encode())
+
+    for name, value in sorted((parameters or {}).items()):
+        digest.update(f"-P{name}={value}\0".encode())
+    for relative in TESTBENCH_SOURCES[arch] + INCLUDE_FILES:
+        digest.update(relative.encode() + b"\0")
+        if relative == PARAMETERS_FILE and machine_parameters:
+            digest.update(toolchain.render_parameters(arch, machine_parameters).encode())
+            continue
+        with open(os.path.join(source_dir, relative), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def compile_testbench(arch, output_file, parameters=None, machine_parameters=None):
+    """
+    Compile an architecture's system testbench with iverilog and return the .vvp path. With
+    machine_parameters, a copy of the sources with those values in parameters.vh is compiled.
+    """
+    output_file = os.path.abspath(output_file)
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    if not machine_parameters:
+        return _compile(arch, toolchain.architecture_dir(arch), output_file, parameters)
+
+    with tempfile.TemporaryDirectory(prefix=f"testbench-{arch}-") as variant_dir:
+        source_dir = toolchain.architecture_dir(arch)
+        for relative in TESTBENCH_SOURCES[arch] + INCLUDE_FILES:
+            os.makedirs(os.path.dirname(os.path.join(variant_dir, relative)), exist_ok=True)
+            shutil.copyfile(os.path.join(source_dir, relative), os.path.join(variant_dir, relative))
+        with open(os.path.join(variant_dir, PARAMETERS_FILE), 'w') as f:
+            f.write(toolchain.render_parameters(arch, machine_parameters))
+        return _compile(arch, variant_dir, output_file, parameters)
+
+
+def _compile(arch, source_dir, output_file, parameters):
+    command = [_iverilog(), "-o", output_file, "-I", source_dir]
+    command += [f"-P{name}={value}" for name, value in sorted((parameters or {}).items())]
+    result = subprocess.run(command + TESTBENCH_SOURCES[arch], cwd=source_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"iverilog failed for the {arch} testbench:\n{result.stderr.strip()}")
+    return output_file
+
+
+def cached_testbench(arch, parameters=None, cache_dir=CACHE_DIR, machine_parameters=None, max_builds=MAX_BUILDS):
+    """
+    Return the path of a compiled testbench for the given -P overrides (e.g.
+    {"system_tb.VERBOSE": 0}) and parameters.vh values, compiling it only if the sources have
+    changed since it was built. At most max_builds builds per architecture are kept.
+    """
+    path = os.path.join(cache_dir, f"{arch}-{build_key(arch, parameters, machine_parameters)[:32]}.vvp")
+    if os.path.exists(path):
+        # Most recently used builds are kept when pruning
+        os.utime(path)
+        return path
+
+    # Build beside the final path and rename, so concurrent runs never see a partial file
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        compile_testbench(arch, temporary, parameters, machine_parameters)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    _prune(arch, cache_dir, max_builds)
+    return path
+
+
+def _prune(arch, cache_dir, max_builds):
+    builds = sorted(glob.glob(os.path.join(cache_dir, f"{arch}-*.vvp")), key=os.path.getmtime, reverse=True)
+    for path in builds[max_builds:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def clear_cache(cache_dir=CACHE_DIR):
+    """Remove every cached build."""
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def parse_parameter(text):
+    """Parse a NAME=VALUE -P override."""
+    name, separator, value = text.partition("=")
+    if not separator or not name:
+        raise argparse.ArgumentTypeError(f"Expected NAME=VALUE, got '{text}'")
+    return name, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the path of a cached testbench build, compiling it if needed")
+
+    parser.add_argument("arch", type=str, nargs='?', choices=toolchain.ARCHITECTURES, help="Architecture to build")
+    parser.add_argument("-P", dest="parameters", type=parse_parameter, action="append", default=[],
+                        help="Parameter override passed to iverilog, e.g. -P system_tb.VERBOSE=1")
+    parser.add_argument("--set", dest="machine_parameters", type=parse_parameter, action="append", default=[],
+                        help="Build a variant with another parameters.vh value, e.g. --set WORD_SIZE=12")
+    parser.add_argument("--clear", action="store_true", help="Remove every cached build")
+
+    args = parser.parse_args()
+    if args.clear:
+        clear_cache()
+    if args.arch is None:
+        return
+
+    try:
+        machine_parameters = {name: int(value) for name, value in args.machine_parameters}
+        print(cached_testbench(args.arch, dict(args.parameters), machine_parameters=machine_parameters))
+    except (RuntimeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
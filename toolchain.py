@@ -0,0 +1,221 @@
+"""
+Toolchain Loader
+----------------
+The binary and ternary assemblers both live in a file called compiler.py, so they cannot be
+imported side by side with a plain import statement. This module loads each one under its own
+name (binary_compiler, ternary_compiler) so that tools at the repository root can drive both
+architectures from a single process.
+"""
+
+import importlib.util
+import os
+import re
+import sys
+
+import assembler
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ARCHITECTURES = ("binary", "ternary")
+
+# Name of the assembler class defined in each architecture's compiler.py
+PARSER_CLASSES = {
+    "binary": "InstructionParser",
+    "ternary": "TernaryInstructionParser",
+}
+
+# Integer parameter declarations in parameters.vh, e.g. "parameter MEM_SIZE = 128;"
+PARAMETER_PATTERN = re.compile(r"^\s*parameter\s+(\w+)\s*=\s*(\d+)\s*;", re.MULTILINE)
+
+# Hex digits per word in program.hex (16-bit and 18-bit words)
+HEX_DIGITS = {
+    "binary": 4,
+    "ternary": 5,
+}
+
+# Values each digit of a word can take, and the bits that store one digit (a trit is two bits)
+RADIX = {
+    "binary": 2,
+    "ternary": 3,
+}
+DIGIT_BITS = {
+    "binary": 1,
+    "ternary": 2,
+}
+
+
+def architecture_dir(arch):
+    """Return the Verilog source directory for an architecture."""
+    if arch not in ARCHITECTURES:
+        raise ValueError(f"Unknown architecture: {arch}")
+    return os.path.join(ROOT_DIR, "Verilog", arch)
+
+
+def read_parameters(arch):
+    """Read the integer parameters from Verilog/<arch>/parameters.vh."""
+    with open(os.path.join(architecture_dir(arch), "parameters.vh"), 'r') as f:
+        return {name: int(value) for name, value in PARAMETER_PATTERN.findall(f.read())}
+
+
+def program_capacity(arch, parameters=None):
+    """
+    Largest program, in words, that the Verilog machine can load and address with the given
+    parameters (read from parameters.vh by default).
+    """
+    if parameters is None:
+        parameters = read_parameters(arch)
+    if arch == "binary":
+        # program_loader.v fills addresses 0 to MEM_SIZE-1
+        return min(parameters["MEM_SIZE"], 2 ** parameters["MEM_ADDR_SIZE"], 2 ** parameters["INS_ADDR_SIZE"])
+    # Ternary addresses are MEM_ADDR_SIZE trits wide and memory.v holds 2*MEM_SIZE words
+    return min(2 * parameters["MEM_SIZE"], 3 ** parameters["MEM_ADDR_SIZE"], 3 ** parameters["INS_ADDR_SIZE"])
+
+
+def render_parameters(arch, parameters):
+    """
+    Text of Verilog/<arch>/parameters.vh with the given parameters substituted, for building a
+    variant of the machine. Parameters not given keep their values.
+    """
+    with open(os.path.join(architecture_dir(arch), "parameters.vh"), 'r') as f:
+        text = f.read()
+    unknown = set(parameters) - set(name for name, _ in PARAMETER_PATTERN.findall(text))
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+
+    def substitute(match):
+        value = parameters.get(match.group(1))
+        if value is None:
+            return match.group(0)
+        start, end = match.span(2)
+        return match.group(0)[:start - match.start()] + str(int(value)) + match.group(0)[end - match.start():]
+
+    return PARAMETER_PATTERN.sub(substitute, text)
+
+
+def _digits_for(count, radix):
+    digits = 1
+    while radix ** digits < count:
+        digits += 1
+    return digits
+
+
+def derive_parameters(arch, word_size=None, reg_num=None, mem_size=None, mem_addr_size=None, base=None):
+    """
+    Parameters of a variant of an architecture's machine with another word size (in digits),
+    register count, memory size or address width. Anything not given keeps its value in base
+    (parameters.vh by default), and the instruction fields are resized to fit the word the way
+    decode_instruction.v splits it: {opcode, reg_dest, reg_src, small_immediate}, with register
+    addresses just wide enough for reg_num registers, the small immediate taking the rest of the
+    word and the big immediate spanning reg_src and the small immediate.
+    Raises ValueError for machines that cannot be built.
+    """
+    parameters = dict(read_parameters(arch) if base is None else base)
+    radix = RADIX[arch]
+    word_size = parameters["WORD_SIZE"] if word_size is None else word_size
+    reg_num = parameters["REG_NUM"] if reg_num is None else reg_num
+    mem_size = parameters["MEM_SIZE"] if mem_size is None else mem_size
+
+    if reg_num < 1 or mem_size < 1:
+        raise ValueError("The register count and memory size must be positive")
+    reg_addr_size = _digits_for(reg_num, radix)
+    small_imm_size = word_size - parameters["OPCODE_SIZE"] - 2 * reg_addr_size
+    if small_imm_size < 1:
+        raise ValueError(f"A {word_size}-digit word has no room for an immediate after a {parameters['OPCODE_SIZE']}-digit "
+                         f"opcode and two {reg_addr_size}-digit register fields")
+
+    if mem_addr_size is None:
+        # The ternary program counter is widened to a word when it is incremented
+        mem_addr_size = min(parameters["MEM_ADDR_SIZE"], word_size)
+    elif not 1 <= mem_addr_size <= word_size:
+        raise ValueError(f"Memory addresses must be between 1 and {word_size} digits")
+
+    parameters.update({
+        "WORD_SIZE": word_size,
+        "REG_NUM": reg_num,
+        "REG_ADDR_SIZE": reg_addr_size,
+        "SMALL_IMM_SIZE": small_imm_size,
+        "BIG_IMM_SIZE": reg_addr_size + small_imm_size,
+        "INS_ADDR_SIZE": reg_addr_size + small_imm_size,  # Branch targets are big immediates
+        "MEM_SIZE": mem_size,
+        "MEM_ADDR_SIZE": mem_addr_size,
+    })
+    return parameters
+
+
+def instruction_layout(arch, parameters=None):
+    """
+    Field positions (in bits of the encoded word) and operand ranges of an architecture's
+    instructions, for the given parameters (read from parameters.vh by default). Words are
+    {opcode, reg_dest, reg_src, small_immediate} as in decode_instruction.v.
+
+    Binary immediates and memory offsets are unsigned and branch offsets two's complement; ternary
+    immediates, offsets and branch offsets are balanced, so n trits hold -(3^n-1)/2 to (3^n-1)/2.
+    """
+    if parameters is None:
+        parameters = read_parameters(arch)
+    bits = DIGIT_BITS[arch]
+    radix = RADIX[arch]
+    big = parameters["BIG_IMM_SIZE"]
+    small = parameters["SMALL_IMM_SIZE"]
+    registers = parameters["REG_ADDR_SIZE"]
+
+    if arch == "binary":
+        big_range = (0, 2 ** big - 1)
+        branch_range = (-2 ** (big - 1), 2 ** (big - 1) - 1)
+        small_range = (0, 2 ** small - 1)
+    else:
+        big_range = branch_range = (-(3 ** big - 1) // 2, (3 ** big - 1) // 2)
+        small_range = (-(3 ** small - 1) // 2, (3 ** small - 1) // 2)
+
+    return {
+        "word_bits": bits * parameters["WORD_SIZE"],
+        "opcode_shift": bits * (small + 2 * registers),
+        "dest_shift": bits * (small + registers),
+        "src_shift": bits * small,
+        "registers": radix ** registers,  # Register numbers 0 to registers-1 can be encoded
+        "big_digits": big,
+        "small_digits": small,
+        "big_immediate": big_range,
+        "branch_immediate": branch_range,
+        "small_immediate": small_range,
+    }
+
+
+def load_compiler(arch):
+    """Import Verilog/<arch>/programs/compiler.py as the module <arch>_compiler."""
+    name = f"{arch}_compiler"
+    if name in sys.modules:
+        return sys.modules[name]
+
+    path = os.path.join(architecture_dir(arch), "programs", "compiler.py")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def new_parser(arch):
+    """Create a fresh assembler instance for an architecture."""
+    return getattr(load_compiler(arch), PARSER_CLASSES[arch])()
+
+
+def assemble_lines(parser, lines):
+    """
+    Assemble an iterable of source lines in memory and return the list of encoded words.
+    Follows the same rules as assemble(): labels are resolved, invalid lines are skipped and
+    ';;;' ends the program.
+    """
+    words, parser.symbols = assembler.assemble(parser, lines)
+    return words
+
+
+def write_hex(filename, words, arch):
+    """Write encoded words to a program.hex file, creating its directory if needed."""
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    digits = HEX_DIGITS[arch]
+    with open(filename, 'w') as f:
+        for word in words:
+            f.write(f"{word:0{digits}x}\n")
@@ -0,0 +1,142 @@
+"""
+Simulation Trace Reader
+-----------------------
+Reads the per-cycle trace that testbenches/system_tb.v writes when run with +trace=<path>:
+
+vvp main.vvp +program=programs/bin/program.hex +trace=program.trace.jsonl
+
+The trace is one JSON object per line. The first line names the architecture and the gate
+counters, and every following line is one clock cycle of execution:
+
+{"arch":"binary","gates":["NOT","AND","OR","XOR"]}
+{"cycle":12,"pc":3,"state":4,"opcode":5,"alu":17,"gates":[0,32,16,32]}
+{"cycle":13,"pc":3,"state":7,"opcode":5,"reg":[1,17]}
+
+- alu is present in the ALU state (STATE_ALU, 4), reg ([register, value]) when a register is
+  written (in STATE_REGSTORE, 7) and mem ([address, value]) when memory is written
+- gates holds the counter increments in that cycle, and is left out when none changed
+- values are raw bit patterns; ternary words keep their 2-bit-per-trit encoding
+
+Records are decoded one line at a time as the file is read, so a trace of any length is
+processed in constant memory. Traces may be gzip-compressed (.gz).
+"""
+
+import argparse
+import gzip
+import json
+import re
+
+import simulator
+import toolchain
+
+# Values Verilog prints as x or z when a signal is undriven
+UNKNOWN_VALUE = re.compile(r"(?<=[:\[,])[xXzZ?]+(?=[,\]}])")
+
+
+def _open(filename):
+    if filename.endswith(".gz"):
+        return gzip.open(filename, 'rt')
+    return open(filename, 'r')
+
+
+def _parse(line):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return json.loads(UNKNOWN_VALUE.sub("null", line))
+
+
+def _identity(value):
+    return value
+
+
+class TraceReader:
+    """
+    A trace file opened for reading. Iterating yields one dict per cycle. With decode=True,
+    ternary values and addresses are converted to integers, the opcode's mnemonic is added and
+    gates becomes a {gate: increment} dict. Use as a context manager or call close().
+    """
+
+    def __init__(self, filename, decode=True):
+        self.filename = filename
+        self.decode = decode
+        self._file = _open(filename)
+        header = _parse(self._file.readline() or "{}")
+        if "arch" not in header or "gates" not in header:
+            self._file.close()
+            raise ValueError(f"{filename} is not a simulation trace")
+        self.arch = header["arch"]
+        self.gates = tuple(header["gates"])
+        self.mnemonics = {opcode: name for name, opcode in toolchain.new_parser(self.arch).instructions.items()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        for line in self._file:
+            if line.strip():
+                record = _parse(line)
+                yield self._decode(record) if self.decode else record
+
+    def _decode(self, record):
+        value = simulator.ternary_to_integer if self.arch == "ternary" else _identity
+        record["mnemonic"] = self.mnemonics.get(record["opcode"])
+        if record["pc"] is not None:
+            record["pc"] = value(record["pc"])
+        if record.get("alu") is not None:
+            record["alu"] = value(record["alu"])
+        if "reg" in record and record["reg"][1] is not None:
+            record["reg"][1] = value(record["reg"][1])
+        if "mem" in record:
+            record["mem"] = [None if item is None else value(item) for item in record["mem"]]
+        if "gates" in record:
+            record["gates"] = dict(zip(self.gates, record["gates"]))
+        return record
+
+    def close(self):
+        self._file.close()
+
+
+def read_trace(filename, decode=True):
+    """Yield the cycle records of a trace file one at a time."""
+    with TraceReader(filename, decode) as reader:
+        yield from reader
+
+
+def summarize(filename):
+    """Cycles, register and memory writes and gate totals of a trace, read in one pass."""
+    with TraceReader(filename) as reader:
+        summary = {"arch": reader.arch, "cycles": 0, "register_writes": 0, "memory_writes": 0,
+                   "gates": dict.fromkeys(reader.gates, 0)}
+        for record in reader:
+            summary["cycles"] += 1
+            summary["register_writes"] += "reg" in record
+            summary["memory_writes"] += "mem" in record
+            for gate, count in record.get("gates", {}).items():
+                summary["gates"][gate] += count
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a simulation trace written with +trace=<path>")
+
+    parser.add_argument("trace", type=str, help="Trace file (.jsonl or .jsonl.gz)")
+    parser.add_argument("--records", action="store_true", help="Print every decoded record as a JSON line")
+
+    args = parser.parse_args()
+    if args.records:
+        for record in read_trace(args.trace):
+            print(json.dumps(record))
+        return
+
+    summary = summarize(args.trace)
+    print(f"{summary['arch']} trace: {summary['cycles']} cycles, {summary['register_writes']} register writes, "
+          f"{summary['memory_writes']} memory writes")
+    print("Gate counts: " + ", ".join(f"{gate}={count}" for gate, count in summary["gates"].items()))
+
+
+if __name__ == "__main__":
+    main()